@@ -0,0 +1,83 @@
+"""
+HTML Parsing Benchmark for MedshipmentTrackingTool
+
+Measures the per-page CPU cost of src/ips_parser.py against the previous
+BeautifulSoup-based parsing, using the saved pages in benchmarks/fixtures.
+
+Usage:
+    python benchmarks/bench_parser.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from src.ips_parser import parse_tracking_page, parse_zip_page, event_to_row
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_tracking(html):
+    """Previous fetch_tracking_data parsing: full soup, newline-split last row."""
+    data = BeautifulSoup(html, "lxml")
+    out_set = data.find('td', class_="tabproperty")
+    if not out_set or len(out_set.contents) < 3:
+        paragraphs = data.find_all("p")
+        return paragraphs[1].text if len(paragraphs) > 1 else 0
+    event_data = out_set.find_all("tr")[-1].text.encode('ascii', 'ignore').decode('ascii').split("\n")
+    event_data.pop(0)
+    if event_data:
+        event_data.pop()
+    if event_data:
+        event_data.pop()
+    return event_data
+
+
+def legacy_zip(html):
+    """Previous get_zip_codes parsing."""
+    out_set = BeautifulSoup(html, "lxml").find("h1")
+    location_parts = out_set.text.encode('ascii', 'ignore').decode('ascii').split(",")
+    location_parts.insert(3, location_parts[0])
+    location_parts.pop(0)
+    return ",".join(location_parts)
+
+
+def current_tracking(html):
+    """Current parsing: lxml XPath, structured fields."""
+    page = parse_tracking_page(html)
+    return event_to_row(page['events'][-1]) if page['events'] else page['message']
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="parses per measurement")
+    args = parser.parse_args()
+
+    cases = [
+        ("ips_item_events.html", legacy_tracking, current_tracking),
+        ("ips_no_information.html", legacy_tracking, current_tracking),
+        ("zip_code.html", legacy_zip, parse_zip_page),
+    ]
+
+    print(f"{'fixture':<26} {'previous (us/page)':>19} {'current (us/page)':>18} {'speedup':>8}")
+    for name, legacy, current in cases:
+        html = load(name)
+        previous_cost = min(timeit.repeat(lambda: legacy(html), number=args.repeat, repeat=3))
+        current_cost = min(timeit.repeat(lambda: current(html), number=args.repeat, repeat=3))
+        previous_us = previous_cost / args.repeat * 1e6
+        current_us = current_cost / args.repeat * 1e6
+        print(f"{name:<26} {previous_us:>19.1f} {current_us:>18.1f} {previous_us / current_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
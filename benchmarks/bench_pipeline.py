@@ -0,0 +1,301 @@
+"""
+End-to-End Pipeline Benchmark for MedshipmentTrackingTool
+
+Generates a synthetic Input-Data.xlsx for every requested size, serves
+synthetic IPS and zip code pages from the local stand-in (src/ips_standin.py)
+and times each stage of a tracking run separately:
+
+    read_input_data, fetch_parse, zip_enrichment, write_final_data,
+    categorize_shipments, generate_categorized_report
+
+Every size runs in a fresh process, so the reported peak RSS belongs to that
+size alone. Results are saved as JSON; pass an earlier file with --compare to
+see the change per stage.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 100 1000 10000 100000]
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-before.json
+
+IPS throttling is switched off (fetches are limited only by fetch_workers and
+max_connections_per_host), so fetch_parse measures the client's own cost.
+Use --latency to simulate a slow site.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xlsxwriter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.ips_standin import start_server
+from src.web_scraper import fetch_tracking_data
+from src.fetch_engine import FetchEngine
+from src.tracker import ShipmentTracker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+STAGES = (
+    "read_input_data", "fetch_parse", "zip_enrichment", "write_final_data",
+    "categorize_shipments", "generate_categorized_report"
+)
+
+
+def make_input_file(path, count):
+    """
+    Writes a synthetic input sheet.
+
+    Args:
+        path (str): Destination .xlsx file
+        count (int): Number of data rows
+    """
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, ["Order ID", "First Name", "Last Name", "Tracking Number"])
+    for i in range(count):
+        worksheet.write_row(i + 1, 0, [f"ORD{i:07d}", f"First{i}", f"Last{i}", f"EE{i:09d}IN"])
+    workbook.close()
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_tracker(work_dir, base_url, settings):
+    """
+    Creates a ShipmentTracker whose files live in work_dir and whose lookups go to the stand-in.
+
+    Args:
+        work_dir (str): Scratch directory of this run
+        base_url (str): Stand-in server URL
+        settings (dict): Config overrides (fetch_workers, ...)
+
+    Returns:
+        ShipmentTracker: Configured tracker
+    """
+    with open(os.path.join(REPO_ROOT, "config", "config.json"), "r") as f:
+        config = json.load(f)
+    for key, value in list(config.items()):
+        if isinstance(value, str) and value.startswith("output/"):
+            config[key] = os.path.join(work_dir, value[len("output/"):])
+    config.update({
+        "input_file": os.path.join(work_dir, "Input-Data.xlsx"),
+        "output_dir": work_dir,
+        "final_data_file": os.path.join(work_dir, "Final-Data.xlsx"),
+        "items_dir": os.path.join(work_dir, "Items"),
+        "ips_tracking_url": f"{base_url}/ipswebtracking/IPSWeb_item_events.aspx",
+        "zip_code_url": f"{base_url}/zip-code",
+        "http_mode": "live",
+        "ips_initial_rate": 1e9,
+        "ips_max_rate": 1e9
+    })
+    config.update(settings)
+
+    config_path = os.path.join(work_dir, "config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+    return ShipmentTracker(config_path)
+
+
+def run_size(size, base_url, settings):
+    """
+    Times every pipeline stage for one input size (runs in a child process).
+
+    Args:
+        size (int): Number of input rows
+        base_url (str): Stand-in server URL
+        settings (dict): Config overrides
+
+    Returns:
+        dict: Per-stage seconds and peak RSS for this size
+    """
+    stages = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        stages[name] = {
+            "seconds": round(time.perf_counter() - start, 4),
+            "peak_rss_mb": peak_rss_mb()
+        }
+        return result
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        make_input_file(os.path.join(work_dir, "Input-Data.xlsx"), size)
+        tracker = make_tracker(work_dir, base_url, settings)
+        handler = tracker.excel_handler
+        ips_url = tracker.config['ips_tracking_url']
+
+        with FetchEngine(tracker.fetch_workers, tracker.max_per_host) as engine:
+            rows = timed("read_input_data", handler.read_input_data)
+
+            def fetch(tracking_number):
+                with engine.host_slot(ips_url):
+                    return fetch_tracking_data(tracking_number, ips_url, tracker.session)
+            events = timed("fetch_parse", lambda: engine.map(
+                fetch, [row.tracking_number for row in rows]
+            ))
+
+            def enrich(event_data):
+                if event_data != 0 and str(event_data[2]).isdigit():
+                    zip_info = tracker.zip_cache.lookup(
+                        str(int(event_data[2])),
+                        lambda code: tracker._fetch_zip_info(engine, code)
+                    )
+                    if zip_info != 0:
+                        event_data[2] = zip_info
+                return event_data
+            events = timed("zip_enrichment", lambda: engine.map(enrich, events))
+
+        tracking_data = []
+        for row, event_data in zip(rows, events):
+            if event_data == 0:
+                continue
+            record = list(event_data)
+            record[3:3] = [row.order_id, row.first_name, row.last_name, row.tracking_number]
+            tracking_data.append(record)
+
+        timed("write_final_data", lambda: handler.write_final_data(tracking_data))
+        categories = timed("categorize_shipments",
+                           lambda: handler.categorize_shipments(tracking_data))
+        timed("generate_categorized_report",
+              lambda: handler.generate_categorized_report(categories))
+
+        zip_hit_rate = tracker.zip_cache.hit_rate()
+        tracker.zip_cache.close()
+
+    total = sum(stage["seconds"] for stage in stages.values())
+    return {
+        "rows": size,
+        "records": len(tracking_data),
+        "total_seconds": round(total, 4),
+        "rows_per_second": round(size / total, 1) if total else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "zip_cache_hit_rate": round(zip_hit_rate, 3),
+        "stages": stages
+    }
+
+
+def git_version():
+    """Returns the checked-out commit (with a -dirty suffix), or None outside git."""
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    """
+    Prints the stage table, with the change against a baseline run if given.
+
+    Args:
+        results (list): Per-size results from run_size
+        baseline (dict): Earlier results file, or None
+    """
+    previous = {entry["rows"]: entry for entry in (baseline or {}).get("results", [])}
+    for entry in results:
+        print(f"\n{entry['rows']} rows ({entry['records']} records, "
+              f"{entry['rows_per_second']} rows/s, peak RSS {entry['peak_rss_mb']} MB)")
+        before = previous.get(entry["rows"])
+        for name in STAGES + ("total",):
+            seconds = entry["total_seconds"] if name == "total" else entry["stages"][name]["seconds"]
+            line = f"  {name:<28} {seconds:>10.3f} s"
+            if before:
+                old = before["total_seconds"] if name == "total" else before["stages"][name]["seconds"]
+                if old:
+                    line += f"   {(seconds - old) / old:+7.1%} vs {old:.3f} s"
+            print(line)
+        if before and before.get("peak_rss_mb") and entry["peak_rss_mb"]:
+            print(f"  {'peak RSS (MB)':<28} {entry['peak_rss_mb']:>10.1f}   "
+                  f"was {before['peak_rss_mb']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--workers", type=int, help="fetch_workers (default: from config)")
+    parser.add_argument("--per-host", type=int, help="max_connections_per_host (default: from config)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in delay per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stand-in fraction of 503 responses")
+    parser.add_argument("--no-info-rate", type=float, default=0.05,
+                        help="stand-in fraction of tracking numbers without events")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    settings = {}
+    if args.workers:
+        settings["fetch_workers"] = args.workers
+        settings["http_pool_size"] = args.workers
+    if args.per_host:
+        settings["max_connections_per_host"] = args.per_host
+
+    server = start_server(latency=args.latency, error_rate=args.error_rate,
+                          no_info_rate=args.no_info_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    try:
+        for size in args.sizes:
+            print(f"Running {size} rows...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_size, size, base_url, settings).result())
+    finally:
+        server.shutdown()
+
+    report = {
+        "benchmark": "pipeline",
+        "version": git_version(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "no_info_rate": args.no_info_rate,
+            **settings
+        },
+        "results": results
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
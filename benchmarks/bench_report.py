@@ -0,0 +1,143 @@
+"""
+Report Generation Benchmark for MedshipmentTrackingTool
+
+Compares the categorized report path against the previous implementation,
+which re-read Final-Data.xlsx with openpyxl and rebuilt the full row list
+for every copied row.
+
+Usage:
+    python benchmarks/bench_report.py [--sizes 1000 10000 50000]
+
+The previous implementation is quadratic, so above --legacy-max rows only
+its first --legacy-sample row copies are timed and the copy cost is
+extrapolated linearly (each copy costs one full pass over the sheet).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import load_workbook
+import xlsxwriter
+
+from src.excel_handler import ExcelHandler, EVENT_MAPPINGS, _report_row
+
+
+def make_records(count, seed=0):
+    """
+    Generates synthetic tracking records.
+
+    Args:
+        count (int): Number of records
+        seed (int): Random seed
+
+    Returns:
+        list: Tracking records in the Final-Data.xlsx column layout
+    """
+    rng = random.Random(seed)
+    event_types = list(EVENT_MAPPINGS)
+    countries = ["US", "GB", "DE", "FR", "AU", "CA"]
+    records = []
+    for i in range(count):
+        records.append([
+            f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/2024 10:{rng.randint(10, 59)}:00",
+            rng.choice(countries),
+            f"OFFICE {rng.randint(1, 300)}",
+            f"ORD{i:07d}",
+            f"First{i}",
+            f"Last{i}",
+            f"EE{i:09d}IN",
+            rng.choice(event_types),
+            "A",
+            "ISC MUMBAI",
+            "No information available"
+        ])
+    return records
+
+
+def make_handler(work_dir):
+    """Creates an ExcelHandler writing into work_dir."""
+    config_path = os.path.join(work_dir, "config.json")
+    with open(config_path, "w") as f:
+        json.dump({
+            "input_file": os.path.join(work_dir, "Input-Data.xlsx"),
+            "output_dir": work_dir,
+            "final_data_file": os.path.join(work_dir, "Final-Data.xlsx"),
+            "items_dir": os.path.join(work_dir, "Items")
+        }, f)
+    return ExcelHandler(config_path)
+
+
+def bench_current(handler, records):
+    """Times categorize_shipments + generate_categorized_report."""
+    start = time.perf_counter()
+    categories = handler.categorize_shipments(records)
+    handler.generate_categorized_report(categories)
+    return time.perf_counter() - start
+
+
+def bench_legacy(handler, records, sample):
+    """
+    Times the previous reread-and-copy report path.
+
+    Returns:
+        tuple: (seconds, estimated) where estimated is True if the row copy
+               cost was extrapolated from the first `sample` rows
+    """
+    handler.write_final_data(records)
+
+    start = time.perf_counter()
+    ws = load_workbook(handler.config['final_data_file']).active
+    rows_by_category = {}
+    for idx, cell in enumerate(ws['H'][1:], start=2):
+        if cell.value in EVENT_MAPPINGS:
+            rows_by_category.setdefault(EVENT_MAPPINGS[cell.value], []).append(idx)
+    setup = time.perf_counter() - start
+
+    row_numbers = [row for rows in rows_by_category.values() for row in rows]
+    timed = row_numbers[:sample] if sample else row_numbers
+    workbook = xlsxwriter.Workbook(os.path.join(handler.config['items_dir'], "legacy.xlsx"))
+    worksheet = workbook.add_worksheet()
+    start = time.perf_counter()
+    for row_idx, row_num in enumerate(timed, start=1):
+        row = list(ws.rows)[row_num - 1]
+        worksheet.write_row(row_idx, 0, _report_row([cell.value for cell in row]))
+    copy = time.perf_counter() - start
+    workbook.close()
+
+    estimated = len(timed) < len(row_numbers)
+    if estimated:
+        copy = copy / len(timed) * len(row_numbers)
+    return setup + copy, estimated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="largest size for which the legacy path is timed in full")
+    parser.add_argument("--legacy-sample", type=int, default=200,
+                        help="row copies timed for larger sizes")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'current (s)':>12} {'previous (s)':>14} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        handler = make_handler(work_dir)
+        for size in args.sizes:
+            records = make_records(size)
+            current = bench_current(handler, records)
+            sample = None if size <= args.legacy_max else args.legacy_sample
+            legacy, estimated = bench_legacy(handler, records, sample)
+            marker = "~" if estimated else " "
+            print(f"{size:>8} {current:>12.2f} {marker}{legacy:>13.2f} {legacy / current:>8.0f}x")
+    print("~ previous path extrapolated from a sample of row copies")
+
+
+if __name__ == "__main__":
+    main()
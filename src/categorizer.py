@@ -0,0 +1,407 @@
+"""
+Categorizer Module for MedshipmentTrackingTool
+
+This module sorts tracking records into status categories by their event
+type and computes the report aggregates in the same pass: records per
+category, records per country and category, and the age of the latest event
+of the items in each category. Two engines are available: a plain Python
+loop (default) and a pandas engine that maps event types in bulk and counts
+with groupby, for large runs. Both return the same ShipmentSummary.
+
+The streaming pipeline (src/pipeline.py) uses a StreamingCategorizer
+instead, which takes records one at a time and spools each category to a
+file on disk rather than keeping the records in memory.
+"""
+
+import os
+import csv
+import datetime
+import logging
+import statistics
+from typing import NamedTuple
+
+from src.ips_parser import parse_event_time, EVENT_TIME_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# Report order of the built-in categories; categories added through the
+# 'event_mappings' config key follow in order of appearance
+CATEGORY_ORDER = (
+    "Booked", "InTransit", "InBound", "OutBound", "Delivered",
+    "NoticeLeft", "InTransitToDelivery", "Stuck", "Returned"
+)
+
+# Columns of a tracking record used for categorization
+TIME_COLUMN = 0
+COUNTRY_COLUMN = 1
+EVENT_TYPE_COLUMN = 7
+
+# Formats accepted by parse_event_time, for the pandas engine (the usual IPS
+# format first)
+IPS_TIME_FORMATS = ("%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %I:%M %p") + EVENT_TIME_FORMATS
+
+# Country shown for records without one
+UNKNOWN_COUNTRY = "Unknown"
+
+
+class ShipmentSummary(NamedTuple):
+    """Categorized records and report aggregates of one run."""
+    categories: dict  # category -> tracking records, in input order
+    counts: dict  # category -> number of records
+    by_country: dict  # country -> {category: number of records}
+    event_age: dict  # category -> {'items', 'newest', 'oldest', 'median_age_days', 'max_age_days'}
+
+
+def category_order(event_mappings):
+    """
+    Returns every category of an event mapping, in report order.
+
+    Args:
+        event_mappings (dict): Event type -> category name
+
+    Returns:
+        list: Category names
+    """
+    return list(dict.fromkeys(CATEGORY_ORDER + tuple(event_mappings.values())))
+
+
+def _age_stats(event_times, now):
+    """
+    Summarizes the latest-event times of one category.
+
+    Args:
+        event_times (list): datetime of the latest event of each item
+        now (datetime.datetime): Reference time
+
+    Returns:
+        dict: Newest and oldest event, median and maximum age in days
+    """
+    ages = [(now - event_time).total_seconds() / 86400 for event_time in event_times]
+    return {
+        'items': len(event_times),
+        'newest': max(event_times),
+        'oldest': min(event_times),
+        'median_age_days': round(statistics.median(ages), 1),
+        'max_age_days': round(max(ages), 1)
+    }
+
+
+class PythonCategorizer:
+    """Categorizes records with a single loop over the records."""
+
+    def __init__(self, event_mappings):
+        """
+        Initialize the categorizer.
+
+        Args:
+            event_mappings (dict): Event type -> category name
+        """
+        self.event_mappings = dict(event_mappings)
+        self.categories = category_order(self.event_mappings)
+
+    def categorize(self, tracking_data, now=None):
+        """
+        Categorizes tracking records and computes the report aggregates.
+
+        Records whose event type is not in the mapping are left out.
+
+        Args:
+            tracking_data (list): Tracking records (Final-Data.xlsx layout)
+            now (datetime.datetime): Reference time for event ages (defaults to now)
+
+        Returns:
+            ShipmentSummary: Categorized records and aggregates
+        """
+        now = now or datetime.datetime.now()
+        categories = {category: [] for category in self.categories}
+        by_country = {}
+        event_times = {}
+        parsed_times = {}  # Time strings repeat; each distinct value is parsed once
+
+        for record in tracking_data:
+            event_type = record[EVENT_TYPE_COLUMN] if len(record) > EVENT_TYPE_COLUMN else None
+            category = self.event_mappings.get(event_type)
+            if category is None:
+                continue
+            categories[category].append(record)
+
+            country = record[COUNTRY_COLUMN] or UNKNOWN_COUNTRY
+            country_counts = by_country.setdefault(country, {})
+            country_counts[category] = country_counts.get(category, 0) + 1
+
+            time_text = record[TIME_COLUMN]
+            event_time = parsed_times.get(time_text)
+            if event_time is None and time_text and time_text not in parsed_times:
+                event_time = parsed_times[time_text] = parse_event_time(time_text)
+            if event_time is not None:
+                event_times.setdefault(category, []).append(event_time)
+
+        return ShipmentSummary(
+            categories=categories,
+            counts={category: len(records) for category, records in categories.items()},
+            by_country=dict(sorted(by_country.items())),
+            event_age={
+                category: _age_stats(event_times[category], now)
+                for category in self.categories if category in event_times
+            }
+        )
+
+
+class DataFrameCategorizer(PythonCategorizer):
+    """Categorizes records in bulk with a pandas DataFrame."""
+
+    def __init__(self, event_mappings):
+        """
+        Initialize the categorizer.
+
+        Args:
+            event_mappings (dict): Event type -> category name
+
+        Raises:
+            ImportError: If pandas is not installed
+        """
+        # Imported here: pandas is optional and slow to import
+        import pandas
+        self._pandas = pandas
+        super().__init__(event_mappings)
+
+    def categorize(self, tracking_data, now=None):
+        """
+        Categorizes tracking records and computes the report aggregates.
+
+        Event types are mapped to categories in one vectorized step; counts
+        come from groupby, and event times are parsed in bulk.
+
+        Args:
+            tracking_data (list): Tracking records (Final-Data.xlsx layout)
+            now (datetime.datetime): Reference time for event ages (defaults to now)
+
+        Returns:
+            ShipmentSummary: Categorized records and aggregates
+        """
+        pandas = self._pandas
+        now = now or datetime.datetime.now()
+        frame = pandas.DataFrame({
+            'time': [record[TIME_COLUMN] if record else None for record in tracking_data],
+            'country': [record[COUNTRY_COLUMN] if len(record) > COUNTRY_COLUMN else None
+                        for record in tracking_data],
+            'event_type': [record[EVENT_TYPE_COLUMN] if len(record) > EVENT_TYPE_COLUMN else None
+                           for record in tracking_data],
+        }, dtype=object)
+        frame['category'] = frame['event_type'].map(self.event_mappings)
+        frame = frame[frame['category'].notna()]
+        if frame.empty:
+            return ShipmentSummary(
+                categories={category: [] for category in self.categories},
+                counts={category: 0 for category in self.categories},
+                by_country={},
+                event_age={}
+            )
+
+        # Records by category, keeping input order within each category
+        positions = frame.groupby('category', sort=False).indices
+        categories = {
+            category: [tracking_data[i] for i in frame.index[positions[category]]]
+            if category in positions else []
+            for category in self.categories
+        }
+        counts = frame.groupby('category', sort=False).size()
+
+        # Records per country and category
+        countries = frame['country'].where(frame['country'].astype(bool), UNKNOWN_COUNTRY)
+        by_country = {}
+        for (country, category), count in frame.groupby([countries, 'category']).size().items():
+            by_country.setdefault(country, {})[category] = int(count)
+
+        # Age of the latest event, per category
+        times = self._parse_times(frame['time'])
+        ages = (pandas.Timestamp(now) - times).dt.total_seconds() / 86400
+        age_frame = pandas.DataFrame({'category': frame['category'], 'time': times, 'age': ages})
+        age_stats = age_frame.dropna().groupby('category').agg(
+            items=('time', 'size'), newest=('time', 'max'), oldest=('time', 'min'),
+            median_age_days=('age', 'median'), max_age_days=('age', 'max')
+        )
+
+        return ShipmentSummary(
+            categories=categories,
+            counts={category: int(counts.get(category, 0)) for category in self.categories},
+            by_country=dict(sorted(by_country.items())),
+            event_age={
+                category: {
+                    'items': int(age_stats.at[category, 'items']),
+                    'newest': age_stats.at[category, 'newest'].to_pydatetime(),
+                    'oldest': age_stats.at[category, 'oldest'].to_pydatetime(),
+                    'median_age_days': round(float(age_stats.at[category, 'median_age_days']), 1),
+                    'max_age_days': round(float(age_stats.at[category, 'max_age_days']), 1)
+                }
+                for category in self.categories if category in age_stats.index
+            }
+        )
+
+    def _parse_times(self, values):
+        """
+        Parses a column of IPS time strings in bulk.
+
+        Only distinct values are parsed; the known formats of parse_event_time
+        are tried in turn, each on the values still unparsed.
+
+        Args:
+            values (pandas.Series): "Local Date and Time" values
+
+        Returns:
+            pandas.Series: datetime64 values (NaT where unparseable)
+        """
+        pandas = self._pandas
+        distinct = pandas.Series(values.dropna().unique(), dtype=object)
+        text = distinct.astype(str).str.split().str.join(" ")
+        parsed = pandas.Series(pandas.NaT, index=distinct.index, dtype="datetime64[ns]")
+        for fmt in IPS_TIME_FORMATS:
+            unparsed = parsed.isna()
+            if not unparsed.any():
+                break
+            parsed[unparsed] = pandas.to_datetime(text[unparsed], format=fmt, errors='coerce')
+        return pandas.to_datetime(values.map(pandas.Series(parsed.values, index=distinct.values)))
+
+
+class RecordSpool:
+    """Append-only file of tracking records that can be read back in order."""
+
+    def __init__(self, path):
+        """
+        Initialize the spool (the file is created by the first record).
+
+        Args:
+            path (str): Spool file
+        """
+        self.path = path
+        self._count = 0
+        self._file = self._writer = None
+
+    def append(self, record):
+        """Adds a record (values are read back as strings; None as "")."""
+        if self._writer is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+        self._writer.writerow(record)
+        self._count += 1
+
+    def close(self):
+        """Closes the spool file for writing."""
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        if not self._count:
+            return
+        if self._file is not None:
+            self._file.flush()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            yield from csv.reader(f)
+
+
+class StreamingCategorizer(PythonCategorizer):
+    """Categorizes records one at a time, spooling each category to disk."""
+
+    def __init__(self, event_mappings, spool_dir):
+        """
+        Initialize the categorizer.
+
+        Args:
+            event_mappings (dict): Event type -> category name
+            spool_dir (str): Directory of the category spool files
+        """
+        super().__init__(event_mappings)
+        self.spools = {
+            category: RecordSpool(os.path.join(spool_dir, f"category-{index}.csv"))
+            for index, category in enumerate(self.categories)
+        }
+        self._by_country = {}
+
+    def add(self, record):
+        """
+        Categorizes one tracking record.
+
+        Args:
+            record (list): Tracking record (Final-Data.xlsx layout)
+
+        Returns:
+            str: Category of the record, or None if its event type is not mapped
+        """
+        event_type = record[EVENT_TYPE_COLUMN] if len(record) > EVENT_TYPE_COLUMN else None
+        category = self.event_mappings.get(event_type)
+        if category is None:
+            return None
+        self.spools[category].append(record)
+
+        country = record[COUNTRY_COLUMN] or UNKNOWN_COUNTRY
+        country_counts = self._by_country.setdefault(country, {})
+        country_counts[category] = country_counts.get(category, 0) + 1
+        return category
+
+    def summary(self, now=None):
+        """
+        Computes the report aggregates of the records added so far.
+
+        Event ages are computed from the spools, one category at a time.
+
+        Args:
+            now (datetime.datetime): Reference time for event ages (defaults to now)
+
+        Returns:
+            ShipmentSummary: Aggregates, with the spools (iterable record
+                             lists) as the categorized records
+        """
+        now = now or datetime.datetime.now()
+        event_age = {}
+        for category, spool in self.spools.items():
+            event_times = []
+            parsed_times = {}  # Time strings repeat; each distinct value is parsed once
+            for record in spool:
+                time_text = record[TIME_COLUMN]
+                if time_text not in parsed_times:
+                    parsed_times[time_text] = parse_event_time(time_text) if time_text else None
+                if parsed_times[time_text] is not None:
+                    event_times.append(parsed_times[time_text])
+            if event_times:
+                event_age[category] = _age_stats(event_times, now)
+
+        return ShipmentSummary(
+            categories=self.spools,
+            counts={category: len(spool) for category, spool in self.spools.items()},
+            by_country=dict(sorted(self._by_country.items())),
+            event_age=event_age
+        )
+
+    def close(self):
+        """Closes the spool files for writing."""
+        for spool in self.spools.values():
+            spool.close()
+
+
+def create_categorizer(engine, event_mappings):
+    """
+    Creates the configured categorization engine.
+
+    Args:
+        engine (str): "python" or "pandas"; "pandas" falls back to "python"
+                      (with a warning) if pandas is not installed
+        event_mappings (dict): Event type -> category name
+
+    Returns:
+        PythonCategorizer: The categorizer
+
+    Raises:
+        ValueError: If the engine is unknown
+    """
+    if engine not in ("python", "pandas"):
+        raise ValueError(f"Unknown categorization_engine: {engine!r} (expected 'python' or 'pandas')")
+    if engine == "pandas":
+        try:
+            return DataFrameCategorizer(event_mappings)
+        except ImportError:
+            logger.warning("The pandas categorization engine needs the pandas package; using the python engine")
+    return PythonCategorizer(event_mappings)
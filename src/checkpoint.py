@@ -0,0 +1,87 @@
+"""
+Checkpoint Module for MedshipmentTrackingTool
+
+This module keeps an append-only JSONL journal of fetched tracking results,
+so an interrupted run can be resumed without fetching the same items again.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class CheckpointJournal:
+    """Append-only journal of fetched results (one JSON object per line)."""
+
+    def __init__(self, path):
+        """
+        Initialize the journal.
+
+        Args:
+            path (str): Path of the JSONL journal file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """
+        Replays the journal.
+
+        A truncated last line (from a crash mid-write) is ignored.
+
+        Returns:
+            dict: Mapping of tracking number to event data
+        """
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    results[entry['tracking_number']] = entry['event_data']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return results
+
+    def record(self, tracking_number, event_data):
+        """
+        Appends a fetched result to the journal.
+
+        Args:
+            tracking_number (str): The tracking number that was fetched
+            event_data (list): Event data returned by fetch_tracking_data
+        """
+        line = json.dumps({
+            'tracking_number': tracking_number,
+            'event_data': event_data,
+            'fetched_at': time.time()
+        })
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def reset(self):
+        """Discards all journal entries."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def close(self):
+        """Closes the journal file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
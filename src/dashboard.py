@@ -2,20 +2,43 @@
 Dashboard GUI Module for MedshipmentTrackingTool
 
 Provides a user-friendly graphical interface for executing tracking operations
-and scheduling automated runs.
+and scheduling automated runs. Runs are executed by a warm worker process
+(see run_worker.py), started with the window, so the dashboard itself starts
+without loading the tracker.
 """
 
 import os
 import sys
-import subprocess
+import json
+import queue
+import logging
 import datetime
+import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.scheduler import set_time
+from src.scheduler import schedule_daily, service_running, start_service
+from src.run_worker import RunWorkerClient
+from src.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration of the runs and schedules started from the dashboard
+CONFIG_PATH = "config/config.json"
+
+# How often the Tk thread picks up progress from the worker
+POLL_INTERVAL_MS = 100
+
+# Progress line shown for the stages after fetching
+STAGE_LABELS = {
+    "write_final_data": "Writing Final-Data.xlsx...",
+    "categorize": "Categorizing shipments...",
+    "report": "Generating categorized report...",
+    "done": "Done",
+}
 
 
 class TrackingDashboard:
@@ -30,13 +53,26 @@ class TrackingDashboard:
         """
         self.root = root
         self.root.title("Medshipment Tracking Tool")
-        self.root.geometry('600x400')
+        self.root.geometry('600x480')
         self.root.resizable(False, False)
         
         # Company name - can be customized
         self.company_name = "DRITEE IMPEX"
         
+        # Background run state; the worker reports through self._events
+        self._events = queue.Queue()
+        self._worker = None
+        self._closing = False
+        
+        # Scheduler service start-up, reported by its thread through self._service_events
+        self._service_events = queue.Queue()
+        
+        # Warm tracking process, loading the tracker while the window opens
+        self._run_worker = RunWorkerClient(CONFIG_PATH)
+        self._run_worker.start()
+        
         self._create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self._close_window)
     
     def _create_widgets(self):
         """Create and layout all GUI widgets."""
@@ -101,11 +137,16 @@ class TrackingDashboard:
         self.combo_minutes.current(0)
         self.combo_minutes.grid(column=3, row=0, padx=5)
         
-        tk.Label(time_frame, text="Seconds:", font=("Arial", 9)).grid(column=4, row=0, padx=5)
-        self.combo_seconds = ttk.Combobox(time_frame, width=5, state='readonly')
-        self.combo_seconds['values'] = tuple(range(60))
-        self.combo_seconds.current(0)
-        self.combo_seconds.grid(column=5, row=0, padx=5)
+        # Progress of the current run
+        self.progress_bar = ttk.Progressbar(self.root, length=500, mode='determinate')
+        self.progress_bar.grid(column=0, row=6, columnspan=3, padx=50)
+        
+        self.progress_label = tk.Label(
+            self.root,
+            text="",
+            font=("Arial", 9)
+        )
+        self.progress_label.grid(column=0, row=7, columnspan=3, pady=5)
         
         # Status label
         self.status_label = tk.Label(
@@ -114,13 +155,13 @@ class TrackingDashboard:
             font=("Arial", 9),
             fg="blue"
         )
-        self.status_label.grid(column=0, row=6, columnspan=3, pady=10)
+        self.status_label.grid(column=0, row=8, columnspan=3, pady=10)
         
         # Buttons
         button_frame = tk.Frame(self.root)
-        button_frame.grid(column=0, row=7, columnspan=3, pady=20)
+        button_frame.grid(column=0, row=9, columnspan=3, pady=20)
         
-        execute_btn = tk.Button(
+        self.execute_btn = tk.Button(
             button_frame,
             text="Execute",
             bg="#3f51b5",
@@ -130,9 +171,22 @@ class TrackingDashboard:
             command=self._execute_script,
             font=("Arial", 10, "bold")
         )
-        execute_btn.grid(column=0, row=0, padx=10)
+        self.execute_btn.grid(column=0, row=0, padx=10)
         
-        schedule_btn = tk.Button(
+        self.cancel_btn = tk.Button(
+            button_frame,
+            text="Cancel",
+            bg="#ff9800",
+            fg="white",
+            height=2,
+            width=12,
+            command=self._cancel_run,
+            state='disabled',
+            font=("Arial", 10, "bold")
+        )
+        self.cancel_btn.grid(column=1, row=0, padx=10)
+        
+        self.schedule_btn = tk.Button(
             button_frame,
             text="Schedule",
             bg="#3f51b5",
@@ -142,7 +196,7 @@ class TrackingDashboard:
             command=self._schedule_script,
             font=("Arial", 10, "bold")
         )
-        schedule_btn.grid(column=1, row=0, padx=10)
+        self.schedule_btn.grid(column=2, row=0, padx=10)
         
         exit_btn = tk.Button(
             button_frame,
@@ -154,93 +208,231 @@ class TrackingDashboard:
             command=self._close_window,
             font=("Arial", 10, "bold")
         )
-        exit_btn.grid(column=2, row=0, padx=10)
+        exit_btn.grid(column=3, row=0, padx=10)
     
     def _execute_script(self):
-        """Execute the tracking script immediately."""
+        """Start a tracking run on a background worker thread."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        
+        self.progress_bar.config(mode='indeterminate', value=0)
+        self.progress_bar.start(15)
+        self.progress_label.config(text="Reading input...")
+        self.status_label.config(text="Executing tracking run...", fg="blue")
+        self.execute_btn.config(state='disabled')
+        self.cancel_btn.config(state='normal')
+        
+        self._worker = threading.Thread(target=self._run_tracking, name="tracking-run", daemon=True)
+        self._worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_progress)
+    
+    def _run_tracking(self):
+        """
+        Dispatches a run to the warm worker process and waits for it (worker thread).
+        
+        Never touches Tk widgets; everything is reported through self._events.
+        """
         try:
-            self.status_label.config(text="Executing tracking script...", fg="blue")
-            self.root.update()
-            
-            # Get the path to tracker.py
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            tracker_script = os.path.join(script_dir, "tracker.py")
-            
-            # Run the tracker script
-            result = subprocess.run(
-                [sys.executable, tracker_script],
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
-            )
-            
-            if result.returncode == 0:
-                messagebox.showinfo(
-                    'Success',
-                    'Tracking script executed successfully!\n\n'
-                    'Check the output directory for generated files.'
-                )
-                self.status_label.config(text="Execution completed successfully!", fg="green")
-            else:
-                error_msg = result.stderr[:500] if result.stderr else "Unknown error"
-                messagebox.showerror(
-                    'Error',
-                    f'Script execution failed:\n{error_msg}'
-                )
-                self.status_label.config(text="Execution failed!", fg="red")
-                
-        except subprocess.TimeoutExpired:
-            messagebox.showerror('Error', 'Script execution timed out (exceeded 1 hour)')
-            self.status_label.config(text="Execution timed out!", fg="red")
+            event = self._run_worker.run(self._on_progress)
         except Exception as e:
-            messagebox.showerror('Error', f'Failed to execute script: {str(e)}')
+            logger.exception("Tracking run failed: %s", e)
+            event = ('error', str(e))
+        self._events.put(event)
+    
+    def _on_progress(self, progress):
+        """Progress listener of the run (called on the worker thread)."""
+        self._events.put(('progress', progress))
+    
+    def _poll_progress(self):
+        """Apply queued worker events to the widgets (Tk thread, via root.after)."""
+        latest = None
+        try:
+            while True:
+                event = self._events.get_nowait()
+                if event[0] == 'progress':
+                    latest = event[1]
+                else:
+                    if latest is not None:
+                        self._show_progress(latest)
+                        latest = None
+                    self._finish_run(event)
+        except queue.Empty:
+            pass
+        if latest is not None:
+            self._show_progress(latest)
+        
+        if self._worker is not None and (self._worker.is_alive() or not self._events.empty()):
+            self.root.after(POLL_INTERVAL_MS, self._poll_progress)
+        elif self._closing:
+            self._destroy()
+    
+    def _show_progress(self, progress):
+        """Update the progress bar and the progress line."""
+        if progress.stage != "fetch":
+            self.progress_label.config(text=STAGE_LABELS.get(progress.stage, progress.stage))
+            return
+        if progress.total:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', maximum=progress.total,
+                                     value=progress.processed)
+        eta = progress.eta
+        eta_text = "--:--" if eta is None else f"{int(eta // 60):02d}:{int(eta % 60):02d}"
+        self.progress_label.config(
+            text=f"{progress.processed}/{progress.total} items  |  "
+                 f"{progress.throughput:.1f} items/s  |  ETA {eta_text}  |  "
+                 f"{progress.failed} failed, {progress.no_info} no info"
+        )
+    
+    def _finish_run(self, event):
+        """Reset the controls and report the outcome of a run."""
+        self.progress_bar.stop()
+        self.execute_btn.config(state='normal')
+        self.cancel_btn.config(state='disabled')
+        if self._closing:
+            return
+        
+        if event[0] == 'error':
+            self.progress_bar.config(mode='determinate', value=0)
             self.status_label.config(text="Execution failed!", fg="red")
+            messagebox.showerror('Error', f'Tracking run failed:\n{event[1][:500]}')
+            return
+        
+        _, report_file, cancelled, not_processed = event
+        if report_file is None:
+            self.status_label.config(text="No tracking data was retrieved.", fg="red")
+        elif cancelled:
+            self.status_label.config(text="Run cancelled, partial report written.", fg="orange")
+            messagebox.showinfo(
+                'Cancelled',
+                f'Run cancelled; {not_processed} items were not processed.\n\n'
+                f'Partial report: {report_file}\n\n'
+                'Run "python src/tracker.py --resume" to finish the remaining items.'
+            )
+        else:
+            self.status_label.config(text="Execution completed successfully!", fg="green")
+            messagebox.showinfo('Success', f'Tracking run completed.\n\nReport: {report_file}')
+    
+    def _cancel_run(self):
+        """Ask the running tracker to stop; collected results are kept."""
+        if self._worker is None or not self._worker.is_alive():
+            return
+        self.cancel_btn.config(state='disabled')
+        self.status_label.config(text="Cancelling: finishing lookups in flight...", fg="orange")
+        self._run_worker.cancel()
     
     def _schedule_script(self):
-        """Schedule the script to run at a specific time."""
+        """
+        Save a daily run at the selected time for the scheduler service.
+        
+        Scheduled runs only happen while the scheduler service runs, so it is
+        started (after asking) when it is not running yet. The start-up is
+        waited for on a background thread, so the window stays responsive.
+        """
         try:
             hours = int(self.combo_hours.get())
             minutes = int(self.combo_minutes.get())
-            seconds = int(self.combo_seconds.get())
             
-            # Calculate next occurrence
-            now = datetime.datetime.now()
-            scheduled_time = now.replace(hour=hours, minute=minutes, second=seconds, microsecond=0)
+            # Persist a recurring job; the scheduler service executes it
+            job_name = schedule_daily(hours, minutes, CONFIG_PATH)
+            time_str = f"{hours:02d}:{minutes:02d}"
             
-            # If time has passed today, schedule for tomorrow
-            if scheduled_time <= now:
-                scheduled_time += datetime.timedelta(days=1)
+            with open(CONFIG_PATH, 'r') as f:
+                config = json.load(f)
+            running = service_running(config)
+            if not running and messagebox.askyesno(
+                    'Scheduler not running',
+                    'The job was saved, but scheduled runs only start while the scheduler '
+                    'service is running.\n\nStart the scheduler service now?'):
+                self.schedule_btn.config(state='disabled')
+                self.status_label.config(text="Starting the scheduler service...", fg="blue")
+                threading.Thread(target=self._start_service, name="scheduler-start", daemon=True).start()
+                self.root.after(POLL_INTERVAL_MS, self._poll_service_start, job_name, time_str)
+                return
             
-            # Set the schedule
-            set_time(hours, minutes, seconds)
-            
-            day_name = scheduled_time.strftime("%A")
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+            self._show_schedule(running, job_name, time_str)
             
+        except ValueError:
+            messagebox.showerror('Error', 'Please select valid time values')
+            self.status_label.config(text="Invalid time selection!", fg="red")
+        except Exception as e:
+            self._schedule_failed(e)
+    
+    def _start_service(self):
+        """
+        Starts the scheduler service and waits for it to come up (worker thread).
+        
+        Never touches Tk widgets; the outcome is reported through self._service_events.
+        """
+        try:
+            event = ('started', start_service(CONFIG_PATH))
+        except Exception as e:
+            logger.exception("Starting the scheduler service failed: %s", e)
+            event = ('error', e)
+        self._service_events.put(event)
+    
+    def _poll_service_start(self, job_name, time_str):
+        """Report the scheduler service start-up once it is over (Tk thread, via root.after)."""
+        try:
+            event = self._service_events.get_nowait()
+        except queue.Empty:
+            self.root.after(POLL_INTERVAL_MS, self._poll_service_start, job_name, time_str)
+            return
+        self.schedule_btn.config(state='normal')
+        if event[0] == 'error':
+            self._schedule_failed(event[1])
+        else:
+            self._show_schedule(event[1], job_name, time_str)
+    
+    def _show_schedule(self, running, job_name, time_str):
+        """Report a saved daily run, warning if the scheduler service is not running."""
+        if running:
             self.status_label.config(
-                text=f"Scheduled for {time_str} on {day_name}",
+                text=f"Scheduled daily at {time_str} ({job_name})",
                 fg="green"
             )
-            
             messagebox.showinfo(
                 'Scheduled',
-                f'Script scheduled to run at {time_str} on {day_name}'
+                f'Tracking will run every day at {time_str}.'
+            )
+        else:
+            self.status_label.config(
+                text=f"Saved {job_name}, but no run will start: scheduler service not running",
+                fg="orange"
+            )
+            messagebox.showwarning(
+                'Scheduler not running',
+                f'The daily run at {time_str} is saved, but it will not start until the '
+                'scheduler service runs:\n\npython src/scheduler.py --serve'
             )
-            
-        except ValueError:
-            messagebox.showerror('Error', 'Please select valid time values')
-            self.status_label.config(text="Invalid time selection!", fg="red")
-        except Exception as e:
-            messagebox.showerror('Error', f'Failed to schedule script: {str(e)}')
-            self.status_label.config(text="Scheduling failed!", fg="red")
+    
+    def _schedule_failed(self, error):
+        """Report an error while scheduling."""
+        messagebox.showerror('Error', f'Failed to schedule script: {str(error)}')
+        self.status_label.config(text="Scheduling failed!", fg="red")
     
     def _close_window(self):
-        """Close the dashboard window."""
+        """Close the dashboard window, cancelling a run in progress first."""
+        if self._worker is not None and self._worker.is_alive():
+            if not messagebox.askyesno(
+                'Run in progress',
+                'A tracking run is in progress. Cancel it and exit?\n\n'
+                'Results collected so far are kept in a partial report.'
+            ):
+                return
+            self._closing = True
+            self._cancel_run()
+            return  # _poll_progress closes the window when the worker has stopped
+        self._destroy()
+    
+    def _destroy(self):
+        """Stop the warm worker process and destroy the window."""
+        self._run_worker.stop()
         self.root.destroy()
 
 
 def main():
     """Main entry point for the dashboard."""
+    configure_logging()
     root = tk.Tk()
     app = TrackingDashboard(root)
     root.mainloop()
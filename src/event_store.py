@@ -0,0 +1,172 @@
+"""
+Event Store Module for MedshipmentTrackingTool
+
+This module keeps the full event history of every tracked item in a SQLite
+table indexed by tracking number and event time, so transit-time questions
+("items stuck in customs for more than 7 days") can be answered without
+scraping again.
+
+Usage:
+    python src/event_store.py --history EE123456789IN
+    python src/event_store.py --stuck "Send item to customs (Inb)" --days 7
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import datetime
+import threading
+
+# Seconds a write waits while another process (e.g. a shard worker) holds the lock
+BUSY_TIMEOUT = 30
+
+
+class EventStore:
+    """SQLite table of tracking events, one row per event."""
+
+    def __init__(self, db_path):
+        """
+        Initialize the event store.
+
+        Args:
+            db_path (str): Path of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        # Sharded runs open the file from several processes at once
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS tracking_events ("
+            "  tracking_number TEXT NOT NULL,"
+            "  event_time TEXT,"
+            "  local_time TEXT NOT NULL,"
+            "  country TEXT,"
+            "  location TEXT,"
+            "  event_type TEXT NOT NULL,"
+            "  mail_category TEXT,"
+            "  next_office TEXT,"
+            "  extra_information TEXT,"
+            "  UNIQUE (tracking_number, local_time, event_type, location)"
+            ");"
+            "CREATE INDEX IF NOT EXISTS idx_events_tracking_time "
+            "  ON tracking_events (tracking_number, event_time);"
+            "CREATE INDEX IF NOT EXISTS idx_events_time "
+            "  ON tracking_events (event_time);"
+        )
+        self._conn.commit()
+
+    def add_events(self, tracking_number, events):
+        """
+        Stores the events of one tracking number (already stored events are skipped).
+
+        Args:
+            tracking_number (str): The tracking number the events belong to
+            events (list): Event dicts from ips_parser.parse_tracking_page
+        """
+        rows = [
+            (
+                str(tracking_number),
+                event["event_time"].isoformat(sep=" ") if event.get("event_time") else None,
+                event["local_time"], event["country"], event["location"],
+                event["event_type"], event["mail_category"], event["next_office"],
+                event["extra_information"]
+            )
+            for event in events
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tracking_events "
+                "(tracking_number, event_time, local_time, country, location, "
+                " event_type, mail_category, next_office, extra_information) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def history(self, tracking_number):
+        """
+        Returns the stored events of a tracking number, oldest first.
+
+        Args:
+            tracking_number (str): The tracking number to look up
+
+        Returns:
+            list: Event dicts with the columns of the tracking_events table
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM tracking_events WHERE tracking_number = ? "
+                "ORDER BY event_time, rowid",
+                (str(tracking_number),)
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def stuck_items(self, event_type, min_days, now=None):
+        """
+        Finds items whose latest event is event_type and is older than min_days.
+
+        Args:
+            event_type (str): Event type, e.g. "Send item to customs (Inb)"
+            min_days (float): Minimum age of the latest event in days
+            now (datetime.datetime): Reference time (defaults to now)
+
+        Returns:
+            list: (tracking_number, event_time, location) tuples, oldest first
+        """
+        now = now or datetime.datetime.now()
+        cutoff = (now - datetime.timedelta(days=min_days)).isoformat(sep=" ")
+        with self._lock:
+            return self._conn.execute(
+                "SELECT e.tracking_number, e.event_time, e.location "
+                "FROM tracking_events e "
+                "JOIN (SELECT tracking_number, MAX(event_time) AS latest "
+                "      FROM tracking_events GROUP BY tracking_number) l "
+                "  ON e.tracking_number = l.tracking_number AND e.event_time = l.latest "
+                "WHERE e.event_type = ? AND e.event_time < ? "
+                "ORDER BY e.event_time",
+                (event_type, cutoff)
+            ).fetchall()
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    """Command line queries against the event store."""
+    parser = argparse.ArgumentParser(description="Query stored tracking event history.")
+    parser.add_argument("--config", default="config/config.json", help="configuration file")
+    parser.add_argument("--history", metavar="TRACKING_NUMBER", help="print all events of an item")
+    parser.add_argument("--stuck", metavar="EVENT_TYPE", help="list items whose latest event is EVENT_TYPE")
+    parser.add_argument("--days", type=float, default=7, help="minimum age for --stuck (default 7)")
+    args = parser.parse_args(argv)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    store = EventStore(config.get('event_store_file',
+                                  os.path.join(config['output_dir'], 'tracking-events.sqlite3')))
+
+    if args.history:
+        for event in store.history(args.history):
+            print(f"{event['local_time']:<22} {event['country']:<4} {event['location']:<30} {event['event_type']}")
+    elif args.stuck:
+        items = store.stuck_items(args.stuck, args.days)
+        for tracking_number, event_time, location in items:
+            print(f"{tracking_number:<16} {event_time:<20} {location}")
+        print(f"{len(items)} items in '{args.stuck}' for more than {args.days:g} days")
+    else:
+        parser.print_help()
+    store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
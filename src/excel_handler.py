@@ -6,11 +6,86 @@ writing output files, and generating categorized reports.
 """
 
 import os
+import csv
 import json
+import logging
 import datetime
+import functools
 import unicodedata
-from openpyxl import load_workbook
-import xlsxwriter
+from typing import Any, NamedTuple
+
+from src.report_writer import ReportWriter
+from src.categorizer import create_categorizer
+
+logger = logging.getLogger(__name__)
+
+
+# Event types and their corresponding status names (the 'event_mappings'
+# config key replaces this mapping)
+EVENT_MAPPINGS = {
+    "Receive item from customer (Otb)": "Booked",
+    "Receive item at office of exchange (Otb)": "Booked",
+    "Insert item into bag (Otb)": "InTransit",
+    "Receive item at office of exchange (Inb)": "InTransit",
+    "Receive item at delivery office (Inb)": "InTransitToDelivery",
+    "Deliver item (Inb)": "Delivered",
+    "Send item to customs (Inb)": "InBound",
+    "Return item from customs (Inb)": "OutBound",
+    "Unsuccessful item delivery attempt (Inb)": "NoticeLeft",
+    "Receive item at collection point for pick-up (Inb)": "NoticeLeft",
+    "Send item to domestic location (Inb)": "Returned",
+    "Record item customs information (Inb)": "Stuck"
+}
+
+
+class InputRow(NamedTuple):
+    """One row of the input sheet (columns A-D), kept together as a unit."""
+    order_id: Any
+    first_name: str
+    last_name: str
+    tracking_number: str
+
+
+# Column headers of Final-Data.xlsx and the category sheets
+HEADERS = [
+    'Local Date and Time', 'Country', 'Location', 'OrderId',
+    'First Name', 'Last Name', 'Tracking Number',
+    'Event Type', 'Mail Category', 'Next Office', 'Extra Information'
+]
+
+
+@functools.lru_cache(maxsize=8192)
+def _to_ascii(text):
+    """
+    Normalizes unicode characters to plain ASCII.
+    
+    Cached because report columns (country, event type, mail category, ...)
+    repeat the same few values on almost every row.
+    """
+    try:
+        return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    except Exception:
+        return text
+
+
+def _report_row(record):
+    """
+    Converts a tracking record into a category sheet row.
+    
+    Args:
+        record (list): Tracking record
+        
+    Returns:
+        list: Normalized values, one per header column
+    """
+    values = [
+        "NotFound" if value is None or value == "" else _to_ascii(str(value))
+        for value in record[:len(HEADERS)]
+    ]
+    
+    # Ensure we have the right number of columns
+    values.extend([""] * (len(HEADERS) - len(values)))
+    return values
 
 
 class ExcelHandler:
@@ -29,254 +104,232 @@ class ExcelHandler:
         # Ensure output directories exist
         os.makedirs(self.config['output_dir'], exist_ok=True)
         os.makedirs(self.config['items_dir'], exist_ok=True)
+        
+        # Event type -> status mapping and the engine that applies it
+        self.event_mappings = self.config.get('event_mappings', EVENT_MAPPINGS)
+        self.categorizer = create_categorizer(
+            self.config.get('categorization_engine', 'python'), self.event_mappings
+        )
+    
+    def _report_writer(self, path):
+        """Opens a constant-memory workbook with the configured CSV/Parquet side outputs."""
+        return ReportWriter(path, side_outputs=self.config.get('report_side_outputs', []))
     
     def read_input_data(self):
         """
         Reads tracking data from the input Excel file.
         
+        Each row keeps its order ID, names and tracking number together, so a
+        blank cell in one column cannot shift values onto another shipment.
+        
         Returns:
-            tuple: (order_ids, first_names, last_names, tracking_numbers)
+            list: InputRow records, in sheet order
         """
         try:
-            wb = load_workbook(self.config['input_file'])
-            ws = wb.active
-            
-            # Read columns A, B, C, D
-            order_column = ws['A']
-            firstName_column = ws['B']
-            lastName_column = ws['C']
-            trackingNum_column = ws['D']
-            
-            # Extract values (skip header row)
-            order_ids = [cell.value for cell in order_column[1:] if cell.value]
-            first_names = [cell.value for cell in firstName_column[1:] if cell.value]
-            last_names = [cell.value for cell in lastName_column[1:] if cell.value]
-            tracking_numbers = [cell.value for cell in trackingNum_column[1:] if cell.value]
-            
-            print(f"Collected {len(tracking_numbers)} tracking numbers from Excel")
-            return order_ids, first_names, last_names, tracking_numbers
+            rows = list(self.iter_input_rows())
+            logger.info("Collected %d tracking numbers from Excel", len(rows))
+            return rows
             
         except FileNotFoundError:
-            print(f"Error: Input file not found at {self.config['input_file']}")
+            logger.error("Input file not found at %s", self.config['input_file'])
             raise
         except Exception as e:
-            print(f"Error reading input file: {e}")
+            logger.error("Error reading input file: %s", e)
             raise
     
-    def write_final_data(self, tracking_data):
+    def iter_input_rows(self, input_file=None):
         """
-        Writes the complete tracking data to Final-Data.xlsx.
+        Streams rows from the input file without loading it into memory.
+        
+        Excel files are opened in openpyxl read-only mode; files ending in
+        .csv are read with the csv module (same column layout, header row
+        first). Rows without a tracking number are skipped.
         
         Args:
-            tracking_data (list): List of tracking records to write
+            input_file (str): Input file path (defaults to config 'input_file')
+            
+        Yields:
+            InputRow: One record per input row, in sheet order
         """
-        workbook = xlsxwriter.Workbook(self.config['final_data_file'])
-        worksheet = workbook.add_worksheet()
+        input_file = input_file or self.config['input_file']
+        if input_file.lower().endswith('.csv'):
+            rows = self._iter_csv_rows(input_file)
+        else:
+            rows = self._iter_xlsx_rows(input_file)
         
-        # Define headers
-        headers = [
-            'Local Date and Time', 'Country', 'Location', 'OrderId',
-            'First Name', 'Last Name', 'Tracking Number',
-            'Event Type', 'Mail Category', 'Next Office', 'Extra Information'
-        ]
-        
-        # Write headers
-        bold_format = workbook.add_format({'bold': True})
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header, bold_format)
-        
-        # Write data
-        for row, record in enumerate(tracking_data, start=1):
-            for col, value in enumerate(record):
-                worksheet.write(row, col, value)
+        for values in rows:
+            values = (tuple(values) + (None, None, None, None))[:4]
+            order_id, first_name, last_name, tracking_number = values
+            if tracking_number is None or str(tracking_number).strip() == "":
+                continue
+            yield InputRow(
+                order_id if order_id is not None else "",
+                str(first_name).strip() if first_name is not None else "",
+                str(last_name).strip() if last_name is not None else "",
+                str(tracking_number).strip()
+            )
+    
+    def _iter_xlsx_rows(self, input_file):
+        """Yields raw column A-D values from an Excel file (skipping the header)."""
+        from openpyxl import load_workbook  # Imported on first use, to keep start-up fast
+        wb = load_workbook(input_file, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            for values in ws.iter_rows(min_row=2, max_col=4, values_only=True):
+                yield values
+        finally:
+            wb.close()
+    
+    def _iter_csv_rows(self, input_file):
+        """Yields raw column A-D values from a CSV file (skipping the header)."""
+        with open(input_file, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for values in reader:
+                yield [value if value != "" else None for value in values[:4]]
+    
+    def write_final_data(self, tracking_data):
+        """
+        Writes the complete tracking data to Final-Data.xlsx.
         
-        workbook.close()
-        print(f"Final data written to {self.config['final_data_file']}")
+        Args:
+            tracking_data (iterable): Tracking records to write
+        """
+        with self._report_writer(self.config['final_data_file']) as writer:
+            writer.add_sheet(headers=HEADERS).write_rows(tracking_data)
+        logger.info("Final data written to %s", self.config['final_data_file'])
     
-    def categorize_shipments(self):
+    def categorize_shipments(self, tracking_data):
         """
-        Reads Final-Data.xlsx and categorizes shipments by status.
+        Categorizes tracking records by status.
         
+        Args:
+            tracking_data (list): List of tracking records (as passed to write_final_data)
+            
         Returns:
-            dict: Dictionary mapping status names to row numbers
+            dict: Dictionary mapping status names to tracking records
         """
-        wb = load_workbook(self.config['final_data_file'])
-        ws = wb.active
-        event_column = ws['H']  # Event Type column
-        
-        # Define event types and their corresponding status names
-        event_mappings = {
-            "Receive item from customer (Otb)": "Booked",
-            "Receive item at office of exchange (Otb)": "Booked",
-            "Insert item into bag (Otb)": "InTransit",
-            "Receive item at office of exchange (Inb)": "InTransit",
-            "Receive item at delivery office (Inb)": "InTransitToDelivery",
-            "Deliver item (Inb)": "Delivered",
-            "Send item to customs (Inb)": "InBound",
-            "Return item from customs (Inb)": "OutBound",
-            "Unsuccessful item delivery attempt (Inb)": "NoticeLeft",
-            "Receive item at collection point for pick-up (Inb)": "NoticeLeft",
-            "Send item to domestic location (Inb)": "Returned",
-            "Record item customs information (Inb)": "Stuck"
-        }
-        
-        # Initialize category lists
-        categories = {
-            "Booked": [],
-            "InTransit": [],
-            "InBound": [],
-            "OutBound": [],
-            "Delivered": [],
-            "NoticeLeft": [],
-            "InTransitToDelivery": [],
-            "Stuck": [],
-            "Returned": []
-        }
-        
-        # Categorize rows based on event type
-        for idx, cell in enumerate(event_column[1:], start=2):  # Start from row 2 (skip header)
-            if cell.value in event_mappings:
-                category = event_mappings[cell.value]
-                categories[category].append(idx)
-        
-        return categories
+        return self.summarize_shipments(tracking_data).categories
     
-    def extract_row_numbers(self, cell_list):
+    def summarize_shipments(self, tracking_data):
         """
-        Extracts row numbers from openpyxl cell objects.
+        Categorizes tracking records and computes the report aggregates in one pass.
         
         Args:
-            cell_list (list): List of openpyxl cell objects
+            tracking_data (list): List of tracking records (as passed to write_final_data)
             
         Returns:
-            list: List of row numbers (integers)
+            ShipmentSummary: Records by category, counts, records per country
+                             and age of the latest events per category
         """
-        row_numbers = []
-        for cell in cell_list:
-            try:
-                # Extract row number from cell object string representation
-                cell_str = str(cell)
-                row_num = int(cell_str.split(".")[1].replace(">", "").replace("H", ""))
-                row_numbers.append(row_num)
-            except (ValueError, IndexError) as e:
-                print(f"Error extracting row number from {cell}: {e}")
-                continue
-        return row_numbers
+        return self.categorizer.categorize(tracking_data)
     
-    def generate_categorized_report(self, categories):
+    def generate_categorized_report(self, categories, summary=None):
         """
         Generates Excel file with categorized shipments in separate sheets.
         
         Args:
-            categories (dict): Dictionary mapping category names to row numbers
+            categories (dict): Dictionary mapping category names to tracking records
+            summary (ShipmentSummary): Aggregates from summarize_shipments; adds
+                                       the "By Country" and "Event Age" sheets
             
         Returns:
             str: Path to generated file
         """
-        # Load the final data workbook
-        wb = load_workbook(self.config['final_data_file'])
-        ws = wb.active
-        
         # Generate timestamp for filename
         timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
         output_file = os.path.join(self.config['items_dir'], f'Data{timestamp}.xlsx')
         
-        workbook = xlsxwriter.Workbook(output_file)
-        
-        # Generate sheet for each category
-        for category_name, row_numbers in categories.items():
-            if len(row_numbers) > 0:
-                self._create_category_sheet(workbook, ws, category_name, row_numbers)
-        
-        # Create summary sheet
-        self._create_summary_sheet(workbook, categories)
+        with self._report_writer(output_file) as writer:
+            # Stream each category bucket to its own sheet
+            for category_name, records in categories.items():
+                if len(records) > 0:
+                    self._create_category_sheet(writer, category_name, records)
+            
+            # Create summary sheet
+            if summary is not None:
+                counts = summary.counts
+            else:
+                counts = {category: len(records) for category, records in categories.items()}
+            self._create_summary_sheet(writer, counts)
+            
+            if summary is not None:
+                self._create_country_sheet(writer, summary.by_country, list(counts))
+                self._create_event_age_sheet(writer, summary.event_age)
         
-        workbook.close()
-        print(f"Categorized report generated: {output_file}")
+        logger.info("Categorized report generated: %s", output_file)
         return output_file
     
-    def _create_category_sheet(self, workbook, worksheet_parent, sheet_name, row_numbers):
+    def _create_category_sheet(self, writer, sheet_name, records):
         """
         Creates a worksheet for a specific category.
         
         Args:
-            workbook: xlsxwriter workbook object
-            worksheet_parent: openpyxl worksheet to read from
+            writer (ReportWriter): Report being written
             sheet_name (str): Name of the sheet to create
-            row_numbers (list): List of row numbers to include
+            records (list): Tracking records to include
         """
-        worksheet = workbook.add_worksheet(sheet_name)
-        
-        # Write headers
-        headers = [
-            'Local Date and Time', 'Country', 'Location', 'OrderId',
-            'First Name', 'Last Name', 'Tracking Number',
-            'Event Type', 'Mail Category', 'Next Office', 'Extra Information'
-        ]
-        bold_format = workbook.add_format({'bold': True})
-        
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header, bold_format)
-        
-        # Write data rows
-        for row_idx, row_num in enumerate(row_numbers, start=1):
-            try:
-                row_data = list(worksheet_parent.rows)[row_num - 1]
-                values = []
-                
-                for cell in row_data:
-                    if cell.value is None:
-                        values.append("NotFound")
-                    else:
-                        # Normalize unicode characters
-                        try:
-                            value = unicodedata.normalize('NFKD', str(cell.value)).encode('ascii', 'ignore').decode('ascii')
-                            values.append(value)
-                        except:
-                            values.append(str(cell.value))
-                
-                # Ensure we have the right number of columns
-                while len(values) < len(headers):
-                    values.append("")
-                
-                for col_idx, value in enumerate(values[:len(headers)]):
-                    worksheet.write(row_idx, col_idx, value)
-                    
-            except Exception as e:
-                print(f"Error writing row {row_num} to {sheet_name}: {e}")
-                continue
+        sheet = writer.add_sheet(sheet_name, HEADERS)
+        sheet.write_rows(_report_row(record) for record in records)
     
-    def _create_summary_sheet(self, workbook, categories):
+    def _create_summary_sheet(self, writer, counts):
         """
         Creates a summary sheet with counts for each category.
         
         Args:
-            workbook: xlsxwriter workbook object
-            categories (dict): Dictionary mapping category names to row numbers
+            writer (ReportWriter): Report being written
+            counts (dict): Dictionary mapping category names to record counts
         """
-        worksheet = workbook.add_worksheet("Summary")
-        
-        # Write headers
-        worksheet.write(0, 0, "ITEMS", workbook.add_format({'bold': True}))
-        worksheet.write(0, 1, "COUNT", workbook.add_format({'bold': True}))
-        
-        # Calculate totals
-        total_items = sum(len(rows) for rows in categories.values())
+        sheet = writer.add_sheet("Summary", ["ITEMS", "COUNT"], side_outputs=False)
         
         # Write category counts
-        summary_data = [
-            ("Delivered Items", len(categories.get("Delivered", []))),
-            ("Booked Items", len(categories.get("Booked", []))),
-            ("Items in InBound", len(categories.get("InBound", []))),
-            ("Items in Intransit", len(categories.get("InTransit", []))),
-            ("Items in Notice Left", len(categories.get("NoticeLeft", []))),
-            ("Items in OutBound", len(categories.get("OutBound", []))),
-            ("Intransit to Delivery items", len(categories.get("InTransitToDelivery", []))),
-            ("Items in Stuck", len(categories.get("Stuck", []))),
-            ("Return Items", len(categories.get("Returned", []))),
-            ("TOTAL ITEMS", total_items)
+        labels = [
+            ("Delivered Items", "Delivered"),
+            ("Booked Items", "Booked"),
+            ("Items in InBound", "InBound"),
+            ("Items in Intransit", "InTransit"),
+            ("Items in Notice Left", "NoticeLeft"),
+            ("Items in OutBound", "OutBound"),
+            ("Intransit to Delivery items", "InTransitToDelivery"),
+            ("Items in Stuck", "Stuck"),
+            ("Return Items", "Returned")
         ]
+        # Categories added through the 'event_mappings' config key
+        labelled = {category for _, category in labels}
+        labels.extend((f"Items in {category}", category) for category in counts if category not in labelled)
         
-        for row_idx, (item_name, count) in enumerate(summary_data, start=1):
-            worksheet.write(row_idx, 0, item_name)
-            worksheet.write(row_idx, 1, count)
+        summary_data = [(label, counts.get(category, 0)) for label, category in labels]
+        summary_data.append(("TOTAL ITEMS", sum(counts.values())))
+        sheet.write_rows(summary_data)
+    
+    def _create_country_sheet(self, writer, by_country, category_names):
+        """
+        Creates a sheet with the number of items per country and category.
+        
+        Args:
+            writer (ReportWriter): Report being written
+            by_country (dict): Country -> {category: count}
+            category_names (list): Category columns, in report order
+        """
+        sheet = writer.add_sheet("By Country", ["Country"] + category_names + ["Total"], side_outputs=False)
+        sheet.write_rows(
+            [country] + [counts.get(category, 0) for category in category_names] + [sum(counts.values())]
+            for country, counts in by_country.items()
+        )
+    
+    def _create_event_age_sheet(self, writer, event_age):
+        """
+        Creates a sheet with the age of the latest event of the items in each category.
+        
+        Args:
+            writer (ReportWriter): Report being written
+            event_age (dict): Category -> age statistics (see ShipmentSummary)
+        """
+        sheet = writer.add_sheet("Event Age", [
+            "Category", "Items", "Newest Event", "Oldest Event", "Median Age (days)", "Max Age (days)"
+        ], side_outputs=False)
+        sheet.write_rows(
+            [category, stats['items'], stats['newest'].strftime("%Y-%m-%d %H:%M"),
+             stats['oldest'].strftime("%Y-%m-%d %H:%M"), stats['median_age_days'], stats['max_age_days']]
+            for category, stats in event_age.items()
+        )
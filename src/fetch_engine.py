@@ -0,0 +1,83 @@
+"""
+Fetch Engine Module for MedshipmentTrackingTool
+
+This module runs tracking lookups concurrently on a thread pool while capping
+the number of simultaneous requests sent to any single host.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class FetchEngine:
+    """Thread pool for tracking lookups with a per-host concurrency cap."""
+
+    def __init__(self, max_workers=8, max_per_host=4):
+        """
+        Initialize the fetch engine.
+
+        Args:
+            max_workers (int): Number of worker threads
+            max_per_host (int): Maximum simultaneous requests to one host
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_per_host = max(1, int(max_per_host))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="fetch"
+        )
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.shutdown()
+        return False
+
+    @contextmanager
+    def host_slot(self, url):
+        """
+        Holds one of the request slots for the host of the given URL.
+
+        Args:
+            url (str): URL (or bare host name) about to be requested
+        """
+        host = urlparse(url).netloc or url
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+        with slot:
+            yield
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules a call on the worker pool.
+
+        Returns:
+            concurrent.futures.Future: Future for the call result
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        """
+        Runs fn over items concurrently.
+
+        Args:
+            fn (callable): Function to call for each item
+            items (iterable): Items to process
+
+        Returns:
+            list: Results in the same order as items
+        """
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """Stops the worker pool."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,120 @@
+"""
+HTTP Replay Module for MedshipmentTrackingTool
+
+This module provides requests transport adapters that record responses to a
+fixture directory and replay them later, so tracking runs can be repeated
+without reaching the IPS and zip code sites.
+"""
+
+import base64
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers that describe the wire format, not the (already decoded) body
+_TRANSPORT_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+
+def fixture_path(fixture_dir, method, url):
+    """
+    Returns the fixture file used for a request.
+
+    Args:
+        fixture_dir (str): Fixture directory
+        method (str): HTTP method
+        url (str): Full request URL
+
+    Returns:
+        str: Path of the JSON fixture file
+    """
+    digest = hashlib.sha1(f"{method.upper()} {url}".encode("utf-8")).hexdigest()[:20]
+    host = urlparse(url).netloc.replace(":", "_") or "local"
+    return os.path.join(fixture_dir, host, f"{digest}.json")
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that also saves every response to the fixture directory."""
+
+    def __init__(self, fixture_dir, **kwargs):
+        """
+        Initialize the adapter.
+
+        Args:
+            fixture_dir (str): Directory receiving the recorded responses
+            **kwargs: Passed to HTTPAdapter (pool size, retries, ...)
+        """
+        super().__init__(**kwargs)
+        self.fixture_dir = fixture_dir
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 304:
+            # Not a page to replay; keep the full response recorded earlier
+            return response
+        body = response.content
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in _TRANSPORT_HEADERS
+            }
+        }
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(body).decode("ascii")
+
+        path = fixture_path(self.fixture_dir, request.method, request.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=1)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter that answers requests from recorded fixtures only."""
+
+    def __init__(self, fixture_dir):
+        """
+        Initialize the adapter.
+
+        Args:
+            fixture_dir (str): Directory holding recorded responses
+        """
+        super().__init__()
+        self.fixture_dir = fixture_dir
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path = fixture_path(self.fixture_dir, request.method, request.url)
+        if not os.path.exists(path):
+            raise requests.ConnectionError(
+                f"No recorded response for {request.method} {request.url}", request=request
+            )
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason", "")
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        if "body_base64" in entry:
+            response._content = base64.b64decode(entry["body_base64"])
+        else:
+            response._content = entry.get("body", "").encode("utf-8")
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,247 @@
+"""
+IPS Parser Module for MedshipmentTrackingTool
+
+This module extracts tracking events and zip code locations from fetched HTML
+pages. Only the fragment that holds the data (the td.tabproperty events table,
+or the page heading) is handed to lxml, instead of building a BeautifulSoup
+tree of the whole page. Table cells are read individually, so the result does
+not depend on the page's whitespace layout.
+"""
+
+import re
+import hashlib
+import datetime
+
+import lxml.html
+from lxml import etree
+
+
+# Date formats seen in the "Local Date and Time" column of IPS pages
+EVENT_TIME_FORMATS = (
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+)
+
+# Field names of one IPS event row, in page column order
+EVENT_FIELDS = (
+    "local_time", "country", "location", "event_type",
+    "mail_category", "next_office", "extra_information"
+)
+
+# Fast path for the usual IPS format, e.g. "3/29/2024 1:22:00 PM"
+_EVENT_TIME_RE = re.compile(
+    r"(\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{2})(?::(\d{2}))?(?: ([AP]M))?$", re.I
+)
+
+# Compiled XPath expressions (compiled once, reused for every page)
+_PARAGRAPHS = etree.XPath("//p")
+_FIRST_H1 = etree.XPath("(//h1)[1]")
+
+
+def _clean_text(element):
+    """Returns the ASCII text of an element with whitespace collapsed."""
+    text = (element.text or "") if len(element) == 0 else "".join(element.itertext())
+    if not text.isascii():
+        text = text.encode('ascii', 'ignore').decode('ascii')
+    return " ".join(text.split())
+
+
+def _parse_document(html):
+    """
+    Parses an HTML page or fragment.
+
+    Args:
+        html (str/bytes): Page content
+
+    Returns:
+        lxml.html.HtmlElement: Document root, or None if the page is empty
+    """
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def _slice(html, marker, start_tag, end_tag):
+    """
+    Cuts the fragment around the first occurrence of marker.
+
+    Args:
+        html (str/bytes): Page content
+        marker, start_tag, end_tag (str): Marker text, the opening tag that
+            precedes it, and the closing tag that ends the fragment
+
+    Returns:
+        str/bytes: The fragment, or None if marker is not on the page
+    """
+    if isinstance(html, bytes):
+        marker, start_tag, end_tag = marker.encode(), start_tag.encode(), end_tag.encode()
+    position = html.find(marker)
+    if position < 0:
+        return None
+    start = html.rfind(start_tag, 0, position)
+    end = html.find(end_tag, position)
+    return html[max(start, 0):len(html) if end < 0 else end + len(end_tag)]
+
+
+def parse_event_time(text):
+    """
+    Parses an IPS "Local Date and Time" value.
+
+    Args:
+        text (str): Date and time as shown on the tracking page
+
+    Returns:
+        datetime.datetime: Parsed timestamp, or None if the format is unknown
+    """
+    text = " ".join(str(text).split())
+    match = _EVENT_TIME_RE.match(text)
+    if match:
+        month, day, year, hour, minute, second, meridiem = match.groups()
+        hour = int(hour)
+        if meridiem:
+            hour = hour % 12 + (12 if meridiem.upper() == "PM" else 0)
+        try:
+            return datetime.datetime(int(year), int(month), int(day),
+                                     hour, int(minute), int(second or 0))
+        except ValueError:
+            pass
+    for fmt in EVENT_TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_tracking_page(html):
+    """
+    Extracts the tracking events from an IPS item events page.
+
+    Args:
+        html (str/bytes): Page content
+
+    Returns:
+        dict: {'events': list of event dicts (EVENT_FIELDS plus a parsed
+               'event_time'), oldest first as on the page,
+               'message': the page's notice text when it has no events}
+    """
+    root = None
+    fragment = _slice(html, "tabproperty", "<td", "</table>")
+    if fragment is not None:
+        cells = _find_tabproperty(_parse_document(fragment))
+        if not cells:
+            # The marker matched something else (e.g. a stylesheet rule)
+            root = _parse_document(html)
+            cells = _find_tabproperty(root)
+        if cells:
+            events = _parse_events(cells[0])
+            if events:
+                return {'events': events, 'message': ""}
+
+    # No events: the notice is in the second paragraph of the page
+    if root is None:
+        root = _parse_document(html)
+    message = ""
+    if root is not None:
+        paragraphs = _PARAGRAPHS(root)
+        if len(paragraphs) > 1:
+            message = _clean_text(paragraphs[1])
+    return {'events': [], 'message': message}
+
+
+def events_fragment_hash(html):
+    """
+    Returns a hash of the events table of an IPS page.
+
+    Only the td.tabproperty fragment is hashed, so parts of the page that
+    change on every request (form state, banners) do not count as a change.
+
+    Args:
+        html (str/bytes): Page content
+
+    Returns:
+        str: Hex digest of the fragment, or None if the page has no events table
+    """
+    fragment = _slice(html, "tabproperty", "<td", "</table>")
+    if fragment is None:
+        return None
+    if isinstance(fragment, str):
+        fragment = fragment.encode('utf-8')
+    return hashlib.sha1(fragment).hexdigest()
+
+
+def _find_tabproperty(root):
+    """Returns the td.tabproperty elements of a parsed document (or [] for None)."""
+    if root is None:
+        return []
+    return [cell for cell in root.iter("td") if "tabproperty" in (cell.get("class") or "").split()]
+
+
+def _parse_events(table_cell):
+    """
+    Reads the event rows of the td.tabproperty element.
+
+    Args:
+        table_cell (lxml.html.HtmlElement): The td.tabproperty element
+
+    Returns:
+        list: Event dicts, oldest first
+    """
+    events = []
+    for row in table_cell.iter("tr"):
+        cells = [cell for cell in row if cell.tag == "td"]
+        if len(cells) < 4:
+            continue  # Header or layout row
+
+        values = [_clean_text(cell) for cell in cells[:len(EVENT_FIELDS)]]
+        values.extend([""] * (len(EVENT_FIELDS) - len(values)))
+        event = dict(zip(EVENT_FIELDS, values))
+        event["event_time"] = parse_event_time(event["local_time"])
+        events.append(event)
+    return events
+
+
+def event_to_row(event):
+    """
+    Converts a parsed event into the event data list used by the tracker.
+
+    Args:
+        event (dict): Event from parse_tracking_page
+
+    Returns:
+        list: [local time, country, location, event type, mail category,
+               next office, extra information]
+    """
+    return [event[field] for field in EVENT_FIELDS]
+
+
+def parse_zip_page(html):
+    """
+    Extracts the location from a zip-codes.com page heading.
+
+    Args:
+        html (str/bytes): Page content
+
+    Returns:
+        str: Comma-separated location information, or 0 if not found
+    """
+    root = _parse_document(_slice(html, "<h1", "<h1", "</h1>") or html)
+    if root is None:
+        return 0
+
+    headings = _FIRST_H1(root)
+    if not headings:
+        return 0
+
+    # Extract and format location data
+    location_parts = headings[0].text_content().encode('ascii', 'ignore').decode('ascii').split(",")
+    location_parts.insert(3, location_parts[0])
+    location_parts.pop(0)
+    return ",".join(location_parts)
@@ -0,0 +1,230 @@
+"""
+IPS Stand-in Server for MedshipmentTrackingTool
+
+A small local HTTP server that mimics IPSWeb_item_events.aspx and the zip code
+pages, with configurable latency and error injection. Point the config keys
+'ips_tracking_url' and 'zip_code_url' at it to run the tracker (or a
+benchmark) without reaching the live sites.
+
+Pages are generated from the tracking number, so the same item always gets
+the same events.
+
+Usage:
+    python src/ips_standin.py --port 8800 --latency 0.2 --error-rate 0.05
+
+    "ips_tracking_url": "http://127.0.0.1:8800/ipswebtracking/IPSWeb_item_events.aspx"
+    "zip_code_url": "http://127.0.0.1:8800/zip-code"
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Event sequence of a shipment, in the order IPS reports them
+EVENT_SEQUENCE = [
+    ("IN", "MUMBAI FPO", "Receive item from customer (Otb)"),
+    ("IN", "MUMBAI FPO", "Receive item at office of exchange (Otb)"),
+    ("IN", "MUMBAI FPO", "Insert item into bag (Otb)"),
+    ("US", "ISC NEW YORK NY(USPS)", "Receive item at office of exchange (Inb)"),
+    ("US", "ISC NEW YORK NY(USPS)", "Send item to customs (Inb)"),
+    ("US", "ISC NEW YORK NY(USPS)", "Return item from customs (Inb)"),
+    ("US", "{zip}", "Receive item at delivery office (Inb)"),
+    ("US", "{zip}", "Deliver item (Inb)"),
+]
+
+# Number of distinct delivery zip codes the generated items are spread over
+ZIP_CODE_POOL = 500
+
+_ZIP_PATH = re.compile(r"/(\d{5})/zip-code-\d{5}\.asp$")
+
+
+def synthetic_events(tracking_number):
+    """
+    Generates the event history of a tracking number.
+
+    Args:
+        tracking_number (str): The tracking number
+
+    Returns:
+        list: Event rows (local time, country, location, event type,
+              mail category, next office, extra information), oldest first
+    """
+    seed = zlib.crc32(str(tracking_number).encode("utf-8"))
+    rng = random.Random(seed)
+    count = rng.randint(1, len(EVENT_SEQUENCE))
+    zip_code = f"{10001 + (seed % ZIP_CODE_POOL) * 179:05d}"
+    start = time.mktime((2024, rng.randint(1, 12), rng.randint(1, 28), 9, 0, 0, 0, 0, -1))
+
+    events = []
+    moment = start
+    for country, location, event_type in EVENT_SEQUENCE[:count]:
+        moment += rng.randint(2, 72) * 3600
+        stamp = time.strftime("%m/%d/%Y %I:%M:%S %p", time.localtime(moment)).lstrip("0")
+        events.append([
+            stamp, country, location.format(zip=zip_code), event_type, "A", "", ""
+        ])
+    return events
+
+
+def render_item_events_page(tracking_number, events):
+    """
+    Renders an IPS item events page.
+
+    Args:
+        tracking_number (str): The tracking number shown in the title
+        events (list): Event rows as returned by synthetic_events; an empty
+                       list renders the "no information" page
+
+    Returns:
+        str: HTML page
+    """
+    if events:
+        rows = "\n".join(
+            "<tr>" + "".join(f"<td>{escape(str(value))}</td>" for value in event) + "</tr>"
+            for event in events
+        )
+        body = (
+            '<table class="items"><tr><td class="tabproperty">\n'
+            '<table border="1">\n'
+            "<tr><th>Local Date and Time</th><th>Country</th><th>Location</th>"
+            "<th>Event Type</th><th>Mail Category</th><th>Next Office</th>"
+            "<th>Extra Information</th></tr>\n"
+            f"{rows}\n</table>\n</td></tr></table>"
+        )
+    else:
+        body = (
+            "<p>Item Events</p>\n"
+            f"<p>No information available for item {escape(str(tracking_number))}.</p>"
+        )
+    return (
+        "<html><head><title>IPS Web Tracking - Item Events</title></head><body>\n"
+        '<form method="post" action="IPSWeb_item_events.aspx">\n'
+        f"<h2>Item Events - {escape(str(tracking_number))}</h2>\n{body}\n"
+        "</form></body></html>"
+    )
+
+
+def render_zip_page(zip_code):
+    """
+    Renders a zip code page.
+
+    Args:
+        zip_code (str): The zip code
+
+    Returns:
+        str: HTML page
+    """
+    return (
+        f"<html><head><title>ZIP Code {zip_code}</title></head><body>\n"
+        f"<h1>ZIP Code {zip_code}, Standin City, ST</h1>\n</body></html>"
+    )
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the server's settings."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            self._send(503, "<html><body>Service Unavailable</body></html>")
+            return
+
+        url = urlparse(self.path)
+        zip_match = _ZIP_PATH.search(url.path)
+        if zip_match:
+            self._send(200, render_zip_page(zip_match.group(1)))
+        elif url.path.lower().endswith("ipsweb_item_events.aspx"):
+            tracking_number = parse_qs(url.query).get("itemid", [""])[0]
+            no_info = not tracking_number or (
+                zlib.crc32(tracking_number.encode("utf-8")) % 1000 < server.no_info_rate * 1000
+            )
+            events = [] if no_info else synthetic_events(tracking_number)
+            self._send(200, render_item_events_page(tracking_number, events))
+        else:
+            self._send(404, "<html><body>Not Found</body></html>")
+
+    def _send(self, status, html):
+        body = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, no_info_rate=0.0, verbose=False):
+    """
+    Starts the stand-in server on a background thread.
+
+    Args:
+        host (str): Address to bind
+        port (int): Port to bind (0 picks a free port)
+        latency (float): Fixed delay per request in seconds
+        jitter (float): Extra random delay (0..jitter seconds)
+        error_rate (float): Fraction of requests answered with 503
+        no_info_rate (float): Fraction of tracking numbers without events
+        verbose (bool): Log every request
+
+    Returns:
+        ThreadingHTTPServer: Running server; its base URL is
+        f"http://{host}:{server.server_address[1]}"
+    """
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.no_info_rate = no_info_rate
+    server.verbose = verbose
+    thread = threading.Thread(target=server.serve_forever, name="ips-standin", daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    """Runs the stand-in server until interrupted."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the IPS and zip code sites.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="delay per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--no-info-rate", type=float, default=0.0,
+                        help="fraction of tracking numbers without events")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = start_server(args.host, args.port, args.latency, args.jitter,
+                          args.error_rate, args.no_info_rate, args.verbose)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"IPS stand-in listening on {base_url}")
+    print(f"  ips_tracking_url: {base_url}/ipswebtracking/IPSWeb_item_events.aspx")
+    print(f"  zip_code_url:     {base_url}/zip-code")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Logging Configuration Module for MedshipmentTrackingTool
+
+This module sets up logging for the command line tools: readable text lines
+for a console, or one JSON object per line for log collectors. Values passed
+with extra={...} (tracking_number, latency, ...) become fields of the JSON
+record and key=value pairs of the text line.
+"""
+
+import json
+import logging
+import sys
+
+# Attributes every LogRecord has; anything else was passed through extra={...}
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _extra_fields(record):
+    """Returns the fields passed to a logging call through extra={...}."""
+    return {
+        name: value for name, value in vars(record).items()
+        if name not in _STANDARD_ATTRIBUTES and not name.startswith("_")
+    }
+
+
+class TextFormatter(logging.Formatter):
+    """Formats records as 'time level message key=value ...'."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level="INFO", log_format="text", stream=None):
+    """
+    Configures the root logger.
+
+    Args:
+        level (str/int): Minimum level to emit
+        log_format (str): "text" or "json"
+        stream: Output stream (defaults to stdout)
+    """
+    if log_format not in ("text", "json"):
+        raise ValueError(f"Unknown log format: {log_format!r} (expected 'text' or 'json')")
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
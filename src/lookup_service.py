@@ -0,0 +1,420 @@
+"""
+Lookup Service Module for MedshipmentTrackingTool
+
+A long-running local HTTP/JSON service answering status queries for single
+tracking numbers or small batches, without running a whole tracking batch.
+Lookups go through fetch_tracking_data on a shared keep-alive session, paced
+by the same rate limiter and circuit breaker as tracking runs.
+
+Two things keep repeated lookups cheap:
+- concurrent requests for the same tracking number share one in-flight IPS
+  fetch (singleflight), and
+- results are kept in a TTL cache, so a parcel looked up again within
+  lookup_cache_ttl_seconds is answered without a scrape.
+
+Endpoints:
+    GET  /track/<tracking_number>        status of one item
+    GET  /track?ids=<tn>,<tn>,...        status of several items
+    POST /track  {"tracking_numbers": [...]}
+    GET  /health                         liveness and cache size
+    GET  /metrics                        Prometheus metrics
+
+Usage:
+    python src/lookup_service.py [--host 127.0.0.1] [--port 8810]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, unquote
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.web_scraper import fetch_tracking_data, get_zip_codes, TrackingFetchError
+from src.ips_parser import EVENT_FIELDS
+from src.excel_handler import EVENT_MAPPINGS
+from src.tracker import (create_http_session, create_rate_limiter, create_circuit_breaker,
+                         create_zip_cache, enrich_location, locate_zip)
+from src.zip_gazetteer import open_gazetteer
+from src.metrics import MetricsRegistry
+from src.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_size=10000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of entries
+        """
+        self.max_size = max(1, int(max_size))
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value of key, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, ttl):
+        """
+        Stores a value for ttl seconds (a ttl of 0 or less stores nothing).
+        """
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the call in flight
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Calls fn(), unless a call for key is already running, then waits for that one.
+
+        Args:
+            key: Identifies the call (e.g. the tracking number)
+            fn (callable): Function performing the work
+
+        Returns:
+            tuple: (result of fn, shared) where shared is True if the result
+                   came from another caller's call
+
+        Raises:
+            Exception: Whatever fn raised (raised in every waiting caller)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+
+class TrackingLookupService:
+    """Looks up tracking numbers on the IPS site with coalescing and caching."""
+
+    def __init__(self, config):
+        """
+        Initialize the service.
+
+        Args:
+            config (dict): Tracker configuration (config/config.json)
+        """
+        self.config = config
+        self.ips_url = config['ips_tracking_url']
+        self.zip_url = config['zip_code_url']
+        self.event_mappings = config.get('event_mappings', EVENT_MAPPINGS)
+        self.cache_ttl = config.get('lookup_cache_ttl_seconds', 300)
+        self.negative_ttl = config.get('lookup_negative_ttl_seconds', 60)
+        self.max_bulk = config.get('lookup_max_bulk', 100)
+
+        # Session, throttling and zip code lookups are set up as for tracking runs
+        workers = config.get('fetch_workers', 8)
+        self.session = create_http_session(config)
+        self.rate_limiter = create_rate_limiter(config)
+        self.circuit_breaker = create_circuit_breaker(config)
+        self.zip_cache = create_zip_cache(config)
+        self.zip_gazetteer = open_gazetteer(config)
+
+        self.cache = TTLCache(config.get('lookup_cache_size', 10000))
+        self.single_flight = SingleFlight()
+        self._bulk_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup")
+
+        self.metrics = MetricsRegistry()
+        self.lookups = self.metrics.counter(
+            "lookups_total", "Status lookups by source (cache, coalesced, fetch)")
+        self.fetch_results = self.metrics.counter(
+            "fetch_results_total", "IPS lookups by outcome (success, no_info, failure)")
+        self.ips_latency = self.metrics.histogram(
+            "ips_request_seconds", "Latency of IPS tracking page requests")
+
+    def lookup(self, tracking_number):
+        """
+        Returns the status of one tracking number.
+
+        Args:
+            tracking_number (str): The tracking number to look up
+
+        Returns:
+            dict: 'tracking_number', 'status' ("ok", "no_info" or "error"),
+                  'category', 'event' (field dict or None), 'fetched_at',
+                  'source' ("cache", "coalesced" or "fetch") and, for
+                  errors, 'error'
+        """
+        tracking_number = tracking_number.strip().upper()
+        result = self.cache.get(tracking_number)
+        if result is not None:
+            self.lookups.inc(source="cache")
+            return dict(result, source="cache")
+
+        try:
+            result, shared = self.single_flight.do(
+                tracking_number, lambda: self._fetch(tracking_number))
+        except TrackingFetchError as e:
+            self.lookups.inc(source="fetch")
+            return {
+                'tracking_number': tracking_number, 'status': "error", 'category': None,
+                'event': None, 'fetched_at': None, 'source': "fetch", 'error': str(e)
+            }
+        source = "coalesced" if shared else "fetch"
+        self.lookups.inc(source=source)
+        return dict(result, source=source)
+
+    def lookup_many(self, tracking_numbers):
+        """
+        Returns the status of several tracking numbers, looked up concurrently.
+
+        Args:
+            tracking_numbers (list): Tracking numbers (at most lookup_max_bulk)
+
+        Returns:
+            list: lookup() results, in request order
+
+        Raises:
+            ValueError: If more than lookup_max_bulk tracking numbers are given
+        """
+        if len(tracking_numbers) > self.max_bulk:
+            raise ValueError(f"At most {self.max_bulk} tracking numbers per request")
+        return list(self._bulk_pool.map(self.lookup, tracking_numbers))
+
+    def _fetch(self, tracking_number):
+        """
+        Fetches one tracking number from the IPS site and caches the result.
+
+        Raises:
+            TrackingFetchError: If the IPS site could not be reached (not cached)
+        """
+        # Fail fast while the circuit is open; once its cooldown is over this
+        # request becomes the probe
+        if not self.circuit_breaker.try_acquire():
+            raise TrackingFetchError("IPS site unavailable (circuit open), try again later")
+        self.rate_limiter.acquire()
+
+        started = time.monotonic()
+        try:
+            event_data = fetch_tracking_data(tracking_number, self.ips_url, self.session, raise_errors=True)
+        except TrackingFetchError:
+            self.ips_latency.observe(time.monotonic() - started)
+            self.fetch_results.inc(outcome="failure")
+            self.circuit_breaker.record_failure()
+            self.rate_limiter.record_failure()
+            raise
+        latency = time.monotonic() - started
+        self.ips_latency.observe(latency)
+        self.circuit_breaker.record_success()
+        self.rate_limiter.record_success(latency)
+
+        fetched_at = datetime.datetime.now().isoformat(timespec="seconds")
+        if event_data == 0:
+            self.fetch_results.inc(outcome="no_info")
+            result = {
+                'tracking_number': tracking_number, 'status': "no_info", 'category': None,
+                'event': None, 'fetched_at': fetched_at
+            }
+            self.cache.put(tracking_number, result, self.negative_ttl)
+            return result
+
+        self.fetch_results.inc(outcome="success")
+        self._enrich_location(event_data)
+        event = dict(zip(EVENT_FIELDS, event_data))
+        result = {
+            'tracking_number': tracking_number, 'status': "ok",
+            'category': self.event_mappings.get(event.get('event_type')),
+            'event': event, 'fetched_at': fetched_at
+        }
+        self.cache.put(tracking_number, result, self.cache_ttl)
+        return result
+
+    def _enrich_location(self, event_data):
+        """Replaces a numeric location with its zip code information, as tracking runs do."""
+        enrich_location(event_data, lambda zip_code: locate_zip(
+            zip_code, self.zip_gazetteer, self.zip_cache,
+            lambda code: get_zip_codes(code, self.session, self.zip_url)
+        ))
+
+    def close(self):
+        """Stops the bulk lookup threads and closes the zip code cache and gazetteer."""
+        self._bulk_pool.shutdown(wait=True)
+        self.zip_cache.close()
+        if self.zip_gazetteer:
+            self.zip_gazetteer.close()
+
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of TrackingLookupService (the server's 'service' attribute)."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _handle(self, method):
+        """Runs a request method, answering unexpected errors with a JSON 500."""
+        try:
+            method()
+        except Exception as e:
+            logger.exception("Lookup request %s failed: %s", self.path, e)
+            self._send_json(500, {'error': f"Internal error: {e}"})
+
+    def _get(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        service = self.server.service
+
+        if path == "/health":
+            self._send_json(200, {'status': "ok", 'cached': len(service.cache)})
+        elif path == "/metrics":
+            self._send(200, service.metrics.to_prometheus().encode("utf-8"),
+                       "text/plain; version=0.0.4; charset=utf-8")
+        elif path.startswith("/track/"):
+            tracking_number = unquote(path[len("/track/"):])
+            if not tracking_number.strip():
+                self._send_json(400, {'error': "Missing tracking number"})
+                return
+            self._send_json(200, service.lookup(tracking_number))
+        elif path == "/track":
+            ids = ",".join(parse_qs(url.query).get("ids", []))
+            self._lookup_many([tn for tn in ids.split(",") if tn.strip()])
+        else:
+            self._send_json(404, {'error': "Not found"})
+
+    def _post(self):
+        if urlparse(self.path).path.rstrip("/") != "/track":
+            self._send_json(404, {'error': "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            tracking_numbers = body["tracking_numbers"]
+            if not isinstance(tracking_numbers, list):
+                raise TypeError("tracking_numbers must be a list")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"Expected {{\"tracking_numbers\": [...]}}: {e}"})
+            return
+        self._lookup_many([str(tn) for tn in tracking_numbers if str(tn).strip()])
+
+    def _lookup_many(self, tracking_numbers):
+        if not tracking_numbers:
+            self._send_json(400, {'error': "No tracking numbers given"})
+            return
+        try:
+            results = self.server.service.lookup_many(tracking_numbers)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'results': results})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_service(service, host="127.0.0.1", port=0):
+    """
+    Serves a lookup service on a background thread.
+
+    Args:
+        service (TrackingLookupService): The service to expose
+        host (str): Address to bind
+        port (int): Port to bind (0 picks a free port)
+
+    Returns:
+        ThreadingHTTPServer: Running server
+    """
+    server = ThreadingHTTPServer((host, port), LookupRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    thread = threading.Thread(target=server.serve_forever, name="lookup-service", daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    """Runs the lookup service until interrupted."""
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service for tracking status lookups.")
+    parser.add_argument("--config", default="config/config.json", help="configuration file")
+    parser.add_argument("--host", help="address to bind (default: config 'lookup_host')")
+    parser.add_argument("--port", type=int, help="port to bind (default: config 'lookup_port')")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    configure_logging(config.get('log_level', 'INFO'), config.get('log_format', 'text'))
+
+    service = TrackingLookupService(config)
+    host = args.host or config.get('lookup_host', "127.0.0.1")
+    port = args.port if args.port is not None else config.get('lookup_port', 8810)
+    server = start_service(service, host, port)
+    logger.info("Lookup service listening on http://%s:%d", host, server.server_address[1])
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info("Lookup service stopping")
+    finally:
+        server.shutdown()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Metrics Module for MedshipmentTrackingTool
+
+This module collects run metrics (counters, gauges and latency histograms) in
+a thread-safe registry and exports them in the Prometheus text exposition
+format or as JSON, so slow runs can be broken down by stage and IPS latency
+can be watched over time.
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+# Latency histogram bucket bounds in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    """Returns a hashable, ordered key for a label dict."""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key):
+    """Formats a label key as {name="value",...} (empty string if no labels)."""
+    if not key:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    """Formats a sample value the way Prometheus expects it."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Adds amount to the series selected by labels."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Returns the current value of a series (0 if never incremented)."""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        """Returns (suffix, label key, value) tuples for export."""
+        with self._lock:
+            return [("", key, value) for key, value in sorted(self._values.items())]
+
+    def to_dict(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, optionally split by labels."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """Sets the series selected by labels to value."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # label key -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Records one observation in the series selected by labels."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        """Returns (suffix, label key, value) tuples for export."""
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(("_bucket", key + (("le", _format_value(bound)),), cumulative))
+                samples.append(("_sum", key, total))
+                samples.append(("_count", key, count))
+        return samples
+
+    def to_dict(self):
+        with self._lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "count": count,
+                    "sum": round(total, 6),
+                    "mean": round(total / count, 6) if count else None,
+                    "buckets": dict(zip(
+                        (_format_value(bound) for bound in self.buckets),
+                        itertools.accumulate(counts)
+                    ))  # cumulative, as in the Prometheus format
+                }
+                for key, (counts, total, count) in sorted(self._series.items())
+            ]
+
+
+class MetricsRegistry:
+    """Named collection of metrics with Prometheus and JSON export."""
+
+    def __init__(self, namespace="medshipment"):
+        """
+        Initialize the registry.
+
+        Args:
+            namespace (str): Prefix added to every metric name
+        """
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, *args):
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, help_text, *args)
+            return metric
+
+    def counter(self, name, help_text):
+        """Returns the counter called name, creating it on first use."""
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        """Returns the gauge called name, creating it on first use."""
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Returns the histogram called name, creating it on first use."""
+        return self._register(Histogram, name, help_text, buckets)
+
+    def to_prometheus(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text (suitable for the node_exporter textfile collector)
+        """
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, key, value in metric.samples():
+                lines.append(f"{name}{suffix}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """
+        Returns all metrics as a JSON-serializable dict.
+
+        Returns:
+            dict: {metric name: {'type', 'help', 'series'}}
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {
+            name: {"type": metric.kind, "help": metric.help, "series": metric.to_dict()}
+            for name, metric in metrics
+        }
+
+    def write(self, path):
+        """
+        Writes the metrics to a file; the format follows the extension (.json or Prometheus text).
+
+        Args:
+            path (str): Destination file
+
+        Returns:
+            str: The path written
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        # Replace atomically so a collector never reads a half-written file
+        os.replace(temp_path, path)
+        return path
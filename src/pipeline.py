@@ -0,0 +1,399 @@
+"""
+Streaming Pipeline Module for MedshipmentTrackingTool
+
+This module runs the tracking process as a pipeline of stages connected by
+bounded queues, instead of one stage after the other:
+
+    reader -> fetchers -> parsers -> zip enrichers -> writer
+
+Every stage has its own threads (the 'pipeline_*_workers' config keys), so
+a slow IPS site only holds up the fetchers while parsing, zip lookups and
+writing continue with the pages already downloaded. The writer puts every
+row into Final-Data.xlsx, the category spools and a partial CSV report as
+soon as its lookup completes (in input order), so memory stays flat however
+large the input sheet is, and the partial CSV can be opened at any point of
+the run. The categorized report is written from the spools at the end.
+
+At most 'pipeline_window' input rows are in flight at any time; the reader
+waits for the writer before reading further. A tracking number repeated
+within the window is fetched once; repeats further apart are served by the
+state store (see incremental tracking) like items from previous runs.
+"""
+
+import os
+import csv
+import time
+import queue
+import logging
+import tempfile
+import threading
+from collections import OrderedDict, deque
+
+from src.web_scraper import download_tracking_page, read_tracking_page, TrackingFetchError, NOT_MODIFIED
+from src.excel_handler import HEADERS
+from src.categorizer import StreamingCategorizer
+from src.fetch_engine import FetchEngine
+from src.tracker import RunCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class _Item:
+    """One unique tracking number on its way through the pipeline."""
+
+    __slots__ = ('tracking_number', 'position', 'state', 'validators', 'history',
+                 'payload', 'result', 'done', 'reported')
+
+    def __init__(self, tracking_number, position):
+        self.tracking_number = tracking_number
+        self.position = position  # Input row of its first occurrence
+        self.state = self.validators = self.history = None
+        self.payload = None  # Page content after the fetch, event data after parsing
+        self.result = None  # Event data, 0 (no information) or None (not processed)
+        self.done = False
+        self.reported = False  # Already counted in the tracker's miscellaneous list
+
+
+class TrackingPipeline:
+    """Streams the input rows of one run through the pipeline stages."""
+
+    def __init__(self, tracker):
+        """
+        Initialize the pipeline.
+
+        Args:
+            tracker (ShipmentTracker): Tracker whose session, stores, limiter
+                                       and run counters the stages use
+        """
+        self.tracker = tracker
+        config = tracker.config
+        self.fetch_workers = max(1, config.get('pipeline_fetch_workers', tracker.fetch_workers))
+        self.parse_workers = max(1, config.get('pipeline_parse_workers', 2))
+        self.enrich_workers = max(1, config.get('pipeline_enrich_workers', 2))
+        self.queue_size = max(1, config.get('pipeline_queue_size', 100))
+        self.window = max(1, config.get('pipeline_window', 1000))
+        self.partial_file = config.get('pipeline_partial_file',
+                                       os.path.join(config['output_dir'], 'Partial-Data.csv'))
+        self.record_count = 0
+
+        self._engine = None
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    def run(self, resume=False):
+        """
+        Tracks every input row and writes the reports.
+
+        Args:
+            resume (bool): Replay the checkpoint journal of an interrupted run
+                           and fetch only the remaining tracking numbers
+
+        Returns:
+            tuple: (number of records, ShipmentSummary, report path), or
+                   (0, None, None) if no data was retrieved. The records
+                   themselves are not kept: the summary's categories are empty.
+        """
+        tracker = self.tracker
+        journaled = tracker._load_journal(resume)
+        if tracker.config.get('categorization_engine', 'python') != 'python':
+            logger.info("The streaming pipeline categorizes rows as they arrive; "
+                        "categorization_engine is not used")
+
+        with tempfile.TemporaryDirectory(prefix="pipeline-", dir=tracker.config['output_dir']) as spool_dir:
+            categorizer = StreamingCategorizer(tracker.excel_handler.event_mappings, spool_dir)
+            try:
+                with tracker._stage("fetch"):
+                    self._stream(journaled, categorizer)
+                if tracker.cancelled:
+                    logger.warning("Run cancelled: %d rows not processed, writing a partial report",
+                                   tracker.not_processed)
+                if not self.record_count:
+                    return 0, None, None
+
+                logger.info("Generating categorized report...")
+                with tracker._stage("report"):
+                    categorizer.close()
+                    shipments = categorizer.summary()
+                    report_file = tracker.excel_handler.generate_categorized_report(
+                        shipments.categories, shipments)
+            finally:
+                categorizer.close()
+        return self.record_count, shipments._replace(categories={}), report_file
+
+    def _stream(self, journaled, categorizer):
+        """
+        Runs the pipeline stages until every input row has been written.
+
+        Args:
+            journaled (dict): Results replayed from the checkpoint journal
+            categorizer (StreamingCategorizer): Receives every written record
+
+        Raises:
+            Exception: The first error that stopped the reader or the writer
+        """
+        self._fetch_queue = queue.Queue(self.queue_size)
+        self._parse_queue = queue.Queue(self.queue_size)
+        self._enrich_queue = queue.Queue(self.queue_size)
+        self._write_queue = queue.Queue(self.queue_size)
+        self._window = threading.BoundedSemaphore(self.window)
+
+        directory = os.path.dirname(self.partial_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial_file = open(self.partial_file, "w", newline="", encoding="utf-8")
+        logger.info("Writing rows to %s as they complete", self.partial_file)
+
+        with partial_file, FetchEngine(self.fetch_workers, self.tracker.max_per_host) as engine:
+            self._engine = engine
+            writer = self._start(self._write_stage, "writer", 1, categorizer, partial_file)
+            stages = [
+                (self._fetch_queue, self._start(self._fetch_stage, "fetcher", self.fetch_workers)),
+                (self._parse_queue, self._start(self._parse_stage, "parser", self.parse_workers)),
+                (self._enrich_queue, self._start(self._enrich_stage, "enricher", self.enrich_workers)),
+            ]
+            self._read_stage(journaled)
+
+            # Shut the stages down in pipeline order, once each has drained
+            for stage_queue, threads in stages:
+                for _ in threads:
+                    stage_queue.put(None)
+                for thread in threads:
+                    thread.join()
+            self._write_queue.put(None)
+            writer[0].join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _start(self, target, name, count, *args):
+        """Starts the threads of one stage."""
+        threads = [
+            threading.Thread(target=target, args=args, name=f"pipeline-{name}-{index}", daemon=True)
+            for index in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _fail(self, error):
+        """Stops the run after an error in the reader or the writer."""
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self.tracker._cancel_event.set()
+
+    def _read_stage(self, journaled):
+        """
+        Reads the input rows and dispatches their tracking numbers (reader stage).
+
+        Runs on the calling thread; returns when the input is exhausted or
+        the run is cancelled.
+        """
+        tracker = self.tracker
+        seen = OrderedDict()  # Tracking number -> _Item, for the last `window` numbers
+        rows = 0
+        try:
+            for row in tracker.excel_handler.iter_input_rows():
+                if tracker.cancelled:
+                    break
+                self._window.acquire()
+                rows += 1
+                item = seen.get(row.tracking_number)
+                if item is not None:
+                    # A tracking number shared by several orders is fetched once
+                    tracker.duplicate_rows += 1
+                    seen.move_to_end(row.tracking_number)
+                else:
+                    item = seen[row.tracking_number] = _Item(row.tracking_number, rows)
+                    if len(seen) > self.window:
+                        seen.popitem(last=False)
+                    self._dispatch(item, journaled)
+                self._write_queue.put((row, item))
+        except Exception as e:
+            logger.exception("Could not read the input rows: %s", e)
+            self._fail(e)
+        logger.info("Collected %d tracking numbers from %s", rows, tracker.config['input_file'])
+
+    def _dispatch(self, item, journaled):
+        """Completes an item from the journal or the state store, or queues its fetch."""
+        tracker = self.tracker
+        reused = {}
+        if tracker._reuse_result(item.tracking_number, reused, journaled):
+            self._finish(item, reused[item.tracking_number])
+            return
+        self._count(total=1)
+        self._fetch_queue.put(item)
+
+    def _fetch_stage(self):
+        """Downloads the IPS page of each queued item (fetcher stage)."""
+        ips_url = self.tracker.config['ips_tracking_url']
+        for item in iter(self._fetch_queue.get, None):
+            try:
+                item.payload = self._download(item, ips_url)
+            except RunCancelled:
+                self._count(total=-1)  # Never ran
+                self._finish(item, None)
+                continue
+            except TrackingFetchError:
+                self._finish(item, 0)  # Failed in every attempt
+                continue
+            except Exception as e:
+                logger.exception("Tracking Number %s: Unexpected error - %s", item.tracking_number, e,
+                                 extra={"tracking_number": item.tracking_number})
+                self._count(item.tracking_number, processed=1, failed=1)
+                self._finish(item, 0)
+                continue
+            self._parse_queue.put(item)
+
+    def _download(self, item, ips_url):
+        """
+        Downloads the IPS page of an item, retrying transient errors.
+
+        A failed attempt is retried up to fetch_retry_rounds times, paced by
+        the circuit breaker and the rate limiter like every other request.
+
+        Returns:
+            bytes: Page content, or NOT_MODIFIED
+
+        Raises:
+            RunCancelled: If the run was cancelled before the request
+            TrackingFetchError: If every attempt failed
+        """
+        tracker = self.tracker
+        tracking_number = item.tracking_number
+        for attempt in range(tracker.retry_rounds + 1):
+            if tracker.cancelled:
+                raise RunCancelled()
+            if attempt:
+                logger.info("Retrying %s (attempt %d/%d)", tracking_number, attempt + 1,
+                            tracker.retry_rounds + 1, extra={"tracking_number": tracking_number})
+                self._count(total=1)
+            else:
+                logger.info("[%s] Processing: %s", item.position, tracking_number,
+                            extra={"tracking_number": tracking_number})
+            item.state, item.validators = tracker._previous_fetch(tracking_number)
+            tracker._pace_request()
+            started = time.monotonic()
+            try:
+                with self._engine.host_slot(ips_url):
+                    content = download_tracking_page(tracking_number, ips_url, tracker.session,
+                                                     item.validators)
+            except TrackingFetchError:
+                tracker._request_failed(started)
+                self._count(tracking_number, processed=1, failed=1)
+                if attempt == tracker.retry_rounds:
+                    raise
+                continue
+            except Exception:
+                tracker._request_failed(started)
+                raise
+            tracker._request_succeeded(started)
+            return content
+
+    def _parse_stage(self):
+        """Extracts the latest event from each downloaded page (parser stage)."""
+        for item in iter(self._parse_queue.get, None):
+            if item.payload != NOT_MODIFIED:
+                item.history = [] if self.tracker.event_store else None
+                item.payload = read_tracking_page(item.tracking_number, item.payload, item.history)
+            self._enrich_queue.put(item)
+
+    def _enrich_stage(self):
+        """Stores, enriches and journals each parsed event (zip enricher stage)."""
+        tracker = self.tracker
+        for item in iter(self._enrich_queue.get, None):
+            try:
+                result = tracker._finish_event(self._engine, item.tracking_number, item.payload,
+                                               item.state, item.validators, item.history)
+            except Exception as e:
+                logger.exception("Tracking Number %s: Unexpected error - %s", item.tracking_number, e,
+                                 extra={"tracking_number": item.tracking_number})
+                self._count(item.tracking_number, processed=1, failed=1)
+                result = 0
+            else:
+                self._count(item.tracking_number, processed=1, no_info=1 if result == 0 else 0)
+            item.payload = item.history = None
+            self._finish(item, result)
+
+    def _finish(self, item, result):
+        """Records the result of an item and wakes the writer."""
+        item.result = result
+        item.done = True
+        self._write_queue.put((None, item))
+
+    def _count(self, tracking_number="", processed=0, total=0, failed=0, no_info=0):
+        """Updates the run's progress counters, reporting finished lookups."""
+        tracker = self.tracker
+        with tracker._progress_lock:
+            tracker._progress['processed'] += processed
+            tracker._progress['total'] += total
+            tracker._progress['failed'] += failed
+            tracker._progress['no_info'] += no_info
+        if processed:
+            tracker._report_progress(tracking_number)
+
+    def _write_stage(self, categorizer, partial_file):
+        """
+        Writes each row once its lookup has completed, in input order (writer stage).
+
+        Args:
+            categorizer (StreamingCategorizer): Receives every written record
+            partial_file (file): Partial CSV report, flushed whenever the
+                                 writer has caught up
+        """
+        tracker = self.tracker
+        partial = csv.writer(partial_file)
+        partial.writerow(HEADERS + ["Category"])
+        final_data = final_sheet = None
+        pending = deque()  # (InputRow, _Item) in input order
+        failed = False
+
+        try:
+            for row, item in iter(self._write_queue.get, None):
+                if row is not None:
+                    pending.append((row, item))
+                while pending and pending[0][1].done:
+                    row, item = pending.popleft()
+                    if not failed:
+                        try:
+                            record = self._write_row(row, item, categorizer, partial)
+                            if record is not None and tracker.config.get('write_final_data', True):
+                                if final_sheet is None:
+                                    final_data = tracker.excel_handler._report_writer(
+                                        tracker.config['final_data_file'])
+                                    final_sheet = final_data.add_sheet(headers=HEADERS)
+                                final_sheet.write_row(record)
+                        except Exception as e:
+                            logger.exception("Could not write the row of %s: %s", row.tracking_number, e)
+                            self._fail(e)
+                            failed = True
+                    self._window.release()
+                if self._write_queue.empty():
+                    partial_file.flush()
+        finally:
+            if final_data is not None:
+                final_data.close()
+                logger.info("Final data written to %s", tracker.config['final_data_file'])
+
+    def _write_row(self, row, item, categorizer, partial):
+        """
+        Writes one input row to the partial report and the category spools.
+
+        Returns:
+            list: The written record, or None if the row has no tracking data
+        """
+        tracker = self.tracker
+        if item.result is None:
+            tracker.not_processed += 1
+            return None
+        if item.result == 0:
+            if not item.reported:
+                item.reported = True
+                tracker.miscellaneous.append(row.tracking_number)
+            return None
+
+        record = tracker._order_record(row, item.result)
+        category = categorizer.add(record)
+        partial.writerow(record + [category or ""])
+        self.record_count += 1
+        return record
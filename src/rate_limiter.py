@@ -0,0 +1,230 @@
+"""
+Rate Limiter Module for MedshipmentTrackingTool
+
+This module throttles requests to the IPS site. AdaptiveRateLimiter is a token
+bucket whose rate follows AIMD (additive increase while the site is healthy,
+multiplicative decrease on errors or slow responses). CircuitBreaker stops
+all requests when too many recent requests failed, then lets a single probe
+through after a cooldown.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket with an AIMD-adjusted refill rate."""
+
+    def __init__(self, initial_rate=5.0, min_rate=0.5, max_rate=20.0,
+                 increase=0.1, decrease_factor=0.5, target_latency=3.0):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            initial_rate (float): Starting rate in requests per second
+            min_rate (float): Lowest rate the limiter will back off to
+            max_rate (float): Highest rate the limiter will grow to
+            increase (float): Rate added after each healthy response
+            decrease_factor (float): Rate multiplier after an error or slow response
+            target_latency (float): Responses slower than this (seconds) count as
+                                    a sign of overload
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.target_latency = target_latency
+
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                burst = max(1.0, self.rate)
+                self._tokens = min(burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record_success(self, latency):
+        """
+        Adjusts the rate after a completed request.
+
+        Args:
+            latency (float): Response time in seconds
+        """
+        if latency > self.target_latency:
+            self._decrease()
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_failure(self):
+        """Backs off after a failed request."""
+        self._decrease()
+
+    def _decrease(self):
+        """Multiplicative decrease, applied at most once per refill interval."""
+        with self._lock:
+            now = time.monotonic()
+            # Concurrent failures usually share one cause; count them once
+            if now - self._last_decrease < 1.0 / self.rate:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+
+class CircuitBreaker:
+    """Pauses requests while the recent failure ratio is above a threshold."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_ratio=0.5, window=20, min_calls=10, cooldown=30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_ratio (float): Failure ratio that opens the circuit
+            window (int): Number of recent requests the ratio is computed over
+            min_calls (int): Requests needed in the window before it can open
+            cooldown (float): Seconds to stay open before sending a probe
+        """
+        self.failure_ratio = failure_ratio
+        self.min_calls = min(min_calls, window)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+
+        self._outcomes = deque(maxlen=window)  # True for failures
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_owner = None  # Thread sending the probe request
+        self._cond = threading.Condition()
+
+    def wait_until_allowed(self, cancel_event=None, poll_interval=0.5):
+        """
+        Blocks while the circuit is open.
+
+        After the cooldown one caller is let through as a probe; the others
+        keep waiting until the probe result is recorded (or the probe is
+        given back with release_probe).
+
+        Args:
+            cancel_event (threading.Event): Optional event that ends the wait
+            poll_interval (float): Seconds between checks of cancel_event
+
+        Returns:
+            bool: True if the request may be sent, False if cancel_event was set
+        """
+        with self._cond:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return False
+                if self._try_acquire():
+                    return True
+                timeout = None
+                if self.state == self.OPEN:
+                    timeout = max(0.0, self._opened_at + self.cooldown - time.monotonic())
+                if cancel_event is not None:
+                    timeout = poll_interval if timeout is None else min(timeout, poll_interval)
+                self._cond.wait(timeout)
+
+    def try_acquire(self):
+        """
+        Checks, without blocking, whether a request may be sent now.
+
+        Once the cooldown has passed, the first caller becomes the probe.
+
+        Returns:
+            bool: True if the request may be sent
+        """
+        with self._cond:
+            return self._try_acquire()
+
+    def release_probe(self):
+        """
+        Gives back a probe slot that will not be used (e.g. the run was cancelled).
+
+        The circuit returns to open with its cooldown already over, so the
+        next caller becomes the probe. Does nothing unless the calling thread
+        holds the probe.
+        """
+        with self._cond:
+            if self._holds_probe():
+                self.state = self.OPEN
+                self._probing = False
+                self._probe_owner = None
+                self._cond.notify_all()
+
+    def _holds_probe(self):
+        """Tells whether the calling thread sends the probe (caller holds the lock)."""
+        return self._probing and self._probe_owner == threading.get_ident()
+
+    def _try_acquire(self):
+        """Lets a request through if the circuit allows it (caller holds the lock)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() >= self._opened_at + self.cooldown:
+            self.state = self.HALF_OPEN
+            self._probing = True
+            self._probe_owner = threading.get_ident()
+            logger.info("Circuit breaker: sending probe request to IPS")
+            return True
+        return False
+
+    def record_success(self):
+        """
+        Records a successful request.
+
+        While the circuit is half-open only the probe's outcome counts;
+        requests still in flight from before the circuit opened are ignored.
+        """
+        with self._cond:
+            if self.state == self.HALF_OPEN:
+                if not self._holds_probe():
+                    return  # A request sent before the circuit opened
+                logger.info("Circuit breaker: probe succeeded, resuming requests")
+                self.state = self.CLOSED
+                self._probing = False
+                self._probe_owner = None
+                self._outcomes.clear()
+                self._cond.notify_all()
+                return
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        """Records a failed request, opening the circuit if needed."""
+        with self._cond:
+            if self.state == self.HALF_OPEN:
+                if self._holds_probe():
+                    self._open()
+                return
+            self._outcomes.append(True)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                ratio = sum(self._outcomes) / len(self._outcomes)
+                if ratio >= self.failure_ratio:
+                    self._open()
+
+    def _open(self):
+        """Opens the circuit (caller holds the lock)."""
+        logger.warning("Circuit breaker: too many IPS failures, pausing requests for %.0fs", self.cooldown)
+        self.state = self.OPEN
+        self._probing = False
+        self._probe_owner = None
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._cond.notify_all()
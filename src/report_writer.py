@@ -0,0 +1,198 @@
+"""
+Report Writer Module for MedshipmentTrackingTool
+
+This module streams report rows into .xlsx workbooks with xlsxwriter's
+constant_memory mode: every row is flushed to a temporary file as soon as the
+next one starts, so memory stays flat however many shipments are written.
+Rows are buffered in small batches and written a whole row at a time, with
+the header format created once per workbook. Every sheet can also be written
+to CSV and Parquet side outputs (Parquet needs the optional pyarrow package).
+"""
+
+import os
+import csv
+import logging
+import importlib.util
+
+logger = logging.getLogger(__name__)
+
+# Side output formats accepted in the 'report_side_outputs' config key
+SIDE_OUTPUT_FORMATS = ("csv", "parquet")
+
+# Rows buffered per sheet before they are written out
+DEFAULT_BATCH_SIZE = 1000
+
+
+def side_output_formats(formats):
+    """
+    Checks a list of side output formats, dropping Parquet if pyarrow is missing.
+
+    Args:
+        formats (list): Requested formats ("csv" and/or "parquet")
+
+    Returns:
+        tuple: Formats that will be written
+
+    Raises:
+        ValueError: If a format is unknown
+    """
+    formats = tuple(dict.fromkeys(fmt.lower() for fmt in formats or ()))
+    unknown = [fmt for fmt in formats if fmt not in SIDE_OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown report side output format(s): {', '.join(unknown)}")
+    if "parquet" in formats and importlib.util.find_spec("pyarrow") is None:
+        logger.warning("Parquet side outputs need the pyarrow package; skipping them")
+        formats = tuple(fmt for fmt in formats if fmt != "parquet")
+    return formats
+
+
+class SheetWriter:
+    """Buffered writer of one sheet and its side outputs."""
+
+    def __init__(self, worksheet, headers, header_format, side_paths, batch_size):
+        """
+        Initialize the sheet and write its header row.
+
+        Args:
+            worksheet: xlsxwriter worksheet
+            headers (list): Column headers
+            header_format: xlsxwriter format of the header row
+            side_paths (dict): Side output path by format
+            batch_size (int): Rows buffered before they are written out
+        """
+        self.name = worksheet.name
+        self.headers = list(headers)
+        self.rows_written = 0
+        self._worksheet = worksheet
+        self._batch = []
+        self._batch_size = max(1, batch_size)
+
+        self._csv_file = self._csv_writer = None
+        if "csv" in side_paths:
+            self._csv_file = open(side_paths["csv"], "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(self.headers)
+
+        self._parquet_writer = None
+        if "parquet" in side_paths:
+            # Imported here: pyarrow is optional and slow to import
+            import pyarrow
+            import pyarrow.parquet
+            self._pyarrow = pyarrow
+            self._parquet_schema = pyarrow.schema([(header, pyarrow.string()) for header in self.headers])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(side_paths["parquet"], self._parquet_schema)
+
+        worksheet.write_row(0, 0, self.headers, header_format)
+
+    def write_row(self, values):
+        """Adds one row (a list of cell values) to the sheet."""
+        self._batch.append(values)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        """Adds rows to the sheet, in order."""
+        for values in rows:
+            self.write_row(values)
+
+    def flush(self):
+        """Writes the buffered rows to the sheet and the side outputs."""
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        for values in batch:
+            self.rows_written += 1
+            try:
+                self._worksheet.write_row(self.rows_written, 0, values)
+            except Exception as e:
+                logger.warning("Error writing row %d to %s: %s", self.rows_written, self.name, e)
+
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(batch)
+
+        if self._parquet_writer is not None:
+            columns = [
+                [None if index >= len(values) or values[index] is None else str(values[index])
+                 for values in batch]
+                for index in range(len(self.headers))
+            ]
+            self._parquet_writer.write_batch(
+                self._pyarrow.record_batch(columns, schema=self._parquet_schema))
+
+    def close(self):
+        """Flushes the remaining rows and closes the side outputs."""
+        self.flush()
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv_writer = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+class ReportWriter:
+    """Constant-memory .xlsx workbook with optional CSV/Parquet side outputs."""
+
+    def __init__(self, path, side_outputs=(), batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Initialize the writer (the workbook is written by close()).
+
+        Args:
+            path (str): Destination .xlsx file
+            side_outputs (list): Side output formats ("csv", "parquet") written
+                                 next to the workbook for every sheet
+            batch_size (int): Rows buffered per sheet before they are written out
+        """
+        self.path = path
+        self.side_outputs = side_output_formats(side_outputs)
+        self.batch_size = batch_size
+        self.side_paths = []
+        self._sheets = []
+
+        import xlsxwriter  # Imported on first use, to keep start-up fast
+        self._workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self._header_format = self._workbook.add_format({'bold': True})
+
+    def add_sheet(self, name=None, headers=(), side_outputs=True):
+        """
+        Adds a sheet and writes its header row.
+
+        Side outputs are named after the workbook: Final-Data.csv for an
+        unnamed sheet, Data<time>-Booked.csv for a sheet called Booked.
+
+        Args:
+            name (str): Sheet name (None for the xlsxwriter default)
+            headers (list): Column headers
+            side_outputs (bool): Write this sheet to the side outputs too
+
+        Returns:
+            SheetWriter: Writer for the rows of the sheet
+        """
+        side_paths = {}
+        if side_outputs:
+            base = os.path.splitext(self.path)[0]
+            if name:
+                base = f"{base}-{name}"
+            side_paths = {fmt: f"{base}.{fmt}" for fmt in self.side_outputs}
+            self.side_paths.extend(side_paths.values())
+
+        sheet = SheetWriter(self._workbook.add_worksheet(name), headers, self._header_format,
+                            side_paths, self.batch_size)
+        self._sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        """Flushes every sheet and writes the workbook."""
+        try:
+            for sheet in self._sheets:
+                sheet.close()
+        finally:
+            self._workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
@@ -0,0 +1,98 @@
+"""
+Run Lock Module for MedshipmentTrackingTool
+
+This module provides an inter-process lock on a file, held for the duration
+of a tracking run, so a scheduled run and a manual run never scrape the IPS
+site at the same time. The lock is released by the operating system if the
+holding process dies, so a crash never leaves a stale lock behind.
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class RunLockBusy(Exception):
+    """Raised when another process holds the run lock."""
+
+
+class RunLock:
+    """Exclusive lock on a file, shared by all tracking runs."""
+
+    def __init__(self, path):
+        """
+        Initialize the lock (it is not acquired yet).
+
+        Args:
+            path (str): Lock file location
+        """
+        self.path = path
+        self._file = None
+
+    def acquire(self, timeout=0):
+        """
+        Tries to take the lock.
+
+        Args:
+            timeout (float): Seconds to keep trying (0 tries once, None waits forever)
+
+        Returns:
+            bool: True if the lock is now held
+        """
+        if self._file is not None:
+            return True
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.path, "a+")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    lock_file.close()
+                    return False
+                time.sleep(0.5)
+
+        # Record the holder for anyone inspecting the file
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        """Releases the lock if it is held."""
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RunLockBusy(f"Another tracking run holds {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.release()
+        return False
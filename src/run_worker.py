@@ -0,0 +1,252 @@
+"""
+Run Worker Module for MedshipmentTrackingTool
+
+This module keeps a tracking process warm for the dashboard. The worker
+process is started once, imports the tracker and builds a ShipmentTracker
+while the user is still looking at the window, and then executes every run
+the dashboard dispatches to it over a multiprocessing pipe. Runs after the
+first reuse the already-imported modules, the open HTTP connection pool,
+the zip code cache and the adapted rate limit, so a small ad-hoc run costs
+only its lookups instead of interpreter start-up, imports and cold
+connections.
+
+Messages sent to the worker:
+    ('run', resume)   Start a tracking run
+    ('cancel',)       Cancel the current run (partial results are kept)
+    ('shutdown',)     Cancel the current run, if any, and exit
+
+Messages sent back:
+    ('progress', RunProgress)                              While a run is in progress
+    ('finished', report_file, cancelled, not_processed)   When a run has ended
+    ('error', message)                                     When a run could not complete
+"""
+
+import os
+import sys
+import logging
+import threading
+import multiprocessing
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger(__name__)
+
+# Seconds stop() waits for the worker to finish a cancelled run and exit
+STOP_TIMEOUT = 30
+
+
+def _run_tracking(tracker, send, resume, cancel_requested, idle):
+    """
+    Executes one run in the worker process (run thread).
+
+    Args:
+        tracker (ShipmentTracker): The warm tracker
+        send (callable): Sends a message to the client
+        resume (bool): Continue an interrupted run from the checkpoint journal
+        cancel_requested (threading.Event): Set when the client cancels the run
+        idle (threading.Event): Set when the run has ended, before the client is told
+    """
+    from src.run_lock import RunLock, RunLockBusy
+
+    def on_progress(progress):
+        # run() clears the tracker's cancel flag on start, so a cancel that
+        # arrived before the first progress snapshot is applied here
+        if cancel_requested.is_set() and not tracker.cancelled and progress.stage != "done":
+            tracker.cancel()
+        send(('progress', progress))
+
+    tracker.progress_listener = on_progress
+    try:
+        lock_path = tracker.config.get(
+            'run_lock_file', os.path.join(tracker.config['output_dir'], 'tracker.lock'))
+        with RunLock(lock_path):
+            report_file = tracker.run(resume=resume)
+        outcome = ('finished', report_file, tracker.cancelled, tracker.not_processed)
+    except RunLockBusy:
+        outcome = ('error', "Another tracking run is in progress. Try again when it has finished.")
+    except Exception as e:
+        logger.exception("Tracking run failed: %s", e)
+        outcome = ('error', str(e))
+    tracker.progress_listener = None
+    idle.set()
+    send(outcome)
+
+
+def _serve(conn, config_path):
+    """
+    Main loop of the worker process.
+
+    Args:
+        conn (multiprocessing.connection.Connection): Pipe to the client
+        config_path (str): Configuration file of the runs
+    """
+    from src.logging_config import configure_logging
+
+    # Warm up: import the tracker and open its stores before the first run
+    tracker = None
+    startup_error = None
+    try:
+        from src.tracker import ShipmentTracker
+        tracker = ShipmentTracker(config_path)
+        configure_logging(tracker.config.get('log_level', 'INFO'),
+                          tracker.config.get('log_format', 'text'))
+    except Exception as e:
+        configure_logging()
+        logger.exception("Tracking worker could not load the tracker: %s", e)
+        startup_error = str(e)
+
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    run_thread = None
+    cancel_requested = threading.Event()
+    idle = threading.Event()
+    idle.set()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            message = ('shutdown',)  # The client has gone away
+        command = message[0]
+        running = not idle.is_set()
+
+        if command == 'run':
+            if tracker is None:
+                send(('error', f"The tracker could not be loaded: {startup_error}"))
+            elif running:
+                send(('error', "A tracking run is already in progress."))
+            else:
+                cancel_requested.clear()
+                idle.clear()
+                run_thread = threading.Thread(
+                    target=_run_tracking, args=(tracker, send, message[1], cancel_requested, idle),
+                    name="tracking-run", daemon=True
+                )
+                run_thread.start()
+        elif command == 'cancel':
+            if running:
+                cancel_requested.set()
+                tracker.cancel()
+        elif command == 'shutdown':
+            if running:
+                cancel_requested.set()
+                tracker.cancel()
+            if run_thread is not None:
+                run_thread.join()
+            break
+    conn.close()
+
+
+class RunWorkerClient:
+    """Client of the warm tracking worker process."""
+
+    def __init__(self, config_path="config/config.json"):
+        """
+        Initialize the client (the worker is started by start() or the first run).
+
+        Args:
+            config_path (str): Configuration file of the runs, read once by
+                               the worker when it starts
+        """
+        self.config_path = config_path
+        self._process = None
+        self._conn = None
+        self._send_lock = threading.Lock()
+
+    @property
+    def alive(self):
+        """True if the worker process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        """
+        Starts the worker process, unless it is already running.
+
+        Returns immediately; the worker loads the tracker in the background.
+        """
+        if self.alive:
+            return
+        self._close_pipe()
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_serve, args=(child_conn, self.config_path), name="tracking-worker", daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        logger.info("Started tracking worker (pid %d)", self._process.pid)
+
+    def run(self, listener=None, resume=False):
+        """
+        Runs tracking in the worker and waits for the run to end.
+
+        Blocks until the run has ended, so call it from a background thread.
+        The worker is (re)started if it is not running.
+
+        Args:
+            listener (callable): Receives RunProgress snapshots while the run
+                                 is in progress (called on the calling thread)
+            resume (bool): Continue an interrupted run from the checkpoint journal
+
+        Returns:
+            tuple: ('finished', report_file, cancelled, not_processed) or
+                   ('error', message)
+        """
+        self.start()
+        try:
+            self._send(('run', resume))
+            while True:
+                event = self._conn.recv()
+                if event[0] != 'progress':
+                    return event
+                if listener is not None:
+                    listener(event[1])
+        except (EOFError, OSError):
+            self._process.join(timeout=1)
+            return ('error', f"The tracking worker stopped unexpectedly "
+                             f"(exit code {self._process.exitcode}).")
+
+    def cancel(self):
+        """Asks the run in progress to stop; results collected so far are kept."""
+        if self.alive:
+            try:
+                self._send(('cancel',))
+            except OSError:
+                pass
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stops the worker process, cancelling a run in progress first.
+
+        Args:
+            timeout (float): Seconds to wait before the worker is terminated
+        """
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                self._send(('shutdown',))
+            except OSError:
+                pass
+            self._process.join(timeout)
+            if self._process.is_alive():
+                logger.warning("Tracking worker did not stop in %ds; terminating it", timeout)
+                self._process.terminate()
+                self._process.join()
+        self._close_pipe()
+        self._process = None
+
+    def _send(self, message):
+        """Sends a message to the worker (safe to call from any thread)."""
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _close_pipe(self):
+        """Closes the client end of the pipe to a stopped worker."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
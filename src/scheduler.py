@@ -1,15 +1,37 @@
 """
 Scheduler Module for MedshipmentTrackingTool
 
-Handles scheduled execution of the tracking script at specified times.
+Handles scheduled execution of the tracking script at specified times:
+set_time() starts a one-off timer, and the scheduler service runs
+recurring cron-style jobs in a long-running process.
+
+Usage:
+    python src/scheduler.py --add morning "0 8 * * mon-fri"
+    python src/scheduler.py --list
+    python src/scheduler.py --serve
 """
 
 import os
 import sys
+import json
+import time
+import signal
+import logging
+import sqlite3
+import argparse
+import threading
 import subprocess
 from datetime import datetime, timedelta
 from threading import Timer
 
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.run_lock import RunLock, RunLockBusy
+from src.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
 
 def set_time(hours, minutes, seconds):
     """
@@ -34,31 +56,569 @@ def set_time(hours, minutes, seconds):
     delta = target_time - now
     seconds_until_run = delta.total_seconds()
     
-    print(f"Script scheduled to run at {target_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Time until execution: {delta}")
+    logger.info("Script scheduled to run at %s (in %s)", target_time.strftime('%Y-%m-%d %H:%M:%S'), delta)
     
     def trigger_script():
         """Execute the tracking script."""
-        print("=" * 60)
-        print("Scheduled script execution triggered!")
-        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 60)
+        logger.info("Scheduled script execution triggered at %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
         try:
-            # Get the path to tracker.py
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            tracker_script = os.path.join(script_dir, "tracker.py")
-            
-            # Execute the script
-            subprocess.run([sys.executable, tracker_script])
+            # Run in this process (no interpreter start-up), under the run lock;
+            # imported here so set_time() itself does not load the tracker
+            from src.tracker import ShipmentTracker
+            tracker = ShipmentTracker()
+            with RunLock(tracker.config.get('run_lock_file',
+                                            os.path.join(tracker.config['output_dir'], 'tracker.lock'))):
+                tracker.run()
             
+        except RunLockBusy as e:
+            logger.warning("Scheduled run skipped: %s", e)
         except Exception as e:
-            print(f"Error executing scheduled script: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error executing scheduled script: %s", e)
     
     # Create and start timer
     timer = Timer(seconds_until_run, trigger_script)
     timer.start()
     
     return timer
+
+
+# ---------------------------------------------------------------------------
+# Scheduler service: recurring cron-style jobs run in-process
+# ---------------------------------------------------------------------------
+
+# Shorthand schedules accepted in place of five cron fields
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun",
+                "jul", "aug", "sep", "oct", "nov", "dec"]
+_DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# (low, high, names) of minute, hour, day of month, month, day of week
+_CRON_FIELDS = [
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, _MONTH_NAMES),
+    (0, 7, _DAY_NAMES),
+]
+
+
+def _parse_cron_field(text, low, high, names):
+    """
+    Parses one cron field ("*", "*/15", "1-5", "mon-fri", "0,30", ...).
+
+    Returns:
+        set: Matching values
+    """
+    values = set()
+    for part in text.lower().split(","):
+        expression, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if expression == "*":
+            start, end = low, high
+        else:
+            first, _, last = expression.partition("-")
+            start = _cron_value(first, names, low)
+            end = _cron_value(last, names, low) if last else (high if step > 1 else start)
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Invalid cron field: {text!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _cron_value(text, names, low):
+    """Converts a number or a month/day name to its value."""
+    if names and text[:3] in names:
+        return names.index(text[:3]) + low
+    return int(text)
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week)."""
+
+    def __init__(self, expression):
+        """
+        Parses the expression.
+
+        Args:
+            expression (str): e.g. "0 8,13,18 * * mon-fri" or "@daily"
+
+        Raises:
+            ValueError: If the expression is not valid
+        """
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+
+        parsed = [_parse_cron_field(field, *spec) for field, spec in zip(fields, _CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is Sunday as well
+        # Like cron: if both day fields are restricted, either one may match
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def _day_matches(self, moment):
+        weekday = (moment.weekday() + 1) % 7  # cron counts from Sunday
+        if self._day_restricted and self._weekday_restricted:
+            return moment.day in self.days or weekday in self.weekdays
+        return moment.day in self.days and weekday in self.weekdays
+
+    def next_after(self, moment):
+        """
+        Returns the first scheduled time after moment.
+
+        Args:
+            moment (datetime): Reference time (naive local time)
+
+        Returns:
+            datetime: Next matching minute
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate.year + 5
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1,
+                                              day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class JobStore:
+    """SQLite-backed job definitions and run history of the scheduler service."""
+
+    def __init__(self, db_path):
+        """
+        Initialize the job store.
+
+        Args:
+            db_path (str): Path of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduled_jobs ("
+            "name TEXT PRIMARY KEY, "
+            "schedule TEXT NOT NULL, "
+            "config_path TEXT NOT NULL, "
+            "catch_up INTEGER NOT NULL DEFAULT 1, "
+            "enabled INTEGER NOT NULL DEFAULT 1, "
+            "last_scheduled REAL NOT NULL, "  # Schedule slots up to here are handled
+            "last_started REAL, "
+            "last_finished REAL, "
+            "last_status TEXT)"
+        )
+        self._conn.commit()
+
+    def add(self, name, schedule, config_path="config/config.json", catch_up=True):
+        """
+        Adds or replaces a job.
+
+        Args:
+            name (str): Job name
+            schedule (str): Cron expression
+            config_path (str): Configuration file of the tracking run
+            catch_up (bool): Run once after downtime if runs were missed
+
+        Raises:
+            ValueError: If the cron expression is not valid
+        """
+        CronSchedule(schedule)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scheduled_jobs "
+                "(name, schedule, config_path, catch_up, enabled, last_scheduled) "
+                "VALUES (?, ?, ?, ?, 1, ?)",
+                (name, schedule, config_path, int(catch_up), time.time())
+            )
+            self._conn.commit()
+
+    def remove(self, name):
+        """Deletes a job; returns True if it existed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM scheduled_jobs WHERE name = ?", (name,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def set_enabled(self, name, enabled):
+        """Enables or disables a job."""
+        with self._lock:
+            self._conn.execute("UPDATE scheduled_jobs SET enabled = ? WHERE name = ?",
+                               (int(enabled), name))
+            self._conn.commit()
+
+    def jobs(self):
+        """Returns all jobs as dicts, ordered by name."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM scheduled_jobs ORDER BY name").fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_started(self, name, scheduled_until, started):
+        """Records the start of a run covering every slot up to scheduled_until."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_jobs SET last_scheduled = ?, last_started = ?, "
+                "last_status = 'running' WHERE name = ?",
+                (scheduled_until, started, name)
+            )
+            self._conn.commit()
+
+    def mark_skipped(self, name, scheduled_until):
+        """Records that missed slots up to scheduled_until were skipped (no catch-up)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_jobs SET last_scheduled = ? WHERE name = ?",
+                (scheduled_until, name)
+            )
+            self._conn.commit()
+
+    def mark_finished(self, name, status):
+        """Records the end and outcome of a run."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_jobs SET last_finished = ?, last_status = ? WHERE name = ?",
+                (time.time(), status, name)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class SchedulerService:
+    """
+    Long-running scheduler that executes tracking jobs in this process.
+
+    One ShipmentTracker is kept per configuration file, so HTTP connection
+    pools, the zip code cache and the rate limiter stay warm between runs.
+    Runs hold the shared run lock, so they never overlap with each other or
+    with a manual tracker.py run. Slots missed while the service was down
+    (or while another run held the lock) are caught up with a single run.
+    """
+
+    def __init__(self, job_store, lock_path, poll_interval=30):
+        """
+        Initialize the service.
+
+        Args:
+            job_store (JobStore): Persisted job definitions
+            lock_path (str): Run lock file shared with tracker.py
+            poll_interval (float): Maximum seconds between schedule checks
+        """
+        self.job_store = job_store
+        self.run_lock = RunLock(lock_path)
+        self.poll_interval = poll_interval
+        self._trackers = {}
+        self._stop = threading.Event()
+
+    def due_jobs(self, now=None):
+        """
+        Returns the enabled jobs with a schedule slot at or before now.
+
+        Args:
+            now (datetime): Reference time (defaults to now)
+
+        Returns:
+            list: (job dict, latest due slot as a timestamp) tuples
+        """
+        now = now or datetime.now()
+        due = []
+        for job in self.job_store.jobs():
+            if not job['enabled']:
+                continue
+            schedule = CronSchedule(job['schedule'])
+            slot = schedule.next_after(datetime.fromtimestamp(job['last_scheduled']))
+            if slot > now:
+                continue
+            # Coalesce every missed slot into one run
+            latest = slot
+            following = schedule.next_after(latest)
+            while following <= now:
+                latest, following = following, schedule.next_after(following)
+            due.append((job, latest.timestamp()))
+        return due
+
+    def next_wakeup(self, now=None):
+        """Returns the seconds until the next check (at most poll_interval)."""
+        now = now or datetime.now()
+        wait = self.poll_interval
+        for job in self.job_store.jobs():
+            if job['enabled']:
+                slot = CronSchedule(job['schedule']).next_after(
+                    max(now, datetime.fromtimestamp(job['last_scheduled'])))
+                wait = min(wait, (slot - now).total_seconds())
+        return max(wait, 1)
+
+    def run_pending(self, now=None):
+        """
+        Runs every due job once.
+
+        Args:
+            now (datetime): Reference time (defaults to now)
+
+        Returns:
+            int: Number of jobs that ran
+        """
+        ran = 0
+        now = now or datetime.now()
+        for job, slot in self.due_jobs(now):
+            missed = slot < now.timestamp() - self.poll_interval * 2
+            if missed and not job['catch_up']:
+                logger.info("Job %s: skipping missed run of %s (catch-up disabled)",
+                            job['name'], datetime.fromtimestamp(slot), extra={"job": job['name']})
+                self.job_store.mark_skipped(job['name'], slot)
+                continue
+            if self.run_job(job, slot):
+                ran += 1
+        return ran
+
+    def run_job(self, job, slot=None):
+        """
+        Runs one job under the run lock.
+
+        Args:
+            job (dict): Job definition from the job store
+            slot (float): Schedule slot covered by this run (defaults to now)
+
+        Returns:
+            bool: True if the job ran, False if another run held the lock
+        """
+        if not self.run_lock.acquire():
+            logger.warning("Job %s: another tracking run is in progress, will retry",
+                           job['name'], extra={"job": job['name']})
+            return False
+        try:
+            started = time.time()
+            self.job_store.mark_started(job['name'], slot or started, started)
+            logger.info("Job %s: starting scheduled tracking run", job['name'],
+                        extra={"job": job['name']})
+            try:
+                self._tracker(job['config_path']).run()
+                status = "succeeded"
+            except Exception as e:
+                logger.exception("Job %s failed: %s", job['name'], e, extra={"job": job['name']})
+                status = "failed"
+            self.job_store.mark_finished(job['name'], status)
+            logger.info("Job %s %s in %.1fs", job['name'], status, time.time() - started,
+                        extra={"job": job['name'], "status": status})
+            return True
+        finally:
+            self.run_lock.release()
+
+    def _tracker(self, config_path):
+        """Returns the warm ShipmentTracker for a configuration file."""
+        tracker = self._trackers.get(config_path)
+        if tracker is None:
+            # Imported here so the dashboard can use set_time() without loading the tracker
+            from src.tracker import ShipmentTracker
+            tracker = self._trackers[config_path] = ShipmentTracker(config_path)
+        return tracker
+
+    def serve_forever(self):
+        """Runs due jobs until stop() is called."""
+        logger.info("Scheduler started with %d jobs", len(self.job_store.jobs()))
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.next_wakeup())
+        logger.info("Scheduler stopped")
+
+    def stop(self):
+        """Makes serve_forever return after the current run."""
+        self._stop.set()
+
+
+def open_job_store(config):
+    """
+    Opens the job store configured by 'scheduler_file'.
+
+    Args:
+        config (dict): Loaded configuration
+
+    Returns:
+        JobStore: The job store
+    """
+    return JobStore(config.get('scheduler_file',
+                               os.path.join(config['output_dir'], 'scheduler.sqlite3')))
+
+
+def service_lock(config):
+    """
+    Returns the lock a scheduler service holds while it runs ('scheduler_lock_file').
+
+    Args:
+        config (dict): Loaded configuration
+
+    Returns:
+        RunLock: The service lock (not acquired)
+    """
+    return RunLock(config.get('scheduler_lock_file',
+                              os.path.join(config['output_dir'], 'scheduler.lock')))
+
+
+def service_running(config):
+    """
+    Checks whether a scheduler service is running for a configuration.
+
+    Args:
+        config (dict): Loaded configuration
+
+    Returns:
+        bool: True if another process holds the service lock
+    """
+    lock = service_lock(config)
+    if lock.acquire():
+        lock.release()
+        return False
+    return True
+
+
+def start_service(config_path="config/config.json", timeout=10):
+    """
+    Starts the scheduler service in a background process.
+
+    The service keeps running after the calling process exits; its log goes
+    to 'scheduler_log_file'.
+
+    Args:
+        config_path (str): Configuration file of the service
+        timeout (float): Seconds to wait for the service to come up
+
+    Returns:
+        bool: True if the service is running
+    """
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    log_path = config.get('scheduler_log_file', os.path.join(config['output_dir'], 'scheduler.log'))
+    directory = os.path.dirname(log_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(log_path, 'a') as log_file:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--config", os.path.abspath(config_path)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if service_running(config):
+            return True
+        time.sleep(0.2)
+    logger.error("The scheduler service did not start, see %s", log_path)
+    return False
+
+
+def schedule_daily(hours, minutes, config_path="config/config.json"):
+    """
+    Saves a job that runs tracking every day at the given time.
+
+    Args:
+        hours (int): Hour (0-23)
+        minutes (int): Minute (0-59)
+        config_path (str): Configuration file of the tracking run
+
+    Returns:
+        str: Name of the saved job
+    """
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    name = f"daily-{hours:02d}{minutes:02d}"
+    store = open_job_store(config)
+    try:
+        store.add(name, f"{minutes} {hours} * * *", os.path.abspath(config_path))
+    finally:
+        store.close()
+    return name
+
+
+def main(argv=None):
+    """Command line management and service entry point of the scheduler."""
+    parser = argparse.ArgumentParser(description="Recurring tracking runs.")
+    parser.add_argument("--config", default="config/config.json", help="configuration file")
+    actions = parser.add_mutually_exclusive_group(required=True)
+    actions.add_argument("--serve", action="store_true", help="run the scheduler service")
+    actions.add_argument("--add", nargs=2, metavar=("NAME", "CRON"),
+                         help='add or replace a job, e.g. --add morning "0 8 * * mon-fri"')
+    actions.add_argument("--remove", metavar="NAME", help="delete a job")
+    actions.add_argument("--enable", metavar="NAME", help="enable a job")
+    actions.add_argument("--disable", metavar="NAME", help="disable a job")
+    actions.add_argument("--list", action="store_true", help="list jobs and their last runs")
+    parser.add_argument("--no-catch-up", action="store_true",
+                        help="with --add: skip runs missed while the service was down")
+    args = parser.parse_args(argv)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    configure_logging(config.get('log_level', 'INFO'), config.get('log_format', 'text'))
+    store = open_job_store(config)
+
+    if args.serve:
+        # The lock tells the dashboard (and a second --serve) that jobs will run;
+        # the wait covers a concurrent service_running() check
+        lock = service_lock(config)
+        if not lock.acquire(timeout=2):
+            logger.error("A scheduler service is already running (%s)", lock.path)
+            store.close()
+            return 1
+        service = SchedulerService(
+            store,
+            config.get('run_lock_file', os.path.join(config['output_dir'], 'tracker.lock')),
+            poll_interval=config.get('scheduler_poll_seconds', 30)
+        )
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            lock.release()
+    elif args.add:
+        name, schedule = args.add
+        store.add(name, schedule, os.path.abspath(args.config), catch_up=not args.no_catch_up)
+        print(f"Job {name} scheduled: {schedule} "
+              f"(next run {CronSchedule(schedule).next_after(datetime.now()):%Y-%m-%d %H:%M})")
+    elif args.remove:
+        print(f"Job {args.remove} removed" if store.remove(args.remove) else f"No job {args.remove}")
+    elif args.enable or args.disable:
+        store.set_enabled(args.enable or args.disable, bool(args.enable))
+    else:
+        for job in store.jobs():
+            next_run = CronSchedule(job['schedule']).next_after(
+                max(datetime.now(), datetime.fromtimestamp(job['last_scheduled'])))
+            last = (datetime.fromtimestamp(job['last_started']).strftime('%Y-%m-%d %H:%M')
+                    if job['last_started'] else "never")
+            print(f"{job['name']:<16} {job['schedule']:<20} "
+                  f"{'enabled' if job['enabled'] else 'disabled':<9} "
+                  f"next {next_run:%Y-%m-%d %H:%M}  last {last} ({job['last_status'] or '-'})")
+    store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Sharded Tracking Module for MedshipmentTrackingTool
+
+This module spreads one tracking run over several worker processes, for
+input too large for one process's fetch threads and parser. The rows of all
+input workbooks are read in the parent, the tracking numbers that need a
+fetch are cut into shards, and every shard is tracked by a worker process
+with its own HTTP connection pool, rate limiter and parser. The results are
+merged back in input order into one Final-Data.xlsx and one categorized
+report.
+
+Usage:
+    python src/tracker.py --inputs data/north.xlsx data/south.xlsx
+    python src/tracker.py --inputs data/batches/ --workers 4 --shard-size 250
+"""
+
+import os
+import sys
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tracker import ShipmentTracker, RunCancelled
+from src.fetch_engine import FetchEngine
+
+logger = logging.getLogger(__name__)
+
+# Input file types read by ExcelHandler.iter_input_rows
+INPUT_EXTENSIONS = (".xlsx", ".csv")
+
+# Tracker of the current worker process, created by _init_shard_worker
+_worker_tracker = None
+
+
+def collect_input_files(paths):
+    """
+    Expands input paths into the list of input files.
+
+    Args:
+        paths (list): Input files and/or directories; a directory stands for
+                      the .xlsx and .csv files directly inside it, in name order
+
+    Returns:
+        list: Input file paths
+
+    Raises:
+        FileNotFoundError: If a path does not exist or a directory has no input files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith("~$")
+            )
+            if not found:
+                raise FileNotFoundError(f"No input files in directory: {path}")
+            files.extend(found)
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Input file not found: {path}")
+    return files
+
+
+def _init_shard_worker(config_path, overrides, cancel_event):
+    """
+    Creates the tracker of a worker process (runs once per process).
+
+    Args:
+        config_path (str): Configuration file of the run
+        overrides (dict): Per-worker config values (rate limits, connections)
+        cancel_event (multiprocessing.Event): Set by the parent to cancel the run
+    """
+    global _worker_tracker
+    tracker = ShipmentTracker(config_path, overrides)
+    # The parent journals the merged results
+    tracker.checkpoint.close()
+    tracker.checkpoint = None
+    tracker._cancel_event = cancel_event
+    _worker_tracker = tracker
+
+
+def _track_shard(tracking_numbers):
+    """
+    Tracks one shard of tracking numbers (runs in a worker process).
+
+    Args:
+        tracking_numbers (list): Unique tracking numbers to fetch
+
+    Returns:
+        dict: 'results' (tracking number -> event data or 0; items whose
+              lookup did not run because of a cancel are left out),
+              'failed', 'no_info', 'unchanged', 'zip_hits', 'zip_misses',
+              'gazetteer_hits' and 'gazetteer_misses' counts
+    """
+    tracker = _worker_tracker
+    unchanged = tracker.unchanged_pages.value()
+    zip_hits, zip_misses = tracker.zip_cache.hits, tracker.zip_cache.misses
+    gazetteer = tracker.zip_gazetteer
+    gazetteer_hits, gazetteer_misses = (gazetteer.hits, gazetteer.misses) if gazetteer else (0, 0)
+    with FetchEngine(tracker.fetch_workers, tracker.max_per_host) as engine:
+        results = {
+            tracking_number: tracker._submit_fetch(engine, tracking_number, "shard")
+            for tracking_number in tracking_numbers
+        }
+        failed = tracker._retry_failed(engine, results)
+
+    shard_results = {}
+    for tracking_number, future in results.items():
+        if future == 0:
+            shard_results[tracking_number] = 0
+        elif not future.cancelled() and not isinstance(future.exception(), RunCancelled):
+            shard_results[tracking_number] = future.result()
+    return {
+        'results': shard_results,
+        'failed': failed,
+        'no_info': sum(1 for result in shard_results.values() if result == 0) - failed,
+        'unchanged': tracker.unchanged_pages.value() - unchanged,
+        'zip_hits': tracker.zip_cache.hits - zip_hits,
+        'zip_misses': tracker.zip_cache.misses - zip_misses,
+        'gazetteer_hits': gazetteer.hits - gazetteer_hits if gazetteer else 0,
+        'gazetteer_misses': gazetteer.misses - gazetteer_misses if gazetteer else 0
+    }
+
+
+class ShardedTracker(ShipmentTracker):
+    """Tracks the rows of several input files with a pool of worker processes."""
+
+    # Rows are fetched in worker processes, not by the streaming pipeline
+    supports_streaming = False
+
+    def __init__(self, input_paths, config_path="config/config.json", workers=None, shard_size=None):
+        """
+        Initialize the sharded tracker.
+
+        Args:
+            input_paths (list): Input files and/or directories of input files
+            config_path (str): Path to configuration file
+            workers (int): Worker processes (defaults to config 'shard_workers')
+            shard_size (int): Tracking numbers per shard (defaults to config 'shard_size')
+        """
+        # Created first: ShipmentTracker.__init__ calls reset_run_state
+        self._shard_cancel = multiprocessing.get_context("spawn").Event()
+        self._shard_futures = []
+        self._shard_lock = threading.Lock()
+        super().__init__(config_path)
+        self.input_files = collect_input_files(input_paths)
+        self.workers = max(1, workers or self.config.get('shard_workers') or os.cpu_count() or 1)
+        self.shard_size = max(1, shard_size or self.config.get('shard_size', 500))
+
+    def cancel(self):
+        """
+        Asks the current run to stop (see ShipmentTracker.cancel).
+
+        Shards not yet started are dropped; running workers stop starting lookups.
+        """
+        super().cancel()
+        self._shard_cancel.set()
+        with self._shard_lock:
+            for future in self._shard_futures:
+                future.cancel()
+
+    def reset_run_state(self):
+        super().reset_run_state()
+        self._shard_cancel.clear()
+
+    def _worker_overrides(self, workers):
+        """
+        Returns the config values of each worker process.
+
+        The IPS rate limits and per-host connection limit are split between the
+        workers, so the pool as a whole stays within the configured limits.
+
+        Args:
+            workers (int): Number of worker processes
+
+        Returns:
+            dict: Config overrides for the workers
+        """
+        overrides = {
+            key: self.config.get(key, default) / workers
+            for key, default in (('ips_initial_rate', 5.0), ('ips_min_rate', 0.5), ('ips_max_rate', 20.0))
+        }
+        overrides['max_connections_per_host'] = max(1, self.max_per_host // workers)
+        return overrides
+
+    def process_tracking_numbers(self, resume=False):
+        """
+        Processes the tracking numbers of all input files with worker processes.
+
+        Results reused from the checkpoint journal or the state store are
+        taken in the parent, as in ShipmentTracker.process_tracking_numbers;
+        only the remaining tracking numbers are sharded. Every merged shard
+        result is appended to the checkpoint journal, so --resume works as in
+        a single-process run.
+
+        Args:
+            resume (bool): Replay the checkpoint journal of an interrupted run
+                           and fetch only the remaining tracking numbers
+
+        Returns:
+            list: Tracking records of all input files, in input order
+        """
+        journaled = self._load_journal(resume)
+
+        rows = []
+        results = {}
+        pending = []
+        for input_file in self.input_files:
+            for row in self.excel_handler.iter_input_rows(input_file):
+                if self._cancel_event.is_set():
+                    break
+                rows.append(row)
+                if self._reuse_result(row.tracking_number, results, journaled):
+                    continue
+                results[row.tracking_number] = None  # Not processed until a shard returns it
+                pending.append(row.tracking_number)
+        logger.info("Collected %d tracking numbers from %d input files (%d unique, %d to fetch)",
+                    len(rows), len(self.input_files), len(results), len(pending))
+
+        shards = [pending[i:i + self.shard_size] for i in range(0, len(pending), self.shard_size)]
+        if shards and not self._cancel_event.is_set():
+            self._run_shards(shards, results)
+        return self._collect_records(rows, results)
+
+    def _run_shards(self, shards, results):
+        """
+        Tracks the shards on a process pool and merges their results.
+
+        Args:
+            shards (list): Lists of tracking numbers
+            results (dict): Mapping of tracking number to result (updated in place)
+        """
+        workers = min(self.workers, len(shards))
+        logger.info("Tracking %d shards of up to %d items with %d worker processes",
+                    len(shards), self.shard_size, workers)
+        with self._progress_lock:
+            self._progress['total'] += sum(len(shard) for shard in shards)
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_shard_worker,
+            initargs=(self.config_path, self._worker_overrides(workers), self._shard_cancel)
+        ) as pool:
+            with self._shard_lock:
+                self._shard_futures = [pool.submit(_track_shard, shard) for shard in shards]
+                shard_of = dict(zip(self._shard_futures, shards))
+            remaining = set(shard_of)
+            while remaining:
+                done, remaining = wait(remaining, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._merge_shard(future, shard_of[future], results)
+            with self._shard_lock:
+                self._shard_futures = []
+
+    def _merge_shard(self, future, shard, results):
+        """
+        Merges the results of one finished shard into the run.
+
+        Args:
+            future (Future): Finished _track_shard call
+            shard (list): Tracking numbers of the shard
+            results (dict): Mapping of tracking number to result (updated in place)
+        """
+        shard_result = {'results': {}, 'failed': 0, 'no_info': 0, 'unchanged': 0,
+                        'zip_hits': 0, 'zip_misses': 0, 'gazetteer_hits': 0, 'gazetteer_misses': 0}
+        if not future.cancelled():
+            try:
+                shard_result = future.result()
+            except Exception as e:
+                # A crashed worker fails its own shard, not the whole run
+                logger.error("Shard of %d items failed: %s", len(shard), e, exc_info=e)
+                shard_result['results'] = {tracking_number: 0 for tracking_number in shard}
+                shard_result['failed'] = len(shard)
+
+        for tracking_number, event_data in shard_result['results'].items():
+            results[tracking_number] = event_data
+            if event_data != 0:
+                self.checkpoint.record(tracking_number, event_data)
+        fetched = len(shard_result['results'])
+        self.fetch_results.inc(fetched - shard_result['failed'] - shard_result['no_info'],
+                               outcome="success")
+        self.fetch_results.inc(shard_result['no_info'], outcome="no_info")
+        self.fetch_results.inc(shard_result['failed'], outcome="failure")
+        self.unchanged_pages.inc(shard_result['unchanged'])
+        self.zip_cache.hits += shard_result['zip_hits']
+        self.zip_cache.misses += shard_result['zip_misses']
+        if self.zip_gazetteer:
+            self.zip_gazetteer.hits += shard_result['gazetteer_hits']
+            self.zip_gazetteer.misses += shard_result['gazetteer_misses']
+
+        with self._progress_lock:
+            self._progress['processed'] += fetched
+            self._progress['total'] -= len(shard) - fetched  # Never ran
+            self._progress['failed'] += shard_result['failed']
+            self._progress['no_info'] += shard_result['no_info']
+        logger.info("Shard of %d items finished (%d fetched)", len(shard), fetched)
+        self._report_progress(shard[-1])
@@ -0,0 +1,132 @@
+"""
+State Store Module for MedshipmentTrackingTool
+
+This module persists the last known tracking result for every tracking number
+across runs, so delivered items and recently polled items are not scraped
+again on every run. The ETag, Last-Modified and events table hash of the
+last fetch are kept with it, so the next poll can be a conditional request.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Response validators stored with each result (see web_scraper.fetch_tracking_data)
+VALIDATOR_FIELDS = ("etag", "last_modified", "content_hash")
+
+# Seconds a write waits for another process (e.g. a shard worker) to release the file
+BUSY_TIMEOUT = 30
+
+
+class TrackingStateStore:
+    """SQLite-backed store of the last fetched event per tracking number."""
+
+    def __init__(self, db_path, terminal_categories=("Delivered", "Returned"),
+                 min_repoll_interval=4 * 3600):
+        """
+        Initialize the state store.
+
+        Args:
+            db_path (str): Path of the SQLite state file
+            terminal_categories (iterable): Categories that are never re-polled
+            min_repoll_interval (int): Seconds before a non-terminal item is
+                                       fetched again
+        """
+        self.db_path = db_path
+        self.terminal_categories = set(terminal_categories)
+        self.min_repoll_interval = min_repoll_interval
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        # Sharded runs open the file from several processes at once
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracking_state ("
+            "tracking_number TEXT PRIMARY KEY, "
+            "event_data TEXT NOT NULL, "
+            "category TEXT, "
+            "fetched_at REAL NOT NULL, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "content_hash TEXT)"
+        )
+        # State files written before the validator columns existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tracking_state)")}
+        for column in VALIDATOR_FIELDS:
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE tracking_state ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def get(self, tracking_number):
+        """
+        Returns the stored state for a tracking number.
+
+        Args:
+            tracking_number (str): The tracking number to look up
+
+        Returns:
+            dict: {'event_data', 'category', 'fetched_at', 'validators'},
+                  or None if unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT event_data, category, fetched_at, etag, last_modified, content_hash "
+                "FROM tracking_state WHERE tracking_number = ?",
+                (str(tracking_number),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'event_data': json.loads(row[0]),
+            'category': row[1],
+            'fetched_at': row[2],
+            'validators': dict(zip(VALIDATOR_FIELDS, row[3:]))
+        }
+
+    def update(self, tracking_number, event_data, category, validators=None):
+        """
+        Records a freshly fetched result.
+
+        Args:
+            tracking_number (str): The tracking number that was fetched
+            event_data (list): Event data returned by fetch_tracking_data
+            category (str): Status category of the event, or None
+            validators (dict): 'etag', 'last_modified' and 'content_hash' of
+                               the response, for conditional re-polls
+        """
+        validators = validators or {}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tracking_state "
+                "(tracking_number, event_data, category, fetched_at, etag, last_modified, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(tracking_number), json.dumps(event_data), category, time.time(),
+                 *(validators.get(field) for field in VALIDATOR_FIELDS))
+            )
+            self._conn.commit()
+
+    def is_due(self, state, now=None):
+        """
+        Checks whether a stored item should be fetched again.
+
+        Args:
+            state (dict): State returned by get()
+            now (float): Current time (defaults to time.time())
+
+        Returns:
+            bool: True if the item must be re-polled
+        """
+        if state['category'] in self.terminal_categories:
+            return False
+        now = time.time() if now is None else now
+        return now - state['fetched_at'] >= self.min_repoll_interval
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
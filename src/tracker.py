@@ -11,147 +11,931 @@ This is the core module that orchestrates the tracking process:
 import os
 import sys
 import json
+import argparse
+import time
+import logging
 import datetime
+import threading
+from typing import NamedTuple
+from contextlib import contextmanager
+from concurrent.futures import Future, wait
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.web_scraper import fetch_tracking_data, get_zip_codes
+from src.web_scraper import (create_session, fetch_tracking_data, get_zip_codes,
+                             TrackingFetchError, NOT_MODIFIED)
 from src.excel_handler import ExcelHandler
+from src.fetch_engine import FetchEngine
+from src.zip_cache import ZipCodeCache
+from src.zip_gazetteer import open_gazetteer
+from src.state_store import TrackingStateStore
+from src.checkpoint import CheckpointJournal
+from src.rate_limiter import AdaptiveRateLimiter, CircuitBreaker
+from src.event_store import EventStore
+from src.metrics import MetricsRegistry
+from src.logging_config import configure_logging
+from src.run_lock import RunLock, RunLockBusy
+
+logger = logging.getLogger(__name__)
+
+
+class RunCancelled(Exception):
+    """Raised inside a fetch when the run has been cancelled."""
+
+
+class RunProgress(NamedTuple):
+    """Snapshot of a run's progress, passed to ShipmentTracker.progress_listener."""
+    stage: str  # fetch, write_final_data, categorize, report or done
+    processed: int  # Lookups finished (fetched, failed or without information)
+    total: int  # Lookups scheduled so far, including retries
+    failed: int  # Lookups that raised an error
+    no_info: int  # Lookups that found no tracking information
+    elapsed: float  # Seconds since the run started
+    tracking_number: str = ""  # Item of the latest finished lookup
+    
+    @property
+    def throughput(self):
+        """Lookups finished per second."""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def eta(self):
+        """Estimated seconds until all scheduled lookups finish (None if unknown)."""
+        if not self.processed:
+            return None
+        return (self.total - self.processed) / self.throughput
+
+
+def create_http_session(config):
+    """Creates the shared keep-alive HTTP session configured by the 'http_*' keys."""
+    return create_session(
+        pool_size=config.get('http_pool_size', config.get('fetch_workers', 8)),
+        max_retries=config.get('http_max_retries', 3),
+        backoff_factor=config.get('http_backoff_factor', 0.5),
+        mode=config.get('http_mode', 'live'),
+        fixture_dir=config.get('http_fixture_dir')
+    )
+
+
+def create_rate_limiter(config):
+    """Creates the IPS rate limiter configured by the 'ips_*' keys."""
+    return AdaptiveRateLimiter(
+        initial_rate=config.get('ips_initial_rate', 5.0),
+        min_rate=config.get('ips_min_rate', 0.5),
+        max_rate=config.get('ips_max_rate', 20.0),
+        target_latency=config.get('ips_target_latency_seconds', 3.0)
+    )
+
+
+def create_circuit_breaker(config):
+    """Creates the IPS circuit breaker configured by the 'circuit_*' keys."""
+    return CircuitBreaker(
+        failure_ratio=config.get('circuit_failure_ratio', 0.5),
+        window=config.get('circuit_window', 20),
+        cooldown=config.get('circuit_cooldown_seconds', 30.0)
+    )
+
+
+def create_zip_cache(config):
+    """Creates the persistent zip code cache configured by the 'zip_cache_*' keys."""
+    return ZipCodeCache(
+        config.get('zip_cache_file', os.path.join(config['output_dir'], 'zip-cache.sqlite3')),
+        ttl_seconds=config.get('zip_cache_ttl_seconds', 30 * 24 * 3600),
+        negative_ttl_seconds=config.get('zip_cache_negative_ttl_seconds', 3600),
+        memory_size=config.get('zip_cache_memory_size', 1024)
+    )
+
+
+def locate_zip(zip_code, zip_gazetteer, zip_cache, fetch_zip):
+    """
+    Looks up a zip code in the offline gazetteer, then the cache and the web.
+    
+    Args:
+        zip_code (int): The zip code to look up
+        zip_gazetteer (ZipGazetteer): Offline index, or None
+        zip_cache (ZipCodeCache): Zip code lookup cache
+        fetch_zip (callable): Looks a zip code (str) up on the web on a cache miss
+        
+    Returns:
+        str: Location information, or 0 if lookup fails
+    """
+    if zip_gazetteer:
+        location = zip_gazetteer.get(zip_code)
+        if location is not None:
+            return location
+    return zip_cache.lookup(str(zip_code), fetch_zip)
+
+
+def enrich_location(event_data, zip_location):
+    """
+    Replaces a numeric location with its zip code information (in place).
+    
+    Args:
+        event_data (list): Tracking event data
+        zip_location (callable): Returns the location of a zip code (int), or 0
+    """
+    if len(event_data) > 2 and isinstance(event_data[2], (int, str)):
+        try:
+            zip_code = int(event_data[2])
+        except ValueError:
+            # Not a zip code, keep original location
+            return
+        location = zip_location(zip_code)
+        if location != 0:
+            event_data[2] = location
 
 
 class ShipmentTracker:
     """Main class for tracking shipments."""
     
-    def __init__(self, config_path="config/config.json"):
+    # Whether run() may use the streaming pipeline ('streaming_pipeline' config key)
+    supports_streaming = True
+    
+    def __init__(self, config_path="config/config.json", overrides=None):
         """
         Initialize the tracker.
         
         Args:
             config_path (str): Path to configuration file
+            overrides (dict): Config values replacing those of the file
         """
+        self.config_path = config_path
         self.excel_handler = ExcelHandler(config_path)
         with open(config_path, 'r') as f:
             self.config = json.load(f)
+        if overrides:
+            self.config.update(overrides)
+            self.excel_handler.config.update(overrides)
+        
+        # Concurrency settings for the fetch engine
+        self.fetch_workers = self.config.get('fetch_workers', 8)
+        self.max_per_host = self.config.get('max_connections_per_host', 4)
+        
+        # Throttling for the IPS site; failed items are retried in later rounds
+        self.rate_limiter = create_rate_limiter(self.config)
+        self.circuit_breaker = create_circuit_breaker(self.config)
+        self.retry_rounds = self.config.get('fetch_retry_rounds', 3)
+        
+        # Shared keep-alive HTTP session for all lookups
+        self.session = create_http_session(self.config)
+        
+        # Persistent zip code lookup cache
+        self.zip_cache = create_zip_cache(self.config)
+        
+        # Offline zip code index, consulted before the cache and the web
+        self.zip_gazetteer = open_gazetteer(self.config)
+        
+        # Last known result per tracking number, for incremental runs
+        self.state_store = None
+        if self.config.get('incremental_tracking', True):
+            self.state_store = TrackingStateStore(
+                self.config.get('state_file',
+                                os.path.join(self.config['output_dir'], 'tracking-state.sqlite3')),
+                terminal_categories=self.config.get('terminal_categories', ["Delivered", "Returned"]),
+                min_repoll_interval=self.config.get('min_repoll_interval_seconds', 4 * 3600)
+            )
+        # Re-polls send the stored ETag/Last-Modified and skip unchanged pages
+        self.conditional_fetches = self.config.get('conditional_fetches', True)
+        # Fixtures hold one response per URL, which must stay the full page
+        self.conditional_headers = self.config.get('http_mode', 'live') == 'live'
+        
+        # Journal of results fetched during the current run, for --resume
+        self.checkpoint = CheckpointJournal(
+            self.config.get('checkpoint_file',
+                            os.path.join(self.config['output_dir'], 'checkpoint.jsonl'))
+        )
+        
+        # Full event history of every fetched item
+        self.event_store = None
+        if self.config.get('store_event_history', True):
+            self.event_store = EventStore(
+                self.config.get('event_store_file',
+                                os.path.join(self.config['output_dir'], 'tracking-events.sqlite3'))
+            )
+        
+        # Run control: progress_listener receives RunProgress snapshots (from
+        # worker threads); cancel() stops the run and keeps partial results
+        self.progress_listener = None
+        self._cancel_event = threading.Event()
+        self._progress_lock = threading.Lock()
+        
+        self.reset_run_state()
+    
+    def cancel(self):
+        """
+        Asks the current run to stop.
+        
+        No new lookups are started; lookups in flight finish, and the report
+        is written from the results collected so far. The checkpoint journal
+        is kept, so the run can be completed later with --resume.
+        """
+        logger.warning("Cancelling run: finishing lookups in flight")
+        self._cancel_event.set()
+    
+    @property
+    def cancelled(self):
+        """True if cancel() was called during the current run."""
+        return self._cancel_event.is_set()
+    
+    def reset_run_state(self):
+        """
+        Clears the per-run counters and metrics.
+        
+        Called at the start of every run, so one tracker (with its warm HTTP
+        session, caches and rate limiter) can be reused for many runs.
+        """
         self.miscellaneous = []  # Track numbers that couldn't be processed
+        self.reused_from_state = 0  # Items served from the state store
+        self.duplicate_rows = 0  # Rows sharing an already-seen tracking number
+        self.resumed = 0  # Items replayed from the checkpoint journal
+        self.not_processed = 0  # Rows skipped because the run was cancelled
+        self._cancel_event.clear()
+        self.zip_cache.hits = self.zip_cache.misses = 0
+        if self.zip_gazetteer:
+            self.zip_gazetteer.hits = self.zip_gazetteer.misses = 0
+        
+        # Progress counters reported to progress_listener
+        self._run_started = time.monotonic()
+        self._stage_name = "fetch"
+        self._progress = {'processed': 0, 'total': 0, 'failed': 0, 'no_info': 0}
+        
+        # Run metrics, exported next to the report
+        self.metrics = MetricsRegistry()
+        self.fetch_results = self.metrics.counter(
+            "fetch_results_total", "IPS lookups by outcome (success, no_info, failure)")
+        self.unchanged_pages = self.metrics.counter(
+            "ips_unchanged_pages_total", "IPS lookups answered by 304 or an unchanged events table")
+        self.ips_latency = self.metrics.histogram(
+            "ips_request_seconds", "Latency of IPS tracking page requests")
+        self.zip_latency = self.metrics.histogram(
+            "zip_lookup_seconds", "Latency of zip code web lookups (cache misses)")
+        self.stage_seconds = self.metrics.gauge(
+            "stage_duration_seconds", "Duration of each stage of the last run")
     
-    def process_tracking_numbers(self):
+    def process_tracking_numbers(self, resume=False):
         """
         Main method to process all tracking numbers.
         
+        Tracking numbers are fetched concurrently by a FetchEngine; the
+        returned records keep the order of the input sheet. Items in a
+        terminal state, or polled recently, are taken from the state store
+        instead of being fetched again. Every fetched result is appended to
+        the checkpoint journal as it arrives. Lookups that fail because the
+        IPS site is unreachable or erroring go to a retry queue and are
+        fetched again in up to fetch_retry_rounds later rounds.
+        
+        If the run is cancelled, reading and fetching stop and the records
+        collected so far are returned; rows whose lookup did not run are
+        counted in not_processed.
+        
+        Args:
+            resume (bool): Replay the checkpoint journal of an interrupted run
+                           and fetch only the remaining tracking numbers
+        
         Returns:
             list: List of tracking records
         """
-        # Read input data
-        order_ids, first_names, last_names, tracking_numbers = self.excel_handler.read_input_data()
+        journaled = self._load_journal(resume)
         
-        # Process each tracking number
-        tracking_data = []
+        with FetchEngine(self.fetch_workers, self.max_per_host) as engine:
+            # Stream the input sheet; fetching starts while it is still being read
+            rows = []
+            results = {}  # tracking number -> Future or stored event data
+            for row in self.excel_handler.iter_input_rows():
+                if self._cancel_event.is_set():
+                    break
+                rows.append(row)
+                if self._reuse_result(row.tracking_number, results, journaled):
+                    continue
+                results[row.tracking_number] = self._submit_fetch(engine, row.tracking_number, len(rows))
+            logger.info("Collected %d tracking numbers from %s (%d unique)",
+                        len(rows), self.config['input_file'], len(results))
+            
+            self._retry_failed(engine, results)
+            return self._collect_records(rows, results)
+    
+    def _load_journal(self, resume):
+        """
+        Replays the checkpoint journal when resuming, or starts a new one.
+        
+        Returns:
+            dict: Journaled results by tracking number (empty unless resuming)
+        """
+        if resume:
+            journaled = self.checkpoint.load()
+            logger.info("Resuming: %d results replayed from %s", len(journaled), self.checkpoint.path)
+            return journaled
+        self.checkpoint.reset()
+        return {}
+    
+    def _reuse_result(self, tracking_number, results, journaled):
+        """
+        Fills in a result that does not need a fetch.
+        
+        Args:
+            tracking_number (str): Tracking number of the current input row
+            results (dict): Results collected so far (updated in place)
+            journaled (dict): Results replayed from the checkpoint journal
+            
+        Returns:
+            bool: True if the tracking number needs no fetch
+        """
+        # A tracking number shared by several orders is fetched once
+        if tracking_number in results:
+            self.duplicate_rows += 1
+            return True
         
-        for i, tracking_number in enumerate(tracking_numbers):
-            if tracking_number is None:
+        if tracking_number in journaled:
+            self.resumed += 1
+            results[tracking_number] = journaled[tracking_number]
+            return True
+        
+        state = self.state_store.get(tracking_number) if self.state_store else None
+        if state is not None and not self.state_store.is_due(state):
+            self.reused_from_state += 1
+            results[tracking_number] = state['event_data']
+            return True
+        return False
+    
+    def _retry_failed(self, engine, results):
+        """
+        Re-fetches items that failed with a transient error.
+        
+        Waits for all pending lookups, then retries the failed ones in up to
+        fetch_retry_rounds rounds. Items that still fail are set to 0, as are
+        items whose lookup raised an unexpected error (not retried).
+        
+        Args:
+            engine (FetchEngine): Engine running the lookups
+            results (dict): Mapping of tracking number to Future or event data
+                            (updated in place)
+        
+        Returns:
+            int: Number of items that failed
+        """
+        retry_queue = self._failed_fetches(results)
+        for attempt in range(1, self.retry_rounds + 1):
+            if not retry_queue or self._cancel_event.is_set():
+                break
+            logger.info("Retrying %d failed lookups (round %d/%d)",
+                        len(retry_queue), attempt, self.retry_rounds)
+            for tracking_number in retry_queue:
+                results[tracking_number] = self._submit_fetch(engine, tracking_number, "retry")
+            retry_queue = self._failed_fetches(results)
+        for tracking_number in retry_queue:
+            results[tracking_number] = 0
+        
+        errors = 0
+        for tracking_number, result in results.items():
+            if not isinstance(result, Future) or result.cancelled():
                 continue
+            error = result.exception()
+            if error is not None and not isinstance(error, (TrackingFetchError, RunCancelled)):
+                logger.error("Tracking Number %s: Unexpected error - %s", tracking_number, error,
+                             exc_info=error, extra={"tracking_number": tracking_number})
+                results[tracking_number] = 0
+                errors += 1
+        return len(retry_queue) + errors
+    
+    def _collect_records(self, rows, results):
+        """
+        Fans results out to every input row, in input order.
+        
+        Args:
+            rows (list): InputRow tuples in input order
+            results (dict): Mapping of tracking number to Future, event data,
+                            0 (no information) or None (not processed)
             
-            print(f"\n[{i+1}/{len(tracking_numbers)}] Processing: {tracking_number}")
+        Returns:
+            list: Tracking records with the order information inserted
+        """
+        tracking_data = []
+        failed = set()
+        for row in rows:
+            result = results[row.tracking_number]
+            if isinstance(result, Future):
+                if result.cancelled() or isinstance(result.exception(), RunCancelled):
+                    result = None
+                else:
+                    result = result.result()
             
-            # Fetch tracking data
-            event_data = fetch_tracking_data(tracking_number, self.config['ips_tracking_url'])
+            if result is None:
+                self.not_processed += 1
+                continue
             
+            event_data = result
             if event_data == 0:
-                self.miscellaneous.append(tracking_number)
+                if row.tracking_number not in failed:
+                    failed.add(row.tracking_number)
+                    self.miscellaneous.append(row.tracking_number)
                 continue
             
-            # Enhance location data with zip code if needed
-            try:
-                if len(event_data) > 2:
-                    location_field = event_data[2]
-                    # Try to get zip code information if it's a numeric zip code
-                    if isinstance(location_field, (int, str)):
-                        try:
-                            zip_code = int(location_field)
-                            zip_info = get_zip_codes(str(zip_code))
-                            if zip_info != 0:
-                                event_data[2] = zip_info
-                        except ValueError:
-                            # Not a zip code, keep original location
-                            pass
-            except (IndexError, ValueError) as e:
-                print(f"Warning: Could not enhance location data: {e}")
-            
-            # Add order information to the tracking data
-            record = list(event_data)
-            record.insert(3, order_ids[i] if i < len(order_ids) else "")
-            record.insert(4, first_names[i] if i < len(first_names) else "")
-            record.insert(5, last_names[i] if i < len(last_names) else "")
-            record.insert(6, tracking_number)
-            
-            # Handle empty extra information field
-            if len(record) > 10 and (not record[-1] or len(str(record[-1]).strip()) == 0):
-                record[-1] = "No information available"
-            
-            tracking_data.append(record)
+            tracking_data.append(self._order_record(row, event_data))
         
         return tracking_data
     
-    def run(self):
+    def _order_record(self, row, event_data):
         """
-        Execute the complete tracking process.
+        Builds the report record of one input row.
+        
+        Args:
+            row (InputRow): The input row
+            event_data (list): Tracking event data of its tracking number
+            
+        Returns:
+            list: Tracking record with the order information inserted
         """
-        print("=" * 60)
-        print("MedshipmentTrackingTool - Starting Tracking Process")
-        print("=" * 60)
-        print(f"Start Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        # Add order information to the tracking data
+        record = list(event_data)
+        record.insert(3, row.order_id)
+        record.insert(4, row.first_name)
+        record.insert(5, row.last_name)
+        record.insert(6, row.tracking_number)
         
-        # Process tracking numbers
-        tracking_data = self.process_tracking_numbers()
+        # Handle empty extra information field
+        if len(record) > 10 and (not record[-1] or len(str(record[-1]).strip()) == 0):
+            record[-1] = "No information available"
         
-        if not tracking_data:
-            print("\nNo tracking data was successfully retrieved.")
+        return record
+    
+    def _submit_fetch(self, engine, tracking_number, position):
+        """
+        Schedules _fetch_event on the engine and reports its completion as progress.
+        
+        Returns:
+            Future: The scheduled lookup
+        """
+        with self._progress_lock:
+            self._progress['total'] += 1
+        future = engine.submit(self._fetch_event, engine, tracking_number, position)
+        future.add_done_callback(lambda done: self._fetch_done(tracking_number, done))
+        return future
+    
+    def _fetch_done(self, tracking_number, future):
+        """Updates the progress counters when a lookup finishes."""
+        with self._progress_lock:
+            if future.cancelled() or isinstance(future.exception(), RunCancelled):
+                self._progress['total'] -= 1  # Never ran
+                return
+            self._progress['processed'] += 1
+            if future.exception() is not None:
+                self._progress['failed'] += 1
+            elif future.result() == 0:
+                self._progress['no_info'] += 1
+        self._report_progress(tracking_number)
+    
+    def _report_progress(self, tracking_number=""):
+        """Passes a RunProgress snapshot to progress_listener, if one is set."""
+        listener = self.progress_listener
+        if listener is None:
             return
+        with self._progress_lock:
+            progress = RunProgress(
+                stage=self._stage_name,
+                elapsed=time.monotonic() - self._run_started,
+                tracking_number=tracking_number,
+                **self._progress
+            )
+        try:
+            listener(progress)
+        except Exception as e:
+            logger.warning("Progress listener failed: %s", e)
+    
+    def _fetch_event(self, engine, tracking_number, position):
+        """
+        Fetches and enriches the latest event for one tracking number.
+        
+        Runs on a FetchEngine worker thread.
+        
+        Args:
+            engine (FetchEngine): Engine providing per-host request slots
+            tracking_number (str): The tracking number to look up
+            position (int/str): 1-based position in the input sheet, or a label
+            
+        Returns:
+            list: Tracking event data, or 0 if there is no information
+            
+        Raises:
+            TrackingFetchError: If the IPS site could not be reached
+            RunCancelled: If the run was cancelled before the lookup started
+        """
+        logger.info("[%s] Processing: %s", position, tracking_number,
+                    extra={"tracking_number": tracking_number})
+        
+        # Fetch tracking data, paced by the circuit breaker and rate limiter
+        ips_url = self.config['ips_tracking_url']
+        state, validators = self._previous_fetch(tracking_number)
+        self._pace_request()
+        history = [] if self.event_store else None
+        started = time.monotonic()
+        try:
+            with engine.host_slot(ips_url):
+                event_data = fetch_tracking_data(
+                    tracking_number, ips_url, self.session, raise_errors=True, history=history,
+                    validators=validators
+                )
+        except Exception:
+            self._request_failed(started)
+            raise
+        self._request_succeeded(started)
+        return self._finish_event(engine, tracking_number, event_data, state, validators, history)
+    
+    def _pace_request(self):
+        """
+        Waits until the circuit breaker and the rate limiter allow an IPS request.
+        
+        Raises:
+            RunCancelled: If the run was cancelled while waiting
+        """
+        if not self.circuit_breaker.wait_until_allowed(self._cancel_event):
+            raise RunCancelled()
+        self.rate_limiter.acquire()
+        if self._cancel_event.is_set():
+            # A probe that is not sent must be given back, or every other
+            # lookup would wait for its result forever
+            self.circuit_breaker.release_probe()
+            raise RunCancelled()
+    
+    def _previous_fetch(self, tracking_number):
+        """
+        Returns the stored state of an item and the validators for its next request.
+        
+        In record and replay modes the ETag and Last-Modified are left out, so
+        the recorded fixtures stay full pages instead of 304 responses.
+        
+        Returns:
+            tuple: (state dict or None, validators dict, or None without a state store)
+        """
+        if not self.state_store:
+            return None, None
+        state = self.state_store.get(tracking_number)
+        # Validators of the previous fetch make the request conditional
+        if state is not None and self.conditional_fetches:
+            validators = dict(state['validators'])
+            if not self.conditional_headers:
+                # Only the events table hash is compared, locally
+                validators['etag'] = validators['last_modified'] = None
+            return state, validators
+        return state, {}
+    
+    def _request_succeeded(self, started):
+        """Records a completed IPS request (started: its time.monotonic() start)."""
+        latency = time.monotonic() - started
+        self.ips_latency.observe(latency)
+        self.circuit_breaker.record_success()
+        self.rate_limiter.record_success(latency)
+    
+    def _request_failed(self, started):
+        """Records a failed IPS request (started: its time.monotonic() start)."""
+        self.ips_latency.observe(time.monotonic() - started)
+        self.fetch_results.inc(outcome="failure")
+        self.circuit_breaker.record_failure()
+        self.rate_limiter.record_failure()
+    
+    def _finish_event(self, engine, tracking_number, event_data, state, validators, history):
+        """
+        Completes a successful lookup: stores, enriches and journals its event.
+        
+        Args:
+            engine (FetchEngine): Engine providing per-host request slots
+            tracking_number (str): The tracking number that was looked up
+            event_data (list/int/str): Event data, 0 (no information) or NOT_MODIFIED
+            state (dict): Stored state of the item (see _previous_fetch)
+            validators (dict): Validators of the response, or None
+            history (list): Every event on the page, or None
+            
+        Returns:
+            list: Tracking event data, or 0 if there is no information
+        """
+        if history:
+            self.event_store.add_events(tracking_number, history)
         
-        # Write final data
-        print(f"\nWriting {len(tracking_data)} records to Final-Data.xlsx...")
-        self.excel_handler.write_final_data(tracking_data)
+        if event_data == 0:
+            self.fetch_results.inc(outcome="no_info")
+            return 0
+        self.fetch_results.inc(outcome="success")
+        
+        if event_data == NOT_MODIFIED:
+            # Unchanged page: the stored event (already enriched) still holds
+            self.unchanged_pages.inc()
+            event_data = state['event_data']
+        else:
+            self._enrich_location(engine, tracking_number, event_data)
+        
+        if self.state_store:
+            event_type = event_data[3] if len(event_data) > 3 else None
+            self.state_store.update(tracking_number, event_data,
+                                   self.excel_handler.event_mappings.get(event_type), validators)
+        if self.checkpoint:
+            self.checkpoint.record(tracking_number, event_data)
+        
+        return event_data
+    
+    def _enrich_location(self, engine, tracking_number, event_data):
+        """
+        Replaces a numeric location with its zip code information (in place).
+        
+        Args:
+            engine (FetchEngine): Engine providing per-host request slots
+            tracking_number (str): The tracking number the event belongs to
+            event_data (list): Tracking event data
+        """
+        try:
+            enrich_location(event_data, lambda zip_code: self._zip_location(engine, zip_code))
+        except (IndexError, ValueError) as e:
+            logger.warning("Could not enhance location data: %s", e,
+                           extra={"tracking_number": tracking_number})
+    
+    def _failed_fetches(self, results):
+        """
+        Waits for all pending fetches and collects the ones that failed.
+        
+        Args:
+            results (dict): Mapping of tracking number to Future or event data
+            
+        Returns:
+            list: Tracking numbers whose fetch raised TrackingFetchError
+        """
+        pending = [result for result in results.values() if isinstance(result, Future)]
+        while pending:
+            pending = wait(pending, timeout=0.5).not_done
+            if pending and self._cancel_event.is_set():
+                # Drop lookups that have not started; let running ones finish
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                break
+        return [
+            tracking_number for tracking_number, result in results.items()
+            if isinstance(result, Future) and not result.cancelled()
+            and isinstance(result.exception(), TrackingFetchError)
+        ]
+    
+    def _zip_location(self, engine, zip_code):
+        """
+        Looks up a zip code in the offline gazetteer, then the cache and the web.
+        
+        Args:
+            engine (FetchEngine): Engine providing per-host request slots
+            zip_code (int): The zip code to look up
+            
+        Returns:
+            str: Location information, or 0 if lookup fails
+        """
+        return locate_zip(zip_code, self.zip_gazetteer, self.zip_cache,
+                          lambda code: self._fetch_zip_info(engine, code))
+    
+    def _fetch_zip_info(self, engine, zip_code):
+        """
+        Looks up a zip code on the web (cache miss path).
+        
+        Args:
+            engine (FetchEngine): Engine providing per-host request slots
+            zip_code (str): The zip code to look up
+            
+        Returns:
+            str: Location information, or 0 if lookup fails
+        """
+        with engine.host_slot(self.config['zip_code_url']), self.zip_latency.time():
+            return get_zip_codes(zip_code, self.session, self.config['zip_code_url'])
+    
+    @contextmanager
+    def _stage(self, name):
+        """
+        Times one stage of the run and records it in the stage_duration_seconds gauge.
+        
+        Args:
+            name (str): Stage name used as the metric label
+        """
+        self._stage_name = name
+        self._report_progress()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.stage_seconds.set(round(duration, 4), stage=name)
+            logger.info("Stage %s finished in %.2fs", name, duration,
+                        extra={"stage": name, "duration_seconds": round(duration, 4)})
+    
+    def export_metrics(self, report_file=None):
+        """
+        Writes the run metrics next to the report.
+        
+        The format is chosen by the 'metrics_format' config key: "prometheus"
+        (text exposition format, default), "json", "both" or "none".
+        
+        Args:
+            report_file (str): Report the metrics belong to; without one the
+                               files are named after the current time
+            
+        Returns:
+            list: Paths of the written metrics files
+        """
+        metrics_format = self.config.get('metrics_format', 'prometheus')
+        if metrics_format == 'none':
+            return []
+        extensions = {'prometheus': ['.prom'], 'json': ['.json'], 'both': ['.prom', '.json']}
+        if metrics_format not in extensions:
+            raise ValueError(f"Unknown metrics_format: {metrics_format!r}")
+        
+        # Point-in-time values
+        items = self.metrics.gauge("items", "Tracking numbers of the last run by source")
+        items.set(self.reused_from_state, source="state_store")
+        items.set(self.resumed, source="checkpoint")
+        items.set(self.duplicate_rows, source="duplicate_row")
+        items.set(len(self.miscellaneous), source="failed_or_no_info")
+        items.set(self.not_processed, source="cancelled")
+        zip_lookups = self.metrics.gauge("zip_cache_lookups", "Zip code cache lookups by result")
+        zip_lookups.set(self.zip_cache.hits, result="hit")
+        zip_lookups.set(self.zip_cache.misses, result="miss")
+        self.metrics.gauge("zip_cache_hit_ratio", "Zip code cache hit ratio").set(
+            round(self.zip_cache.hit_rate(), 4))
+        if self.zip_gazetteer:
+            gazetteer_lookups = self.metrics.gauge("zip_gazetteer_lookups",
+                                                   "Offline zip gazetteer lookups by result")
+            gazetteer_lookups.set(self.zip_gazetteer.hits, result="hit")
+            gazetteer_lookups.set(self.zip_gazetteer.misses, result="miss")
+        self.metrics.gauge("ips_rate_limit_per_second", "Current IPS request rate limit").set(
+            round(self.rate_limiter.rate, 3))
+        
+        if report_file:
+            base = os.path.splitext(report_file)[0]
+        else:
+            base = os.path.join(self.config['items_dir'],
+                                f"Data{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        paths = [self.metrics.write(f"{base}-metrics{extension}")
+                 for extension in extensions[metrics_format]]
+        for path in paths:
+            logger.info("Metrics written to %s", path)
+        return paths
+    
+    def _run_stages(self, resume=False):
+        """
+        Fetches every item, then writes, categorizes and reports the records in turn.
+        
+        Args:
+            resume (bool): Continue an interrupted run from the checkpoint journal
+            
+        Returns:
+            tuple: (number of records, ShipmentSummary, report path), or
+                   (0, None, None) if no data was retrieved
+        """
+        with self._stage("fetch"):
+            tracking_data = self.process_tracking_numbers(resume=resume)
+        if self.cancelled:
+            logger.warning("Run cancelled: %d rows not processed, writing a partial report",
+                           self.not_processed)
+        
+        if not tracking_data:
+            return 0, None, None
+        
+        # Write final data (optional output, not needed for the report)
+        if self.config.get('write_final_data', True):
+            logger.info("Writing %d records to Final-Data.xlsx...", len(tracking_data))
+            with self._stage("write_final_data"):
+                self.excel_handler.write_final_data(tracking_data)
         
         # Categorize shipments
-        print("\nCategorizing shipments...")
-        categories = self.excel_handler.categorize_shipments()
+        logger.info("Categorizing shipments...")
+        with self._stage("categorize"):
+            shipments = self.excel_handler.summarize_shipments(tracking_data)
         
         # Generate categorized report
-        print("Generating categorized report...")
-        report_file = self.excel_handler.generate_categorized_report(categories)
-        
-        # Print summary
-        print("\n" + "=" * 60)
-        print("TRACKING SUMMARY")
-        print("=" * 60)
-        print(f"Total Processed: {len(tracking_data)}")
-        print(f"Delivered: {len(categories.get('Delivered', []))}")
-        print(f"Booked: {len(categories.get('Booked', []))}")
-        print(f"In Transit: {len(categories.get('InTransit', []))}")
-        print(f"Inbound: {len(categories.get('InBound', []))}")
-        print(f"Outbound: {len(categories.get('OutBound', []))}")
-        print(f"Notice Left: {len(categories.get('NoticeLeft', []))}")
-        print(f"Stuck: {len(categories.get('Stuck', []))}")
-        print(f"Returned: {len(categories.get('Returned', []))}")
-        print(f"Failed/No Info: {len(self.miscellaneous)}")
-        print("=" * 60)
-        print(f"\nReport generated: {report_file}")
-        print(f"End Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-
-def main():
+        logger.info("Generating categorized report...")
+        with self._stage("report"):
+            report_file = self.excel_handler.generate_categorized_report(
+                shipments.categories, shipments)
+        return len(tracking_data), shipments, report_file
+    
+    def run(self, resume=False):
+        """
+        Execute the complete tracking process.
+        
+        With the 'streaming_pipeline' config key set, the run goes through
+        a TrackingPipeline instead of stage by stage (see src/pipeline.py).
+        
+        Args:
+            resume (bool): Continue an interrupted run from the checkpoint journal
+            
+        Returns:
+            str: Path of the categorized report, or None if no data was retrieved
+        """
+        self.reset_run_state()
+        logger.info("=" * 60)
+        logger.info("MedshipmentTrackingTool - Starting Tracking Process")
+        logger.info("=" * 60)
+        
+        # Process tracking numbers
+        if self.config.get('streaming_pipeline', False) and self.supports_streaming:
+            # Imported here: the pipeline builds on this module
+            from src.pipeline import TrackingPipeline
+            record_count, shipments, report_file = TrackingPipeline(self).run(resume=resume)
+        else:
+            record_count, shipments, report_file = self._run_stages(resume=resume)
+        
+        if not record_count:
+            logger.warning("No tracking data was successfully retrieved.")
+            self.export_metrics()
+            self._stage_name = "done"
+            self._report_progress()
+            return None
+        
+        # The run completed, so there is nothing left to resume; a cancelled
+        # run keeps its journal for --resume
+        if not self.cancelled:
+            self.checkpoint.reset()
+        
+        records = self.metrics.gauge("records", "Report records of the last run by category")
+        for category, count in shipments.counts.items():
+            records.set(count, category=category)
+        self.export_metrics(report_file)
+        
+        # Log summary
+        summary = [
+            ("Total Processed", record_count),
+            ("Delivered", shipments.counts.get('Delivered', 0)),
+            ("Booked", shipments.counts.get('Booked', 0)),
+            ("In Transit", shipments.counts.get('InTransit', 0)),
+            ("Inbound", shipments.counts.get('InBound', 0)),
+            ("Outbound", shipments.counts.get('OutBound', 0)),
+            ("Notice Left", shipments.counts.get('NoticeLeft', 0)),
+            ("Stuck", shipments.counts.get('Stuck', 0)),
+            ("Returned", shipments.counts.get('Returned', 0)),
+            ("Failed/No Info", len(self.miscellaneous)),
+            ("Reused From Previous Runs", self.reused_from_state),
+            ("Duplicate Rows (fetched once)", self.duplicate_rows),
+            ("Unchanged Pages (not parsed)", self.unchanged_pages.value()),
+        ]
+        if resume:
+            summary.append(("Resumed From Checkpoint", self.resumed))
+        if self.cancelled:
+            summary.append(("Not Processed (cancelled)", self.not_processed))
+        logger.info("=" * 60)
+        logger.info("TRACKING SUMMARY")
+        logger.info("=" * 60)
+        for label, value in summary:
+            logger.info("%s: %s", label, value)
+        logger.info("Zip Cache: %d hits, %d misses (%.0f%% hit rate)",
+                    self.zip_cache.hits, self.zip_cache.misses, self.zip_cache.hit_rate() * 100)
+        if self.zip_gazetteer:
+            logger.info("Zip Gazetteer: %d found, %d not in the index",
+                        self.zip_gazetteer.hits, self.zip_gazetteer.misses)
+        logger.info("=" * 60)
+        logger.info("Report generated: %s", report_file)
+        
+        self._stage_name = "done"
+        self._report_progress()
+        return report_file
+
+
+def main(argv=None):
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Track shipments listed in the input sheet.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run, fetching only items not in the checkpoint journal"
+    )
+    parser.add_argument(
+        "--inputs",
+        nargs="+",
+        metavar="PATH",
+        help="input workbooks or directories of workbooks, tracked by a pool of worker processes "
+             "into one report (default: the config 'input_file')"
+    )
+    parser.add_argument("--workers", type=int, help="worker processes for --inputs (default: config 'shard_workers')")
+    parser.add_argument("--shard-size", type=int, help="tracking numbers per shard (default: config 'shard_size')")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="stream rows through the reader/fetcher/parser/enricher/writer pipeline "
+             "(default: config 'streaming_pipeline')"
+    )
+    args = parser.parse_args(argv)
+    
     try:
-        tracker = ShipmentTracker()
-        tracker.run()
+        if args.inputs:
+            # Imported here: the sharded tracker builds on this module
+            from src.sharded_tracker import ShardedTracker
+            tracker = ShardedTracker(args.inputs, workers=args.workers, shard_size=args.shard_size)
+        else:
+            tracker = ShipmentTracker(overrides={'streaming_pipeline': True} if args.pipeline else None)
+        configure_logging(tracker.config.get('log_level', 'INFO'),
+                          tracker.config.get('log_format', 'text'))
+        # Never scrape concurrently with a scheduled run
+        with RunLock(tracker.config.get('run_lock_file',
+                                        os.path.join(tracker.config['output_dir'], 'tracker.lock'))):
+            tracker.run(resume=args.resume)
+    except RunLockBusy as e:
+        logger.error("%s; try again when it has finished.", e)
+        sys.exit(1)
     except KeyboardInterrupt:
-        print("\n\nProcess interrupted by user.")
+        logger.warning("Process interrupted by user.")
         sys.exit(1)
     except Exception as e:
-        print(f"\nError: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error: %s", e)
         sys.exit(1)
 
 
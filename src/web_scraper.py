@@ -6,107 +6,255 @@ and zip code lookup from external sources.
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
 import json
 import os
+import logging
 
+from src.ips_parser import parse_tracking_page, parse_zip_page, event_to_row, events_fragment_hash
+from src.http_replay import RecordingAdapter, ReplayAdapter
 
-def get_zip_codes(zip_code):
+logger = logging.getLogger(__name__)
+
+# Default base URL for zip code lookups (config key 'zip_code_url')
+ZIP_CODE_URL = "https://www.zip-codes.com/zip-code"
+
+# Returned by fetch_tracking_data when the page has not changed since the
+# fetch its validators came from
+NOT_MODIFIED = "not-modified"
+
+
+class TrackingFetchError(Exception):
+    """Raised when the IPS site could not be reached or returned an error status."""
+
+
+def create_session(pool_size=10, max_retries=3, backoff_factor=0.5, mode="live", fixture_dir=None):
+    """
+    Creates a shared HTTP session with connection pooling and retries.
+    
+    Connections are kept alive and reused across lookups. Connection resets,
+    read errors and 5xx responses are retried with exponential backoff
+    (backoff_factor * 2 ** (attempt - 1) seconds between attempts).
+    Compressed responses are accepted: gzip and deflate, plus brotli when
+    the optional brotli package is installed.
+    
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        max_retries (int): Maximum number of retries per request
+        backoff_factor (float): Base delay in seconds for the backoff
+        mode (str): "live", "record" (live, saving every response to
+                    fixture_dir) or "replay" (answer only from fixture_dir)
+        fixture_dir (str): Fixture directory for record/replay modes
+        
+    Returns:
+        requests.Session: Configured session object
+    """
+    if mode not in ("live", "record", "replay"):
+        raise ValueError(f"Unknown HTTP mode: {mode}")
+    if mode != "live" and not fixture_dir:
+        raise ValueError(f"HTTP mode '{mode}' needs a fixture directory")
+    
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = make_headers(accept_encoding=True)['accept-encoding']
+    if mode == "replay":
+        adapter = ReplayAdapter(fixture_dir)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter_options = dict(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+    if mode == "record":
+        adapter = RecordingAdapter(fixture_dir, **adapter_options)
+    else:
+        adapter = HTTPAdapter(**adapter_options)
+    
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_zip_codes(zip_code, session=None, zip_url=ZIP_CODE_URL):
     """
     Fetches location information for a given zip code.
     
     Args:
         zip_code (str/int): The zip code to look up
+        session (requests.Session): Optional shared session (see create_session)
+        zip_url (str): Base URL for zip code pages
         
     Returns:
         str: Comma-separated location information, or 0 if lookup fails
     """
+    http = session or requests
     try:
-        url = f"https://www.zip-codes.com/zip-code/{zip_code}/zip-code-{zip_code}.asp"
-        response = requests.get(url, timeout=10)
-        data = BeautifulSoup(response.text, "lxml")
+        url = f"{zip_url.rstrip('/')}/{zip_code}/zip-code-{zip_code}.asp"
+        response = http.get(url, timeout=10)
     except Exception as e:
-        print(f"Error fetching zip code data: {e}")
+        logger.warning("Error fetching zip code data: %s", e, extra={"zip_code": zip_code})
         return 0
     
     try:
-        out_set = data.find("h1")
-        if not out_set:
-            return 0
-        
-        # Extract and format location data
-        location_parts = out_set.text.encode('ascii', 'ignore').decode('ascii').split(",")
-        location_parts.insert(3, location_parts[0])
-        location_parts.pop(0)
-        return ",".join(location_parts)
+        return parse_zip_page(response.content)
     except Exception as e:
-        print(f"Error parsing zip code data: {e}")
+        logger.warning("Error parsing zip code data: %s", e, extra={"zip_code": zip_code})
         return 0
 
 
-def fetch_tracking_data(tracking_number, ips_url):
+def fetch_tracking_data(tracking_number, ips_url, session=None, raise_errors=False, history=None,
+                        validators=None):
     """
     Fetches tracking information for a given tracking number from IPS website.
     
     Args:
         tracking_number (str): The tracking number to look up
         ips_url (str): Base URL for IPS tracking
+        session (requests.Session): Optional shared session (see create_session)
+        raise_errors (bool): Raise TrackingFetchError for network errors and
+                             non-200 responses instead of returning 0, so the
+                             caller can tell them apart from "no information"
+        history (list): Optional list that receives every event on the page
+                        (see ips_parser.parse_tracking_page), not just the latest one
+        validators (dict): Optional 'etag', 'last_modified' and 'content_hash'
+                           of the previous fetch of this item. The request is
+                           made conditional on them, and the dict is updated
+                           with the values of this response.
         
     Returns:
-        list: List of tracking event data, or 0 if fetch fails
+        list: List of tracking event data, or 0 if fetch fails, or
+              NOT_MODIFIED if the server answered 304 or the events table
+              is unchanged since the previous fetch (the page is not parsed)
     """
     try:
-        # Construct the tracking URL
-        tracking_url = f"{ips_url}?itemid={tracking_number}&Submit=Submit"
-        response = requests.get(tracking_url, timeout=15)
-        
-        if response.status_code != 200:
-            print(f"Tracking Number {tracking_number}: Unable to hit the link (Status: {response.status_code})")
-            return 0
+        content = download_tracking_page(tracking_number, ips_url, session, validators)
+        if content == NOT_MODIFIED:
+            return NOT_MODIFIED
+        return read_tracking_page(tracking_number, content, history)
+    except TrackingFetchError:
+        if raise_errors:
+            raise
+        return 0
+    except Exception as e:
+        logger.exception("Tracking Number %s: Unexpected error - %s", tracking_number, e,
+                         extra={"tracking_number": tracking_number})
+        return 0
+
+
+def download_tracking_page(tracking_number, ips_url, session=None, validators=None):
+    """
+    Downloads the IPS item events page of a tracking number (without parsing it).
+    
+    Args:
+        tracking_number (str): The tracking number to look up
+        ips_url (str): Base URL for IPS tracking
+        session (requests.Session): Optional shared session (see create_session)
+        validators (dict): Optional validators of the previous fetch (see
+                           fetch_tracking_data), updated in place
         
-        data = BeautifulSoup(response.text, "lxml")
+    Returns:
+        bytes: Page content, or NOT_MODIFIED if the server answered 304 or
+               the events table is unchanged since the previous fetch
         
-        # Try to find tracking data in the expected format
-        try:
-            out_set = data.find('td', class_="tabproperty")
-            if not out_set or len(out_set.contents) < 3:
-                raise ValueError("Tracking data not found in expected format")
-            
-            # Extract tracking events
-            tracking_rows = out_set.findAll("tr")
-            if not tracking_rows:
-                raise ValueError("No tracking rows found")
-            
-            # Get the last (most recent) tracking event
-            latest_event = tracking_rows[-1]
-            event_text = latest_event.text
-            event_data = event_text.encode('ascii', 'ignore').decode('ascii').split("\n")
-            
-            # Clean up the data
-            event_data.pop(0)  # Remove header
-            if event_data:
-                event_data.pop()  # Remove empty trailing element
-            if event_data:
-                event_data.pop()  # Remove another trailing element
-            
-            print(f"Tracking Number {tracking_number}: Successfully fetched data")
-            return event_data
-            
-        except (AttributeError, IndexError, ValueError) as e:
-            # Try alternative parsing method
-            paragraphs = data.findAll("p")
-            if len(paragraphs) > 1:
-                error_message = paragraphs[1].text
-                print(f"Tracking Number {tracking_number}: Hit link, but NO INFORMATION Available. "
-                      f"Please check the ITEM MANUALLY. Message: {error_message}")
-            else:
-                print(f"Tracking Number {tracking_number}: Hit link, but NO INFORMATION Available. "
-                      f"Please check the ITEM MANUALLY")
-            return 0
-            
+    Raises:
+        TrackingFetchError: For network errors and non-200 responses
+    """
+    http = session or requests
+    try:
+        # Construct the tracking URL
+        tracking_url = f"{ips_url}?itemid={tracking_number}&Submit=Submit"
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        response = http.get(tracking_url, headers=headers, timeout=15)
     except requests.RequestException as e:
-        print(f"Tracking Number {tracking_number}: Network error - {e}")
-        return 0
+        logger.warning("Tracking Number %s: Network error - %s", tracking_number, e,
+                       extra={"tracking_number": tracking_number})
+        raise TrackingFetchError(str(e)) from e
+    
+    if response.status_code == 304 and headers:
+        validators['etag'] = response.headers.get('ETag', validators.get('etag'))
+        logger.info("Tracking Number %s: Not modified since the last fetch", tracking_number,
+                    extra={"tracking_number": tracking_number})
+        return NOT_MODIFIED
+    
+    if response.status_code != 200:
+        logger.warning("Tracking Number %s: Unable to hit the link (Status: %s)",
+                       tracking_number, response.status_code,
+                       extra={"tracking_number": tracking_number, "status": response.status_code})
+        raise TrackingFetchError(f"HTTP status {response.status_code}")
+    
+    if validators is not None:
+        content_hash = events_fragment_hash(response.content)
+        unchanged = content_hash is not None and content_hash == validators.get('content_hash')
+        validators.update(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            content_hash=content_hash
+        )
+        if unchanged:
+            logger.info("Tracking Number %s: Events unchanged since the last fetch", tracking_number,
+                        extra={"tracking_number": tracking_number})
+            return NOT_MODIFIED
+    
+    return response.content
+
+
+def read_tracking_page(tracking_number, content, history=None):
+    """
+    Extracts the latest event from a downloaded IPS item events page.
+    
+    Args:
+        tracking_number (str): The tracking number the page belongs to
+        content (bytes): Page content from download_tracking_page
+        history (list): Optional list that receives every event on the page
+        
+    Returns:
+        list: List of tracking event data, or 0 if the page has no information
+    """
+    try:
+        page = parse_tracking_page(content)
     except Exception as e:
-        print(f"Tracking Number {tracking_number}: Unexpected error - {e}")
+        logger.exception("Tracking Number %s: Unexpected error - %s", tracking_number, e,
+                         extra={"tracking_number": tracking_number})
+        return 0
+    events = page['events']
+    
+    if not events:
+        if page['message']:
+            logger.warning("Tracking Number %s: Hit link, but NO INFORMATION Available. "
+                           "Please check the ITEM MANUALLY. Message: %s",
+                           tracking_number, page['message'],
+                           extra={"tracking_number": tracking_number})
+        else:
+            logger.warning("Tracking Number %s: Hit link, but NO INFORMATION Available. "
+                           "Please check the ITEM MANUALLY",
+                           tracking_number, extra={"tracking_number": tracking_number})
         return 0
+    
+    if history is not None:
+        history.extend(events)
+    
+    # Get the last (most recent) tracking event
+    event_data = event_to_row(events[-1])
+    
+    logger.info("Tracking Number %s: Successfully fetched data", tracking_number,
+                extra={"tracking_number": tracking_number})
+    return event_data
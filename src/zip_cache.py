@@ -0,0 +1,145 @@
+"""
+Zip Code Cache Module for MedshipmentTrackingTool
+
+This module caches zip code lookups on disk (SQLite) with an in-memory LRU
+in front of it, so repeated ZIPs in a batch are only fetched once.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a write waits while another process (e.g. a shard worker) holds the lock
+BUSY_TIMEOUT = 30
+
+
+class ZipCodeCache:
+    """Two-level (memory LRU + SQLite) cache for zip code lookups."""
+
+    def __init__(self, db_path, ttl_seconds=30 * 24 * 3600,
+                 negative_ttl_seconds=3600, memory_size=1024):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path (str): Path of the SQLite cache file
+            ttl_seconds (int): Lifetime of successful lookups
+            negative_ttl_seconds (int): Lifetime of failed lookups
+            memory_size (int): Maximum entries kept in the in-memory LRU
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.memory_size = max(1, int(memory_size))
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()  # zip_code -> (value, expires_at)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        # Sharded runs open the file from several processes at once
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS zip_codes ("
+            "zip_code TEXT PRIMARY KEY, "
+            "location TEXT, "
+            "expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, zip_code):
+        """
+        Looks up a zip code in the cache.
+
+        Args:
+            zip_code (str): The zip code to look up
+
+        Returns:
+            str: Cached location, 0 for a cached failed lookup,
+                 or None if the zip code is not cached
+        """
+        zip_code = str(zip_code)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(zip_code)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(zip_code)
+                self.hits += 1
+                return entry[0]
+
+            row = self._conn.execute(
+                "SELECT location, expires_at FROM zip_codes WHERE zip_code = ?",
+                (zip_code,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._memory.pop(zip_code, None)
+                self.misses += 1
+                return None
+
+            value = row[0] if row[0] is not None else 0
+            self._remember(zip_code, value, row[1])
+            self.hits += 1
+            return value
+
+    def put(self, zip_code, location):
+        """
+        Stores a lookup result.
+
+        Args:
+            zip_code (str): The zip code that was looked up
+            location (str/int): Location string, or 0 for a failed lookup
+        """
+        zip_code = str(zip_code)
+        ttl = self.negative_ttl_seconds if location == 0 else self.ttl_seconds
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(zip_code, location, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO zip_codes (zip_code, location, expires_at) "
+                "VALUES (?, ?, ?)",
+                (zip_code, None if location == 0 else location, expires_at)
+            )
+            self._conn.commit()
+
+    def lookup(self, zip_code, fetch):
+        """
+        Returns the cached location, calling fetch(zip_code) on a miss.
+
+        Args:
+            zip_code (str): The zip code to look up
+            fetch (callable): Function performing the real lookup
+
+        Returns:
+            str: Location information, or 0 if lookup fails
+        """
+        value = self.get(zip_code)
+        if value is None:
+            value = fetch(zip_code)
+            self.put(zip_code, value)
+        return value
+
+    def hit_rate(self):
+        """
+        Returns:
+            float: Fraction of lookups served from the cache
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, zip_code, value, expires_at):
+        """Adds an entry to the in-memory LRU, evicting the oldest if full."""
+        self._memory[zip_code] = (value, expires_at)
+        self._memory.move_to_end(zip_code)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
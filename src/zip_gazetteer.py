@@ -0,0 +1,306 @@
+"""
+Zip Gazetteer Module for MedshipmentTrackingTool
+
+This module resolves zip codes to locations offline, from a local index
+built once from a zip code dataset file. Tracking runs look zip codes up
+here first and only go to the web for zip codes the index does not know,
+so location enrichment no longer waits on zip-codes.com for every item.
+
+The index is a read-only SQLite file with one row per zip code, keyed on the
+zip code and memory-mapped when opened. It is opened on the first lookup;
+every lookup is a single primary key probe. Locations are formatted like
+the zip-codes.com results, so reports look the same whichever source a
+location came from.
+
+Accepted datasets:
+    GeoNames postal code dumps (e.g. US.txt from download.geonames.org/export/zip):
+        tab-separated, without a header
+    CSV files with a header row naming the zip code, city and state columns
+        (e.g. zip,city,state or postal_code,place_name,state_code)
+
+Usage:
+    python src/zip_gazetteer.py --build data/US.txt
+    python src/zip_gazetteer.py --lookup 10001
+"""
+
+import os
+import sys
+import csv
+import json
+import logging
+import sqlite3
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Columns of a GeoNames postal code dump used for the index
+GEONAMES_ZIP_COLUMN = 1
+GEONAMES_CITY_COLUMN = 2
+GEONAMES_STATE_COLUMN = 4
+
+# Accepted header names of the CSV dataset columns, in order of preference
+CSV_ZIP_HEADERS = ("zip", "zip_code", "zipcode", "postal_code", "postcode")
+CSV_CITY_HEADERS = ("city", "primary_city", "place_name", "place")
+CSV_STATE_HEADERS = ("state", "state_code", "admin_code1", "state_id")
+
+# Rows inserted per transaction while building the index
+BUILD_BATCH_SIZE = 5000
+
+
+def normalize_zip(zip_code):
+    """
+    Returns the five-digit form of a zip code.
+
+    Numeric locations reach the tracker as integers, which drops the leading
+    zeros of zip codes such as 02134.
+
+    Args:
+        zip_code (str/int): Zip code
+
+    Returns:
+        str: Five-digit zip code, or None if it is not numeric
+    """
+    text = str(zip_code).strip()
+    if not text.isdigit() or len(text) > 5:
+        return None
+    return text.zfill(5)
+
+
+def format_location(zip_code, city, state):
+    """
+    Formats a location like the zip-codes.com results (see ips_parser.parse_zip_page).
+
+    Args:
+        zip_code (str): Five-digit zip code
+        city (str): City name
+        state (str): State abbreviation
+
+    Returns:
+        str: e.g. " New York, NY,ZIP Code 10001"
+    """
+    return f" {city}, {state},ZIP Code {zip_code}"
+
+
+def _read_geonames(path):
+    """Yields (zip code, city, state) from a GeoNames postal code dump."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for values in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if len(values) > GEONAMES_STATE_COLUMN:
+                yield (values[GEONAMES_ZIP_COLUMN], values[GEONAMES_CITY_COLUMN],
+                       values[GEONAMES_STATE_COLUMN])
+
+
+def _read_csv(path):
+    """Yields (zip code, city, state) from a CSV dataset with a header row."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        headers = [header.strip().lower() for header in next(reader, [])]
+
+        def column(names):
+            for name in names:
+                if name in headers:
+                    return headers.index(name)
+            raise ValueError(f"{path}: no column named {' or '.join(names)}")
+
+        columns = column(CSV_ZIP_HEADERS), column(CSV_CITY_HEADERS), column(CSV_STATE_HEADERS)
+        for values in reader:
+            if len(values) > max(columns):
+                yield tuple(values[index] for index in columns)
+
+
+def build_index(source_path, index_path):
+    """
+    Builds the zip code index from a dataset file.
+
+    The index is written to a temporary file next to its final location and
+    moved into place when complete, so a running lookup never sees a
+    half-built index. Every build has its own temporary file, so shard
+    workers that build the index at the same time do not overwrite each other.
+
+    Args:
+        source_path (str): GeoNames dump (.txt) or CSV dataset (.csv)
+        index_path (str): Destination SQLite file
+
+    Returns:
+        int: Number of zip codes in the index
+    """
+    rows = _read_csv(source_path) if source_path.lower().endswith('.csv') else _read_geonames(source_path)
+
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(index_path)}.", suffix=".tmp",
+                                     dir=directory or None)
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute(
+                "CREATE TABLE zip_codes (zip_code TEXT PRIMARY KEY, location TEXT NOT NULL) "
+                "WITHOUT ROWID"
+            )
+            batch = []
+            for zip_code, city, state in rows:
+                zip_code = normalize_zip(zip_code)
+                city, state = city.strip(), state.strip()
+                if zip_code is None or not city:
+                    continue
+                batch.append((zip_code, format_location(zip_code, city, state)))
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    # The first row of a zip code wins, as in the source file
+                    conn.executemany("INSERT OR IGNORE INTO zip_codes VALUES (?, ?)", batch)
+                    batch = []
+            conn.executemany("INSERT OR IGNORE INTO zip_codes VALUES (?, ?)", batch)
+            conn.commit()
+            count = conn.execute("SELECT COUNT(*) FROM zip_codes").fetchone()[0]
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.replace(temp_path, index_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)  # Only left over by a failed build
+
+    logger.info("Zip gazetteer built from %s: %d zip codes in %s", source_path, count, index_path)
+    return count
+
+
+class ZipGazetteer:
+    """Offline zip code -> location index, opened on first use."""
+
+    def __init__(self, index_path, source_path=None):
+        """
+        Initialize the gazetteer (the index is opened by the first lookup).
+
+        Args:
+            index_path (str): SQLite index file
+            source_path (str): Optional dataset file; the index is (re)built
+                               from it when missing or older than the dataset
+        """
+        self.index_path = index_path
+        self.source_path = source_path
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, zip_code):
+        """
+        Looks up a zip code.
+
+        Args:
+            zip_code (str/int): The zip code to look up
+
+        Returns:
+            str: Location information, or None if the zip code is not in
+                 the index (or there is no index)
+        """
+        zip_code = normalize_zip(zip_code)
+        with self._lock:
+            if not self._loaded:
+                self._open()
+            row = None
+            if self._conn is not None and zip_code is not None:
+                row = self._conn.execute(
+                    "SELECT location FROM zip_codes WHERE zip_code = ?", (zip_code,)
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def close(self):
+        """Closes the index."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._loaded = False
+
+    def _open(self):
+        """Opens the index read-only and memory-mapped, building it first if needed."""
+        self._loaded = True
+        if self.source_path and os.path.exists(self.source_path) and (
+                not os.path.exists(self.index_path)
+                or os.path.getmtime(self.index_path) < os.path.getmtime(self.source_path)):
+            try:
+                build_index(self.source_path, self.index_path)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logger.warning("Could not build the zip gazetteer from %s: %s", self.source_path, e)
+
+        if not os.path.exists(self.index_path):
+            logger.info("No zip gazetteer at %s; zip codes are looked up on the web", self.index_path)
+            return
+        try:
+            conn = sqlite3.connect(f"{Path(self.index_path).resolve().as_uri()}?mode=ro",
+                                   uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {os.path.getsize(self.index_path)}")
+            count = conn.execute("SELECT COUNT(*) FROM zip_codes").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning("Could not open the zip gazetteer %s: %s", self.index_path, e)
+            return
+        self._conn = conn
+        logger.info("Zip gazetteer loaded: %d zip codes", count)
+
+
+def open_gazetteer(config):
+    """
+    Creates the gazetteer configured by 'zip_gazetteer_file' and 'zip_gazetteer_source'.
+
+    Args:
+        config (dict): Loaded configuration
+
+    Returns:
+        ZipGazetteer: The gazetteer, or None if 'zip_gazetteer_file' is empty
+    """
+    index_path = config.get('zip_gazetteer_file', 'data/zip-gazetteer.sqlite3')
+    if not index_path:
+        return None
+    return ZipGazetteer(index_path, config.get('zip_gazetteer_source') or None)
+
+
+def main(argv=None):
+    """Command line entry point: builds the index or looks zip codes up."""
+    parser = argparse.ArgumentParser(description="Offline zip code gazetteer.")
+    parser.add_argument("--config", default="config/config.json", help="configuration file")
+    actions = parser.add_mutually_exclusive_group(required=True)
+    actions.add_argument("--build", metavar="DATASET",
+                         help="build the index from a GeoNames dump (.txt) or a CSV dataset (.csv)")
+    actions.add_argument("--lookup", nargs="+", metavar="ZIP", help="look zip codes up in the index")
+    args = parser.parse_args(argv)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    configure_logging(config.get('log_level', 'INFO'), config.get('log_format', 'text'))
+    index_path = config.get('zip_gazetteer_file') or 'data/zip-gazetteer.sqlite3'
+
+    if args.build:
+        count = build_index(args.build, index_path)
+        print(f"{count} zip codes written to {index_path}")
+        return 0
+
+    gazetteer = ZipGazetteer(index_path)
+    try:
+        for zip_code in args.lookup:
+            print(f"{zip_code}: {gazetteer.get(zip_code) or 'not found'}")
+    finally:
+        gazetteer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
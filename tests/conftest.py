@@ -0,0 +1,68 @@
+"""Shared fixtures of the MedshipmentTrackingTool tests."""
+
+import os
+import sys
+import json
+
+import pytest
+
+# Add the repository root to the path, as the entry modules do
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.ips_standin import start_server
+
+
+@pytest.fixture
+def standin():
+    """Local stand-in for the IPS and zip code sites (see src/ips_standin.py)."""
+    server = start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_config(tmp_path, standin):
+    """
+    Returns a function writing a tracker config whose files live in tmp_path.
+
+    The function takes the number of input rows and config overrides, and
+    returns the path of the config file. Lookups go to the stand-in, without
+    throttling or HTTP-level retries.
+    """
+    base_url = f"http://127.0.0.1:{standin.server_address[1]}"
+
+    def make(rows=10, **overrides):
+        with open(os.path.join(REPO_ROOT, "config", "config.json"), "r") as f:
+            config = json.load(f)
+        for key, value in list(config.items()):
+            if isinstance(value, str) and value.startswith("output/"):
+                config[key] = str(tmp_path / "output" / value[len("output/"):])
+
+        input_file = tmp_path / "Input-Data.csv"
+        with open(input_file, "w") as f:
+            f.write("Order ID,First Name,Last Name,Tracking Number\n")
+            for i in range(rows):
+                f.write(f"ORD{i:05d},First{i},Last{i},EE{i:09d}IN\n")
+
+        config.update({
+            "input_file": str(input_file),
+            "output_dir": str(tmp_path / "output"),
+            "items_dir": str(tmp_path / "output" / "Items"),
+            "ips_tracking_url": f"{base_url}/ipswebtracking/IPSWeb_item_events.aspx",
+            "zip_code_url": f"{base_url}/zip-code",
+            "zip_gazetteer_file": "",
+            "http_mode": "live",
+            "http_max_retries": 0,
+            "ips_initial_rate": 1000.0,
+            "ips_max_rate": 1000.0,
+            "metrics_format": "none"
+        })
+        config.update(overrides)
+        config_path = tmp_path / "config.json"
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+        return str(config_path)
+
+    return make
@@ -0,0 +1,54 @@
+"""Tests of the categorization engines."""
+
+import datetime
+
+import pytest
+
+from src.categorizer import DataFrameCategorizer, PythonCategorizer
+from src.excel_handler import EVENT_MAPPINGS
+
+NOW = datetime.datetime(2024, 4, 1, 12, 0)
+
+
+def record(time_text, country, event_type):
+    """Returns a tracking record (Final-Data.xlsx layout)."""
+    return [time_text, country, "Office", "", "", "", "", event_type, "", ""]
+
+
+RECORDS = [
+    record("3/29/2024 1:22:00 PM", "India", "Deliver item (Inb)"),
+    record("3/30/2024 9:05 AM", "India", "Deliver item (Inb)"),
+    record("29-03-2024 13:22:10", "", "Insert item into bag (Otb)"),
+    record("13/29/2024 1:22:00 PM", "Nepal", "Send item to customs (Inb)"),  # Malformed date
+    record("yesterday", "Nepal", "Deliver item (Inb)"),  # Malformed date
+    record(None, None, "Record item customs information (Inb)"),
+    record("3/28/2024 8:00:00 AM", "India", "Dispatch item (Otb)"),  # Not mapped
+    record("3/28/2024 8:00:00 AM", "India", None),
+    ["3/27/2024 7:00:00 AM", "India"],  # No event type column
+]
+
+
+@pytest.mark.parametrize("tracking_data", [
+    RECORDS,
+    [],
+    [record("3/28/2024 8:00:00 AM", "India", "Dispatch item (Otb)")] * 3,
+    [record("yesterday", "India", "Deliver item (Inb)")],
+], ids=["mixed", "empty", "all-unmapped", "no-valid-dates"])
+def test_engines_agree(tracking_data):
+    pytest.importorskip("pandas")
+    expected = PythonCategorizer(EVENT_MAPPINGS).categorize(tracking_data, NOW)
+    summary = DataFrameCategorizer(EVENT_MAPPINGS).categorize(tracking_data, NOW)
+    assert summary.categories == expected.categories
+    assert summary.counts == expected.counts
+    assert summary.by_country == expected.by_country
+    assert summary.event_age == expected.event_age
+
+
+def test_categorize_skips_unmapped_and_unparseable():
+    summary = PythonCategorizer(EVENT_MAPPINGS).categorize(RECORDS, NOW)
+    assert summary.counts['Delivered'] == 3
+    assert sum(summary.counts.values()) == 6
+    assert summary.by_country['Unknown'] == {'InTransit': 1, 'Stuck': 1}
+    assert summary.event_age['Delivered']['items'] == 2
+    assert summary.event_age['Delivered']['newest'] == datetime.datetime(2024, 3, 30, 9, 5)
+    assert 'Stuck' not in summary.event_age
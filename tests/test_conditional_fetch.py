@@ -0,0 +1,93 @@
+"""Tests of conditional re-polls (ETag/Last-Modified and events table hash)."""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import REPO_ROOT
+from src.tracker import ShipmentTracker
+from src.web_scraper import create_session, download_tracking_page, NOT_MODIFIED
+
+with open(os.path.join(REPO_ROOT, "benchmarks", "fixtures", "ips_item_events.html"), "rb") as f:
+    PAGE = f.read()
+ETAG = '"v1"'
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serves the fixture page with an ETag and answers 304 when it matches."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.conditional_headers.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+
+@pytest.fixture
+def etag_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    server.conditional_headers = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/ipswebtracking/IPSWeb_item_events.aspx", server
+    server.shutdown()
+    server.server_close()
+
+
+def test_matching_etag_is_not_modified(etag_url):
+    url, server = etag_url
+    validators = {}
+    assert download_tracking_page("EE000000001IN", url, validators=validators) == PAGE
+    assert validators['etag'] == ETAG
+    assert download_tracking_page("EE000000001IN", url, validators=validators) is NOT_MODIFIED
+    assert server.conditional_headers == [None, ETAG]
+
+
+def test_unchanged_events_table_is_not_modified(etag_url):
+    url, server = etag_url
+    validators = {}
+    download_tracking_page("EE000000001IN", url, validators=validators)
+    validators['etag'] = None  # Only the events table hash is left to compare
+    assert download_tracking_page("EE000000001IN", url, validators=validators) is NOT_MODIFIED
+    assert server.conditional_headers == [None, None]
+
+
+def test_recorded_page_survives_a_304(etag_url, tmp_path):
+    url, _ = etag_url
+    record = create_session(max_retries=0, mode="record", fixture_dir=str(tmp_path))
+    download_tracking_page("EE000000001IN", url, record, validators={})
+    assert download_tracking_page("EE000000001IN", url, record, validators={'etag': ETAG}) is NOT_MODIFIED
+
+    replay = create_session(mode="replay", fixture_dir=str(tmp_path))
+    assert download_tracking_page("EE000000001IN", url, replay) == PAGE
+
+
+def test_rerun_reuses_unchanged_pages(make_config):
+    config_path = make_config(terminal_categories=[], min_repoll_interval_seconds=0,
+                              store_event_history=False)
+    first = ShipmentTracker(config_path).process_tracking_numbers()
+
+    tracker = ShipmentTracker(config_path)
+    assert tracker.process_tracking_numbers() == first
+    assert tracker.unchanged_pages.value() == 10
+
+
+def test_record_mode_sends_no_conditional_headers(make_config, tmp_path):
+    tracker = ShipmentTracker(make_config(http_mode="record", http_fixture_dir=str(tmp_path / "fixtures")))
+    tracker.state_store.update("EE000000001IN", ["event"], "In Transit",
+                               {'etag': ETAG, 'last_modified': "Mon, 01 Jan 2024 00:00:00 GMT",
+                                'content_hash': "abc"})
+    _, validators = tracker._previous_fetch("EE000000001IN")
+    assert validators == {'etag': None, 'last_modified': None, 'content_hash': "abc"}
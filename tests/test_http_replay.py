@@ -0,0 +1,18 @@
+"""Tests of HTTP record/replay mode."""
+
+from src.tracker import ShipmentTracker
+
+
+def test_replay_answers_from_recorded_fixtures(make_config, standin, tmp_path):
+    fixture_dir = str(tmp_path / "fixtures")
+    recorded = ShipmentTracker(make_config(
+        http_mode="record", http_fixture_dir=fixture_dir, incremental_tracking=False
+    )).process_tracking_numbers()
+    assert len(recorded) == 10
+
+    standin.shutdown()
+    replayed = ShipmentTracker(make_config(
+        http_mode="replay", http_fixture_dir=fixture_dir, incremental_tracking=False,
+        zip_cache_file=str(tmp_path / "replay-zip-cache.sqlite3")
+    )).process_tracking_numbers()
+    assert replayed == recorded
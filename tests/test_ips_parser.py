@@ -0,0 +1,69 @@
+"""Tests of the IPS page parser."""
+
+import datetime
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from src.ips_parser import (EVENT_FIELDS, event_to_row, events_fragment_hash,
+                            parse_event_time, parse_tracking_page)
+from src.ips_standin import render_item_events_page, synthetic_events
+
+FIXTURES = os.path.join(REPO_ROOT, "benchmarks", "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3/29/2024 1:22:00 PM", datetime.datetime(2024, 3, 29, 13, 22)),
+    ("3/29/2024 12:05:00 AM", datetime.datetime(2024, 3, 29, 0, 5)),
+    ("3/29/2024 12:05 PM", datetime.datetime(2024, 3, 29, 12, 5)),
+    (" 03/29/2024   13:22 ", datetime.datetime(2024, 3, 29, 13, 22)),
+    ("29-03-2024 13:22:10", datetime.datetime(2024, 3, 29, 13, 22, 10)),
+    ("2024-03-29 13:22:10", datetime.datetime(2024, 3, 29, 13, 22, 10)),
+    ("13/29/2024 1:22:00 PM", None),
+    ("yesterday", None),
+])
+def test_parse_event_time(text, expected):
+    assert parse_event_time(text) == expected
+
+
+def test_parse_tracking_page_events():
+    page = parse_tracking_page(read_fixture("ips_item_events.html"))
+    events = page['events']
+    assert page['message'] == ""
+    assert len(events) == 8
+    assert [event['event_time'] for event in events] == sorted(event['event_time'] for event in events)
+    assert event_to_row(events[-1]) == [
+        "3/29/2024 1:22:00 PM", "US", "10001", "Deliver item (Inb)", "A", "", "Left with individual"
+    ]
+    assert events[2]['next_office'] == "USJFKA"
+
+
+def test_parse_tracking_page_without_events():
+    page = parse_tracking_page(read_fixture("ips_no_information.html"))
+    assert page['events'] == []
+    assert page['message'].startswith("No information available for item EE000000000IN")
+
+
+def test_parse_tracking_page_with_marker_outside_the_table():
+    html = read_fixture("ips_item_events.html").replace(
+        b"<head>", b"<head><style>.tabproperty { color: black; }</style>", 1)
+    assert len(parse_tracking_page(html)['events']) == 8
+
+
+def test_parse_standin_page():
+    rows = synthetic_events("EE000000001IN")
+    page = parse_tracking_page(render_item_events_page("EE000000001IN", rows))
+    assert [[event[field] for field in EVENT_FIELDS] for event in page['events']] == rows
+
+
+def test_events_fragment_hash_ignores_the_rest_of_the_page():
+    html = read_fixture("ips_item_events.html")
+    changed = html.replace(b"</body>", b"<p>Banner</p></body>", 1)
+    assert events_fragment_hash(html) == events_fragment_hash(changed)
+    assert events_fragment_hash(read_fixture("ips_no_information.html")) is None
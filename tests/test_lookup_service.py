@@ -0,0 +1,67 @@
+"""Tests of the local tracking lookup service."""
+
+import json
+import sqlite3
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.lookup_service import TrackingLookupService, start_service
+from src.rate_limiter import CircuitBreaker
+
+
+@pytest.fixture
+def service(make_config):
+    with open(make_config(circuit_window=4, circuit_cooldown_seconds=0.2), "r") as f:
+        config = json.load(f)
+    service = TrackingLookupService(config)
+    yield service
+    service.close()
+
+
+def test_lookup_is_cached(service):
+    first = service.lookup("ee000000001in")
+    assert first['status'] == "ok"
+    assert first['tracking_number'] == "EE000000001IN"
+    assert first['event']['event_type']
+    assert service.lookup("EE000000001IN")['source'] == "cache"
+
+
+def test_recovers_after_circuit_opens(service, standin):
+    standin.error_rate = 1.0
+    for i in range(4):
+        assert service.lookup(f"EE{i:09d}IN")['status'] == "error"
+    assert service.circuit_breaker.state == CircuitBreaker.OPEN
+    result = service.lookup("EE000000010IN")
+    assert result['status'] == "error"
+    assert "circuit open" in result['error']
+
+    # The site is back: after the cooldown the next lookup is the probe
+    standin.error_rate = 0.0
+    time.sleep(0.3)
+    assert service.lookup("EE000000011IN")['status'] == "ok"
+    assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert service.lookup("EE000000012IN")['status'] == "ok"
+
+
+def test_unexpected_errors_are_json_500(service, monkeypatch):
+    def fail(tracking_number):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(service, "lookup", fail)
+
+    server = start_service(service)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/track/EE000000001IN"
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url, timeout=10)
+        assert error.value.code == 500
+        assert "database is locked" in json.loads(error.value.read())['error']
+
+        # The service keeps answering
+        with urllib.request.urlopen(url.replace("/track/EE000000001IN", "/health"), timeout=10) as response:
+            assert json.loads(response.read())['status'] == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,21 @@
+"""Tests of the streaming pipeline."""
+
+import pytest
+
+from src.tracker import ShipmentTracker
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_unexpected_fetch_errors_count_as_failed(make_config, standin, monkeypatch, streaming):
+    def fail(*args, **kwargs):
+        raise RuntimeError("unexpected")
+    monkeypatch.setattr("src.tracker.fetch_tracking_data", fail)
+    monkeypatch.setattr("src.pipeline.download_tracking_page", fail)
+
+    tracker = ShipmentTracker(make_config(
+        rows=5, streaming_pipeline=streaming, incremental_tracking=False, store_event_history=False
+    ))
+    progress = []
+    tracker.progress_listener = progress.append
+    tracker.run()
+    assert (progress[-1].processed, progress[-1].failed, progress[-1].no_info) == (5, 5, 0)
@@ -0,0 +1,135 @@
+"""Tests of the circuit breaker and its use by tracking runs."""
+
+import threading
+import time
+
+import pytest
+
+from src.rate_limiter import CircuitBreaker
+from src.tracker import ShipmentTracker, RunCancelled
+
+
+def open_breaker(cooldown=0.2):
+    """Returns a breaker opened by a full window of failures."""
+    breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, cooldown=cooldown)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_when_failure_ratio_reached():
+    breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, cooldown=30)
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.try_acquire()
+
+
+def test_probe_after_cooldown_closes_on_success():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.1)
+    assert breaker.try_acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.try_acquire()  # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.try_acquire()
+
+
+def test_failed_probe_reopens():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.1)
+    assert breaker.try_acquire()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.try_acquire()
+
+
+
+def test_half_open_ignores_outcomes_of_other_requests():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.1)
+    assert breaker.try_acquire()
+    # Requests sent before the circuit opened finish while the probe is out
+    for outcome in (breaker.record_failure, breaker.record_success):
+        other = threading.Thread(target=outcome)
+        other.start()
+        other.join()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_wait_until_allowed_returns_when_cancelled():
+    breaker = open_breaker(cooldown=30)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    started = time.monotonic()
+    assert breaker.wait_until_allowed(cancel, poll_interval=0.05) is False
+    assert time.monotonic() - started < 5
+
+
+def test_released_probe_goes_to_the_next_waiter():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.1)
+    assert breaker.wait_until_allowed()  # This thread is the probe
+    allowed = []
+    waiter = threading.Thread(target=lambda: allowed.append(breaker.wait_until_allowed()))
+    waiter.start()
+    time.sleep(0.1)
+    assert waiter.is_alive()  # Waiting for the probe result
+
+    breaker.release_probe()
+    waiter.join(timeout=5)
+    assert allowed == [True]
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_release_probe_ignores_other_threads():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.1)
+    assert breaker.try_acquire()
+    other = threading.Thread(target=breaker.release_probe)
+    other.start()
+    other.join()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.try_acquire()
+
+
+def test_cancel_while_holding_probe_gives_it_back(make_config):
+    tracker = ShipmentTracker(make_config(circuit_cooldown_seconds=0.05))
+    breaker = tracker.circuit_breaker
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+    time.sleep(0.1)
+    # The run is cancelled while the probe waits for a rate limiter token
+    tracker.rate_limiter.acquire = tracker.cancel
+
+    with pytest.raises(RunCancelled):
+        tracker._pace_request()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.try_acquire()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cancel_with_open_circuit_ends_the_run(make_config, standin, streaming):
+    standin.error_rate = 1.0
+    tracker = ShipmentTracker(make_config(
+        rows=40, streaming_pipeline=streaming, fetch_workers=4, circuit_window=4,
+        circuit_cooldown_seconds=0.2, incremental_tracking=False, store_event_history=False
+    ))
+    run = threading.Thread(target=tracker.run, daemon=True)
+    run.start()
+
+    deadline = time.monotonic() + 10
+    while tracker.circuit_breaker.state == CircuitBreaker.CLOSED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert tracker.circuit_breaker.state != CircuitBreaker.CLOSED
+    time.sleep(0.3)  # Let a probe go out
+    tracker.cancel()
+
+    run.join(timeout=20)
+    assert not run.is_alive()
@@ -0,0 +1,32 @@
+"""Tests of the scheduler service lock used by the dashboard."""
+
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from src.scheduler import main, service_lock, service_running, start_service
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGTERM") or os.name == "nt", reason="POSIX only")
+def test_started_service_is_detected(make_config):
+    config_path = make_config()
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    assert not service_running(config)
+
+    assert start_service(config_path)
+    try:
+        assert service_running(config)
+        # A second service refuses to start
+        assert main(["--config", config_path, "--serve"]) == 1
+    finally:
+        with open(service_lock(config).path, "r") as f:
+            os.kill(int(f.read()), signal.SIGTERM)
+
+    deadline = time.monotonic() + 10
+    while service_running(config) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not service_running(config)
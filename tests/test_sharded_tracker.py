@@ -0,0 +1,53 @@
+"""Tests of sharded runs and of lookup errors that are not fetch errors."""
+
+import json
+import sqlite3
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from src.tracker import ShipmentTracker
+from src.sharded_tracker import ShardedTracker
+from src.state_store import TrackingStateStore
+
+
+def test_unexpected_error_fails_only_its_item(make_config):
+    tracker = ShipmentTracker(make_config(store_event_history=False))
+    finish_event = tracker._finish_event
+
+    def failing_finish_event(engine, tracking_number, *args):
+        if tracking_number == "EE000000003IN":
+            raise sqlite3.OperationalError("database is locked")
+        return finish_event(engine, tracking_number, *args)
+
+    tracker._finish_event = failing_finish_event
+    records = tracker.process_tracking_numbers()
+    assert len(records) == 9
+    assert tracker.miscellaneous == ["EE000000003IN"]
+
+
+def test_crashed_shard_fails_only_its_items(make_config):
+    config_path = make_config(rows=4)
+    with open(config_path, "r") as f:
+        input_file = json.load(f)["input_file"]
+    tracker = ShardedTracker([input_file], config_path)
+    future = Future()
+    future.set_exception(BrokenProcessPool("worker died"))
+    results = {"EE000000000IN": None, "EE000000001IN": None}
+
+    tracker._merge_shard(future, list(results), results)
+    assert results == {"EE000000000IN": 0, "EE000000001IN": 0}
+    assert tracker._progress['failed'] == 2
+
+
+def test_workers_share_the_state_files(make_config):
+    config_path = make_config(rows=20)
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    tracker = ShardedTracker([config["input_file"]], config_path, workers=2, shard_size=5)
+
+    records = tracker.process_tracking_numbers()
+    assert len(records) == 20
+    assert not tracker.miscellaneous
+    store = TrackingStateStore(config["state_file"])
+    assert store.get("EE000000019IN") is not None
+    store.close()
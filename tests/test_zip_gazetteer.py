@@ -0,0 +1,37 @@
+"""Tests of the offline zip code index."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.zip_gazetteer import ZipGazetteer, build_index
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "zip-codes.csv"
+    with open(path, "w") as f:
+        f.write("zip,city,state\n")
+        for zip_code in range(10001, 30001):
+            f.write(f"{zip_code},City{zip_code},NY\n")
+    return str(path)
+
+
+def test_concurrent_builds_do_not_collide(dataset, tmp_path):
+    index_path = str(tmp_path / "index" / "zip-gazetteer.sqlite3")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        counts = list(pool.map(lambda _: build_index(dataset, index_path), range(4)))
+    assert counts == [20000] * 4
+    assert [path.name for path in (tmp_path / "index").iterdir()] == ["zip-gazetteer.sqlite3"]
+
+    gazetteer = ZipGazetteer(index_path)
+    assert gazetteer.get("10001") == " City10001, NY,ZIP Code 10001"
+    gazetteer.close()
+
+
+def test_failed_build_leaves_no_temporary_file(tmp_path):
+    dataset = tmp_path / "zip-codes.csv"
+    dataset.write_text("postal,town\n10001,New York\n")
+    with pytest.raises(ValueError):
+        build_index(str(dataset), str(tmp_path / "index" / "zip-gazetteer.sqlite3"))
+    assert not list((tmp_path / "index").iterdir())